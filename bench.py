@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from bench_data import DEFAULT_HEROES, DEFAULT_SEASONS, DEFAULT_SKEW, generate_sheets
+from counter_store import DataStore
+from raw_store import STAT_KINDS, RawMatchStore
+
+logger = logging.getLogger("counter-bot")
+
+
+# 합성 시트로 DataStore / RawMatchStore 의 로드와 조회 비용을 잰다.
+#   python bench.py --rows 1000,100000,1000000 --out bench.json
+#   python bench.py --rows 100000 --baseline bench.json   # 느려진 항목이 있으면 exit 1
+# 결과는 JSON 하나 (meta + results). 사람이 볼 요약은 stderr 로 나간다.
+
+SAMPLES = 20
+REPEAT = 5
+# --baseline 비교 때 warm p50 이 이 배수를 넘으면 회귀로 본다
+REGRESSION_RATIO = 1.3
+# 너무 짧은 조회는 흔들림이 커서 이 값(µs)보다 작은 차이는 무시한다
+REGRESSION_FLOOR_US = 5.0
+
+
+def _us(ns: int) -> float:
+    return ns / 1000.0
+
+
+def _time_call(fn: Callable[[], Any]) -> int:
+    start = time.perf_counter_ns()
+    fn()
+    return time.perf_counter_ns() - start
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def _summary(cold: List[int], warm: List[int]) -> Dict[str, float]:
+    warm_us = [_us(x) for x in warm]
+    return {
+        "calls": len(cold) + len(warm),
+        "cold_mean_us": statistics.fmean(_us(x) for x in cold) if cold else 0.0,
+        "cold_max_us": max(_us(x) for x in cold) if cold else 0.0,
+        "warm_p50_us": _percentile(warm_us, 50),
+        "warm_p95_us": _percentile(warm_us, 95),
+        "warm_mean_us": statistics.fmean(warm_us) if warm_us else 0.0,
+    }
+
+
+def measure_op(calls: Sequence[Callable[[], Any]], repeat: int, before: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    # cold: 로드 직후 입력별 첫 호출 / warm: 같은 입력을 repeat 번 더 돌린 것
+    # before 가 있으면 cold 를 돌기 전에 한 번 부른다 (렌더 캐시 비우기 등)
+    if before:
+        before()
+    cold = [_time_call(fn) for fn in calls]
+    warm = [_time_call(fn) for _ in range(repeat) for fn in calls]
+    return _summary(cold, warm)
+
+
+def measure_load(load: Callable[[], Any], memory: bool) -> Dict[str, float]:
+    gc.collect()
+    seconds = _us(_time_call(load)) / 1e6
+    result = {"seconds": seconds}
+    if memory:
+        # tracemalloc 는 느려서 시간은 위에서 따로 재고 메모리만 한 번 더 로드해서 본다
+        gc.collect()
+        tracemalloc.start()
+        load()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_mb"] = peak / 2**20
+    return result
+
+
+def _members(store: RawMatchStore, side: str, key: str) -> List[str]:
+    return list(store.team_members.get(side, {}).get(key, ()))
+
+
+def pick_samples(data_store: DataStore, raw_store: RawMatchStore, n: int) -> Dict[str, Any]:
+    # 인기 조합 위주로 고른다 (실제 조회도 대부분 많이 쓰이는 조합에 몰린다)
+    def top_teams(kind: str, side: str) -> List[List[str]]:
+        totals = raw_store.team_totals.get(kind, {})
+        keys = sorted(totals, key=lambda k: totals[k]["total"], reverse=True)[:n]
+        return [_members(raw_store, side, k) for k in keys]
+
+    by_side = {
+        "def": top_teams("overall", "def"),
+        "atk": top_teams("global_attack", "atk"),
+    }
+    heroes = {
+        side: [x["hero"] for x in raw_store.synergy[side].top_heroes(1, n)] if side in raw_store.synergy else []
+        for side in ("def", "atk")
+    }
+    enemies = sorted(data_store.by_enemy, key=lambda k: len(data_store.by_enemy[k]), reverse=True)[:n]
+    pairs = list(raw_store.attack_pairs)[:n]
+    return {"teams": by_side, "heroes": heroes, "enemies": [list(k) for k in enemies], "pairs": pairs}
+
+
+def data_store_ops(store: DataStore, samples: Dict[str, Any]) -> Dict[str, List[Callable[[], Any]]]:
+    enemies = samples["enemies"]
+    heroes = samples["heroes"]["def"]
+    return {
+        "DataStore.search_by_enemy": [lambda e=e: store.search_by_enemy(e) for e in enemies],
+        "DataStore.search_by_enemy[wilson]": [lambda e=e: store.search_by_enemy(e, rank="wilson") for e in enemies],
+        "DataStore.find_enemy_teams[1]": [lambda h=h: store.find_enemy_teams([h]) for h in heroes],
+        "DataStore.get_counter": [lambda e=e: store.get_counter(e, 0) for e in enemies],
+    }
+
+
+def raw_store_ops(store: RawMatchStore, samples: Dict[str, Any]) -> Dict[str, List[Callable[[], Any]]]:
+    teams, heroes = samples["teams"], samples["heroes"]
+    recent = store.select_seasons("최근3") or None
+    ops: Dict[str, List[Callable[[], Any]]] = {}
+
+    for kind, spec in STAT_KINDS.items():
+        side = spec["target"]
+        full = teams[side]
+        ops[f"get_stats[{kind}]"] = [lambda t=t, k=kind: store.get_stats(k, t) for t in full]
+        ops[f"get_stats[{kind}:wilson]"] = [lambda t=t, k=kind: store.get_stats(k, t, rank="wilson") for t in full]
+        ops[f"get_stats[{kind}:season]"] = [lambda t=t, k=kind: store.get_stats(k, t, seasons=recent) for t in full]
+        ops[f"get_stats[{kind}:1hero]"] = [lambda h=h, k=kind: store.get_stats(k, [h]) for h in heroes[side]]
+        ops[f"get_stats[{kind}:2hero]"] = [lambda t=t, k=kind: store.get_stats(k, t[:2]) for t in full]
+
+    defs, atks = teams["def"], teams["atk"]
+    ops.update({
+        "get_defense_stats": [lambda t=t: store.get_defense_stats(t) for t in defs],
+        "get_my_attack_winrates": [lambda t=t: store.get_my_attack_winrates(t) for t in atks],
+        "get_enemy_attack_winrates": [lambda t=t: store.get_enemy_attack_winrates(t) for t in atks],
+        "get_global_attack_winrates": [lambda t=t: store.get_global_attack_winrates(t) for t in atks],
+        "get_attack_stats": [lambda t=t: store.get_attack_stats(t) for t in defs],
+        "get_overall_stats": [lambda t=t: store.get_overall_stats(t) for t in defs],
+        "get_report": [lambda t=t: store.get_report(t) for t in defs],
+        "get_report[season]": [lambda t=t: store.get_report(t, recent) for t in defs],
+        "get_matchup_summary[all]": [lambda: store.get_matchup_summary([])],
+        "get_matchup_summary[1hero]": [lambda h=h: store.get_matchup_summary([h]) for h in heroes["def"]],
+        "get_matchup_summary[season]": [lambda h=h: store.get_matchup_summary([h], seasons=recent) for h in heroes["def"]],
+        "get_hero_ranking": [lambda s=s: store.get_hero_ranking(s) for s in ("atk", "def")],
+        "get_hero_partners": [lambda h=h: store.get_hero_partners("atk", h) for h in heroes["atk"]],
+        "get_attack_pair": [lambda p=p: store.get_attack_pair(*p) for p in samples["pairs"]],
+        "select_seasons": [lambda: store.select_seasons("최근3")],
+    })
+    return {name: calls for name, calls in ops.items() if calls}
+
+
+def render_ops(data_store: DataStore, raw_store: RawMatchStore, samples: Dict[str, Any]):
+    # discord.py 가 없는 환경이면 embed 렌더링은 건너뛴다
+    try:
+        import counter_ui
+    except ImportError:
+        return {}, None
+
+    def stats_page(team):
+        results = raw_store.get_stats("overall", team)
+        return lambda: counter_ui.cached_stats_page("overall", raw_store.version, sorted(team), results)
+
+    def counter_page(enemy):
+        results = data_store.search_by_enemy(enemy)
+        return lambda: counter_ui.cached_counter_page(data_store.version, enemy, results)
+
+    ops = {
+        "render.stats_page": [stats_page(t) for t in samples["teams"]["def"]],
+        "render.counter_page": [counter_page(e) for e in samples["enemies"]],
+    }
+    return {name: calls for name, calls in ops.items() if calls}, counter_ui.render_cache.clear
+
+
+def uncovered_methods(results: List[Dict[str, Any]]) -> List[str]:
+    # 새 get_* 가 생겼는데 벤치마크에 빠졌으면 meta 에 남긴다
+    names = {r["op"].split("[")[0].split(".")[-1] for r in results if "op" in r}
+    public = [n for n in dir(RawMatchStore) if n.startswith("get_")] + ["search_by_enemy", "find_enemy_teams", "get_counter"]
+    return sorted(set(public) - names)
+
+
+def run_size(
+    rows: int,
+    data_dir: Path,
+    heroes: int,
+    seasons: int,
+    skew: float,
+    seed: int,
+    samples: int,
+    repeat: int,
+    memory: bool,
+) -> List[Dict[str, Any]]:
+    counter_path, raw_path, shape = generate_sheets(data_dir, rows, heroes=heroes, seasons=seasons, skew=skew, seed=seed)
+    base = {"rows": rows}
+    results: List[Dict[str, Any]] = [{**base, "phase": "data", **shape}]
+
+    data_store = DataStore("", csv_path=str(counter_path))
+    raw_store = RawMatchStore("", "0", csv_path=str(raw_path))
+    results.append({**base, "phase": "load.counter", **measure_load(data_store.load, memory)})
+    results.append({**base, "phase": "load.raw", **measure_load(raw_store.load, memory)})
+    results.append({**base, "phase": "load.attach_raw", **measure_load(lambda: data_store.attach_raw_stats(raw_store), False)})
+    if raw_store.df is None or data_store.df is None:
+        raise RuntimeError(f"합성 시트 로드 실패 (rows={rows})")
+
+    picked = pick_samples(data_store, raw_store, samples)
+    ops = {**data_store_ops(data_store, picked), **raw_store_ops(raw_store, picked)}
+    for name, calls in ops.items():
+        results.append({**base, "op": name, **measure_op(calls, repeat)})
+
+    renders, clear = render_ops(data_store, raw_store, picked)
+    for name, calls in renders.items():
+        results.append({**base, "op": name, **measure_op(calls, repeat, before=clear)})
+
+    results.append({**base, "phase": "process", "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+    return results
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], ratio: float) -> List[Dict[str, Any]]:
+    def keyed(rows):
+        out = {}
+        for r in rows:
+            if "op" in r:
+                out[(r["rows"], r["op"])] = r["warm_p50_us"]
+            elif "seconds" in r:
+                out[(r["rows"], r["phase"])] = r["seconds"] * 1e6
+        return out
+
+    before, now = keyed(baseline), keyed(results)
+    found = []
+    for key, value in now.items():
+        old = before.get(key)
+        if old is None or value - old < REGRESSION_FLOOR_US:
+            continue
+        if value > old * ratio:
+            found.append({"rows": key[0], "name": key[1], "baseline_us": old, "now_us": value, "ratio": value / old if old else float("inf")})
+    return found
+
+
+def _print_summary(results: List[Dict[str, Any]]) -> None:
+    for r in results:
+        if "op" in r:
+            print(
+                f"{r['rows']:>8} {r['op']:<40} cold {r['cold_mean_us']:>10.1f}µs"
+                f"  warm p50 {r['warm_p50_us']:>10.1f}µs  p95 {r['warm_p95_us']:>10.1f}µs",
+                file=sys.stderr,
+            )
+        elif "seconds" in r:
+            mem = f"  peak {r['peak_mb']:.1f}MB" if "peak_mb" in r else ""
+            print(f"{r['rows']:>8} {r['phase']:<40} {r['seconds']:.3f}s{mem}", file=sys.stderr)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="DataStore / RawMatchStore 합성 데이터 벤치마크")
+    parser.add_argument("--rows", default="1000,10000,100000", help="raw 행 수 목록 (쉼표 구분, 1000~1000000)")
+    parser.add_argument("--heroes", type=int, default=DEFAULT_HEROES)
+    parser.add_argument("--seasons", type=int, default=DEFAULT_SEASONS)
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW, help="조합 인기도 Zipf 지수 (클수록 쏠림)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="조회 종류별 입력 개수")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="warm 반복 횟수")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 피크 메모리 측정 생략")
+    parser.add_argument("--data-dir", help="생성한 CSV 를 남길 폴더 (기본: 임시 폴더)")
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: stdout)")
+    parser.add_argument("--baseline", help="이전 결과 JSON. 느려진 항목이 있으면 exit 1")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    sizes = [int(x) for x in args.rows.split(",") if x.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="rayabot-bench-") as tmp:
+        data_dir = Path(args.data_dir or tmp)
+        results: List[Dict[str, Any]] = []
+        for rows in sizes:
+            results.extend(run_size(
+                rows, data_dir, args.heroes, args.seasons, args.skew, args.seed,
+                args.samples, args.repeat, not args.no_memory,
+            ))
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "args": vars(args),
+            "uncovered": uncovered_methods(results),
+        },
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline.get("results", []), args.ratio)
+        report["regressions"] = regressions
+        for r in regressions:
+            print(f"REGRESSION {r['rows']} {r['name']}: {r['baseline_us']:.1f} -> {r['now_us']:.1f}µs (x{r['ratio']:.2f})", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    _print_summary(results)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from counter_store import POS_COLS, REQUIRED_COLUMNS
+from raw_store import RAW_REQUIRED_COLUMNS
+
+
+# 벤치마크용 가짜 시트 생성기.
+# 실제 시트처럼 소수 인기 조합에 판수가 몰리도록 조합 인기도를 Zipf 분포로 뽑는다.
+# 같은 인자/seed 면 항상 같은 CSV 가 나온다.
+
+DEFAULT_HEROES = 40
+DEFAULT_SEASONS = 6
+DEFAULT_SKEW = 1.1
+DRAW_RATE = 0.03
+
+
+def hero_names(n: int) -> np.ndarray:
+    return np.array([f"영웅{i:03d}" for i in range(1, n + 1)], dtype=object)
+
+
+def _team_pool(rng: np.random.Generator, heroes: np.ndarray, n_teams: int, skew: float) -> np.ndarray:
+    # (n_teams, 3) 영웅 이름 행렬. 영웅 자체 인기도도 치우치게 해서 실제처럼 특정 영웅이 자주 겹친다.
+    hero_p = 1.0 / np.arange(1, len(heroes) + 1) ** (skew / 2)
+    hero_p /= hero_p.sum()
+
+    seen = set()
+    teams = []
+    # 가능한 조합 수보다 많이 달라고 하면 나올 수 있는 만큼만 만든다
+    for _ in range(n_teams * 20):
+        if len(teams) >= n_teams:
+            break
+        team = tuple(sorted(rng.choice(len(heroes), size=3, replace=False, p=hero_p)))
+        if team in seen:
+            continue
+        seen.add(team)
+        teams.append(team)
+    return heroes[np.array(teams, dtype=np.int64)]
+
+
+def _zipf_p(n: int, skew: float) -> np.ndarray:
+    p = 1.0 / np.arange(1, n + 1) ** skew
+    return p / p.sum()
+
+
+def _join(teams: np.ndarray, sep: str) -> np.ndarray:
+    return np.array([sep.join(t) for t in teams], dtype=object)
+
+
+def make_raw_frame(
+    rng: np.random.Generator,
+    def_teams: np.ndarray,
+    atk_teams: np.ndarray,
+    rows: int,
+    seasons: int = DEFAULT_SEASONS,
+    skew: float = DEFAULT_SKEW,
+) -> pd.DataFrame:
+    def_idx = rng.choice(len(def_teams), size=rows, p=_zipf_p(len(def_teams), skew))
+    atk_idx = rng.choice(len(atk_teams), size=rows, p=_zipf_p(len(atk_teams), skew))
+
+    # 조합마다 숨은 강함을 두고 (공격 - 방어) 차이로 승률을 정한다
+    def_power = rng.normal(0.0, 1.0, len(def_teams))
+    atk_power = rng.normal(0.0, 1.0, len(atk_teams))
+    p_win = 1.0 / (1.0 + np.exp(-(atk_power[atk_idx] - def_power[def_idx])))
+    roll = rng.random(rows)
+    result = np.where(roll < DRAW_RATE, "무", np.where(rng.random(rows) < p_win, "승", "패"))
+
+    d = def_teams[def_idx]
+    a = atk_teams[atk_idx]
+    # 방어key/공격key 는 절반만 채워서 영웅 칸으로 key 를 만드는 경로도 같이 돈다
+    def_key = _join(def_teams, "")[def_idx]
+    atk_key = _join(atk_teams, "")[atk_idx]
+    def_key[rng.random(rows) < 0.5] = ""
+    atk_key[rng.random(rows) < 0.5] = ""
+
+    frame = pd.DataFrame({
+        "방어조합1": d[:, 0], "방어조합2": d[:, 1], "방어조합3": d[:, 2],
+        "공격조합1": a[:, 0], "공격조합2": a[:, 1], "공격조합3": a[:, 2],
+        "승패여부": result,
+        "시즌": rng.integers(1, seasons + 1, rows).astype(str),
+        "비고": "",
+        "방어key": def_key,
+        "공격key": atk_key,
+        "COUNT": np.where(rng.random(rows) < 0.97, "Y", "N"),
+        "기준": np.where(rng.random(rows) < 0.5, "공격", "방어"),
+        "방어메인": d[:, 0],
+        "방어조합": _join(def_teams, ", ")[def_idx],
+        "공격조합": _join(atk_teams, ", ")[atk_idx],
+    })
+    return frame[RAW_REQUIRED_COLUMNS]
+
+
+def make_counter_frame(
+    rng: np.random.Generator,
+    def_teams: np.ndarray,
+    atk_teams: np.ndarray,
+    rows: int,
+    skew: float = DEFAULT_SKEW,
+) -> pd.DataFrame:
+    # 카운터 시트는 raw 에 자주 나오는 조합 위주라서 같은 인기도로 뽑는다 (raw 성적 join 도 걸리게)
+    enemy = def_teams[rng.choice(len(def_teams), size=rows, p=_zipf_p(len(def_teams), skew))]
+    counter = atk_teams[rng.choice(len(atk_teams), size=rows, p=_zipf_p(len(atk_teams), skew))]
+
+    frame = pd.DataFrame({c: "" for c in REQUIRED_COLUMNS}, index=range(rows))
+    frame["id"] = np.arange(1, rows + 1).astype(str)
+    for i in range(3):
+        frame[f"enemy{i + 1}"] = enemy[:, i]
+        frame[f"counter{i + 1}"] = counter[:, i]
+    frame["first"] = np.where(rng.random(rows) < 0.5, "선공", "후공")
+    frame["win"] = rng.integers(0, 40, rows).astype(str)
+    frame["lose"] = rng.integers(0, 40, rows).astype(str)
+    frame["formation"] = rng.choice(["공격", "기본", "밸런스", "보호"], rows)
+    for n, (pos, set_col, opt_col, ring_col) in enumerate(POS_COLS):
+        frame[pos] = counter[:, n % 3]
+        frame[set_col] = "세트"
+        frame[opt_col] = "옵션"
+        frame[ring_col] = "반지"
+    frame["skill1"] = counter[:, 0]
+    frame["notes"] = "메모"
+    frame["disable"] = np.where(rng.random(rows) < 0.05, "Y", "")
+    frame["recommend"] = np.where(rng.random(rows) < 0.1, "Y", "")
+    return frame
+
+
+def generate_sheets(
+    out_dir: Path,
+    raw_rows: int,
+    heroes: int = DEFAULT_HEROES,
+    counter_rows: Optional[int] = None,
+    seasons: int = DEFAULT_SEASONS,
+    skew: float = DEFAULT_SKEW,
+    seed: int = 0,
+) -> Tuple[Path, Path, Dict[str, int]]:
+    rng = np.random.default_rng(seed)
+    names = hero_names(heroes)
+    # 판수가 늘면 실제 시트처럼 등장하는 조합 수도 완만하게 늘어난다
+    n_def = max(20, int(raw_rows ** 0.5 * 2))
+    n_atk = max(30, int(raw_rows ** 0.5 * 3))
+    def_teams = _team_pool(rng, names, n_def, skew)
+    atk_teams = _team_pool(rng, names, n_atk, skew)
+    counter_rows = counter_rows or max(50, min(5000, raw_rows // 20))
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counter_path = out_dir / f"counter_{raw_rows}.csv"
+    raw_path = out_dir / f"raw_{raw_rows}.csv"
+    make_counter_frame(rng, def_teams, atk_teams, counter_rows, skew).to_csv(counter_path, index=False)
+    make_raw_frame(rng, def_teams, atk_teams, raw_rows, seasons, skew).to_csv(raw_path, index=False)
+
+    shape = {
+        "heroes": heroes,
+        "raw_rows": raw_rows,
+        "counter_rows": counter_rows,
+        "def_teams": len(def_teams),
+        "atk_teams": len(atk_teams),
+        "seasons": seasons,
+        "raw_bytes": os.path.getsize(raw_path),
+    }
+    return counter_path, raw_path, shape
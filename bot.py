@@ -3,21 +3,49 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import re
+import time
 import traceback
-import common
+from typing import Dict, List, Optional, Tuple
+
+import loop_monitor
+import metrics
+import profiler
 
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
-from common import _canon_team_key, _join_team_disp, _split_csv_args, _badge_for_item
+from common import _canon_team_key, _join_team_disp, _split_csv_args
 from counter_store import DataStore
-from counter_ui import CounterView, build_stats_embed
-from raw_store import RawMatchStore
+from counter_ui import (
+    COUNTER_CUSTOM_ID_PREFIX,
+    COUNTER_TEAMS_KIND,
+    REPORT_LIMIT,
+    STAT_PAGES,
+    PageButton,
+    PersistentCounterSelect,
+    build_hero_ranking_embed,
+    build_matchup_embed,
+    build_partner_embed,
+    build_report_embed,
+    build_war_plan_embed,
+    render_cache,
+    render_results_page,
+)
+from raw_store import STAT_KINDS, RawMatchStore, season_label
+from ranking import RANK_DEFAULT, RANK_LABELS, RANK_WORDS
+from hero_index import HeroIndex, format_corrections
+from roster_store import RosterStore
+from guild_settings import GuildSettings
+from war_planner import MAX_DEFENSES, collect_candidates, plan_attacks
 from notifier import NotifierManager
 from crawler import BoardCrawler
+from status import build_status_embed
 
 
 logging.basicConfig(
@@ -25,12 +53,15 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
 )
 logger = logging.getLogger("counter-bot")
+metrics.install_log_counter()
 
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN", "")
 SHEET_URL_DEFAULT = "https://docs.google.com/spreadsheets/d/PUT_YOUR_ID_HERE/edit?gid=0#gid=0"
 RAW_SHEET_GID_DEFAULT = "123456789"
+# !프로파일 같은 관리자 명령어를 쓸 수 있는 user id (쉼표 구분). 봇 소유자는 항상 가능.
+ADMIN_USER_IDS = {int(x) for x in os.getenv("ADMIN_USER_IDS", "").replace(",", " ").split() if x.isdigit()}
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -38,17 +69,37 @@ intents.message_content = True
 bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
 bot.board_crawler = BoardCrawler()
 
-data_store = DataStore(SHEET_URL_DEFAULT)
-raw_store = RawMatchStore(SHEET_URL_DEFAULT, RAW_SHEET_GID_DEFAULT)
-
+# COUNTER_CSV_PATH / RAW_CSV_PATH 를 주면 시트 대신 로컬 CSV 를 읽는다 (오프라인 부하 테스트 등)
+data_store = DataStore(SHEET_URL_DEFAULT, os.getenv("COUNTER_CSV_PATH"))
+raw_store = RawMatchStore(SHEET_URL_DEFAULT, RAW_SHEET_GID_DEFAULT, os.getenv("RAW_CSV_PATH"))
+hero_index = HeroIndex()
+roster_store = RosterStore()
+guild_settings = GuildSettings()
+
+# persistent view 콜백은 interaction.client 로 스토어에 접근한다
+bot.data_store = data_store
+bot.raw_store = raw_store
+bot.roster_store = roster_store
+bot.guild_settings = guild_settings
+bot.add_dynamic_items(PersistentCounterSelect, PageButton)
+
+profiler.start_tracemalloc_from_env()
 data_store.load()
 raw_store.load()
+data_store.attach_raw_stats(raw_store)
+hero_index.build_from_frames(data_store.df, raw_store.df)
+
+metrics.register_cache("render", render_cache)
 
 notifier_manager = None
+metrics_server = None
+tree_synced = False
 
 @tasks.loop(minutes=3)
 async def check_naver_board():
+    start = time.perf_counter()
     updates = bot.board_crawler.check_new_posts()
+    metrics.observe_poll("naver_board", time.perf_counter() - start)
 
     for update in updates:
         channel = bot.get_channel(update["channel_id"])
@@ -61,16 +112,29 @@ async def check_naver_board():
         for post in update["posts"]:
             url = f"{bot.board_crawler.detail_url}{post['id']}"
 
-            await channel.send(
-                f"📢 **[{board_name}] 새 글이 올라왔어요!**\n"
-                f"📝 {post['title']}\n"
-                f"{url}"
-            )
+            async with metrics.track_send("board"):
+                await channel.send(
+                    f"📢 **[{board_name}] 새 글이 올라왔어요!**\n"
+                    f"📝 {post['title']}\n"
+                    f"{url}"
+                )
 
 @bot.event
 async def on_ready():
-    global notifier_manager
+    global notifier_manager, metrics_server, tree_synced
+
+    if not tree_synced:
+        try:
+            synced = await bot.tree.sync()
+            tree_synced = True
+            logger.info(f"slash 명령어 동기화: {len(synced)}개")
+        except Exception:
+            logger.error("slash 명령어 동기화 실패:\n" + traceback.format_exc())
+
+    if metrics_server is None:
+        metrics_server = await metrics.start_http_server()
 
+    loop_monitor.monitor.start()
 
     if notifier_manager is None:
         notifier_manager = NotifierManager(bot)
@@ -82,12 +146,28 @@ async def on_ready():
     logger.info(f"✅ 로그인 완료: {bot.user} (guilds={len(bot.guilds)})")
     
 
+# prefix 명령어 처리 시간. 명령어 안에서 잡힌 오류는 rayabot_log_errors_total 쪽에 잡힌다.
+@bot.before_invoke
+async def _metrics_before_invoke(ctx: commands.Context):
+    loop_monitor.tag(f"!{ctx.command.qualified_name}")
+    ctx.metrics_start = time.perf_counter()
+
+
+@bot.after_invoke
+async def _metrics_after_invoke(ctx: commands.Context):
+    start = getattr(ctx, "metrics_start", None)
+    if start is not None:
+        status = "error" if ctx.command_failed else "ok"
+        metrics.observe_command(f"!{ctx.command.qualified_name}", time.perf_counter() - start, status)
+
 
 @bot.command(name="리로드")
 async def reload_cmd(ctx: commands.Context):
     try:
         data_store.load()
         raw_store.load()
+        data_store.attach_raw_stats(raw_store)
+        hero_index.build_from_frames(data_store.df, raw_store.df)
 
         problems = []
         if data_store.df is None:
@@ -104,43 +184,142 @@ async def reload_cmd(ctx: commands.Context):
         await ctx.reply("⚠️ 리로드 중 오류가 발생했어요.", mention_author=False)
 
 
-@bot.command(name="조합")
-async def combo_cmd(ctx: commands.Context, *, args: str = ""):
-    try:
-        tokens = _split_csv_args(args)
-        if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 상대 3명만. 예) `!조합 제이브, 카구라, 트루드`", mention_author=False)
-            return
+# --- 조회 명령어 공통 처리 ---
+# prefix 명령어(!조합)와 slash 명령어(/조합)가 같은 응답 로직을 쓰도록 send 함수만 바꿔 끼운다.
 
-        want = _canon_team_key(tokens)
-        enemy_disp = ", ".join(want)
-        results = data_store.search_by_enemy(list(want))
+def _ctx_sender(ctx: commands.Context):
+    async def send(content: Optional[str] = None, **kwargs):
+        async with metrics.track_send("reply"):
+            await ctx.reply(content, mention_author=False, **kwargs)
+    return send
 
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 카운터 데이터가 없습니다.\n🎯 상대 조합: `{enemy_disp}`",
-                mention_author=False
-            )
-            return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            total = item["win"] + item["lose"]
-            combo = ", ".join([x for x in item["counter_disp"] if x]) or "정보 없음"
+def _interaction_sender(interaction: discord.Interaction):
+    async def send(content: Optional[str] = None, **kwargs):
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        async with metrics.track_send("interaction"):
+            await interaction.response.send_message(content, **kwargs)
+    return send
 
-            star = _badge_for_item(item, i)
-            rec_text = "**추천** · " if item.get("recommend") else ""
-            lines.append(f"{star}{i}. `{combo}` — {rec_text}**{rate:.0f}%** ({total}판)")
 
-        embed = discord.Embed(
-            title="📋 카운터 목록 (추천 우선/승률순)",
-            description=f"🎯 상대 조합: `{enemy_disp}`\n\n" + "\n".join(lines),
-            color=0xF1C40F
-        )
+def _guild_id(ctx: commands.Context) -> Optional[int]:
+    return ctx.guild.id if ctx.guild else None
+
+
+def _with_note(note: str, content: str) -> str:
+    return f"{note}\n{content}" if note else content
+
+
+_ROSTER_NOTE = "🎒 보유 영웅으로 꾸릴 수 있는 조합만 보여줘요 (`!보유 끄기`로 해제)"
+
+# 통계 명령어 끝에 "@12", "@10~12", "@최근3" 을 붙이면 그 시즌만 본다
+_SEASON_SUFFIX_RE = re.compile(r"@\s*([^@,]+?)\s*$")
+
+
+def _split_season(args: str):
+    m = _SEASON_SUFFIX_RE.search(args or "")
+    if not m:
+        return args, ""
+    return args[:m.start()], m.group(1)
+
+
+# "#신뢰" / "#보정" 을 붙이면 판수가 적은 조합이 위로 튀지 않는 점수로 정렬한다 (위치 무관)
+_RANK_WORD_RE = re.compile(r"#\s*(" + "|".join(RANK_WORDS) + r")\b")
+
+
+def _split_rank(args: str):
+    m = _RANK_WORD_RE.search(args or "")
+    if not m:
+        return args, RANK_DEFAULT
+    return args[:m.start()] + args[m.end():], RANK_WORDS[m.group(1)]
+
+
+def _season_error(spec: str) -> str:
+    available = ", ".join(raw_store.seasons) or "없음"
+    return f"❌ `{spec}` 에 해당하는 시즌이 없어요. 예) `@12`, `@10~12`, `@최근3` (데이터 시즌: {available})"
+
+
+async def _send_counters(send, tokens: List[str], owner: int = 0, rank: str = RANK_DEFAULT) -> None:
+    tokens, corrections = hero_index.resolve_team(tokens)
+    note = format_corrections(corrections)
+
+    want = _canon_team_key(tokens)
+    enemy_disp = ", ".join(want)
+    roster_mask = None
+    if len(want) == 3:
+        kind = COUNTER_CUSTOM_ID_PREFIX
+        roster_mask = roster_store.mask(owner)
+        results = data_store.search_by_enemy(list(want), roster_mask, rank)
+    else:
+        kind = COUNTER_TEAMS_KIND
+        results = data_store.find_enemy_teams(list(want))
+
+    if roster_mask is not None:
+        note = _with_note(note, _ROSTER_NOTE)
+    else:
+        owner = 0
+
+    if not results:
+        await send(_with_note(note, f"⚠️ 조건에 맞는 카운터 데이터가 없습니다.\n🎯 상대 조합: `{enemy_disp}`"))
+        return
+
+    embed, view = render_results_page(kind, data_store.version, want, results, 0, owner, roster_mask, rank=rank)
+    await send(note or None, embed=embed, view=view)
+
+
+async def _send_stats(
+    send,
+    kind: str,
+    tokens: List[str],
+    owner: int = 0,
+    season_spec: str = "",
+    guild_id: Optional[int] = None,
+    rank: str = RANK_DEFAULT,
+) -> None:
+    tokens, corrections = hero_index.resolve_team(tokens)
+    note = format_corrections(corrections)
+    min_tries = guild_settings.min_tries(guild_id)
+
+    seasons = raw_store.select_seasons(season_spec)
+    if seasons == ():
+        await send(_with_note(note, _season_error(season_spec)))
+        return
+    season = season_label(seasons)
+
+    team_key = _canon_team_key(tokens)
+    # 목록에 공격조합이 나오는 조회에만 보유 영웅 필터가 걸린다
+    listed = STAT_KINDS[kind]["other"] if len(team_key) == 3 else STAT_KINDS[kind]["target"]
+    roster_mask = roster_store.mask(owner) if listed == "atk" else None
+    results = raw_store.get_stats(kind, tokens, roster_mask, seasons, min_tries, rank)
+
+    if roster_mask is not None:
+        note = _with_note(note, _ROSTER_NOTE)
+    else:
+        owner = 0
+
+    if not results:
+        target = _join_team_disp(tokens) + (f" · 시즌 {season}" if season else "")
+        empty = STAT_PAGES[kind]["empty"].format(target=target, min_tries=min_tries)
+        await send(_with_note(note, empty))
+        return
+
+    embed, view = render_results_page(
+        kind, raw_store.version, team_key, results, 0, owner, roster_mask, season, min_tries, rank,
+        raw_store.season_span(seasons),
+    )
+    await send(note or None, embed=embed, view=view)
+
 
-        view = CounterView(enemy_disp, results)
-        await ctx.reply(embed=embed, view=view, mention_author=False)
+@bot.command(name="조합")
+async def combo_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        args, rank = _split_rank(args)
+        tokens = _split_csv_args(args)
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 상대 1~3명. 예) `!조합 제이브, 카구라, 트루드`", mention_author=False)
+            return
+
+        await _send_counters(_ctx_sender(ctx), tokens, ctx.author.id, rank)
 
     except Exception:
         logger.error("!조합 오류:\n" + traceback.format_exc())
@@ -149,38 +328,14 @@ async def combo_cmd(ctx: commands.Context, *, args: str = ""):
 @bot.command(name="우리공격")
 async def my_winrate_cmd(ctx: commands.Context, *, args: str = ""):
     try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
         tokens = _split_csv_args(args)
-        if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 공격조합 3명. 예) `!우리공격 트루드, 겔리두스, 라드그리드`", mention_author=False)
-            return
-
-        target_disp = _join_team_disp(tokens)
-        results = raw_store.get_my_attack_winrates(tokens)
-
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 데이터 없음\n🎯 공격 조합: `{target_disp}`\n📌 우리 길드 기준 / {common.MIN_STAT_TRIES}판 이상",
-                mention_author=False
-            )
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 공격조합 1~3명. 예) `!우리공격 트루드, 겔리두스, 라드그리드`", mention_author=False)
             return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            lines.append(
-                f"{i}. `{item['defense_disp']}` — **{item['success']}승 {item['fail']}패** "
-                f"(**{rate:.0f}%**, {item['total']}판)"
-            )
-
-        embed = build_stats_embed(
-            title="🟢 우리 공격 승률",
-            target_disp=target_disp,
-            lines=lines,
-            subtitle=f"기준=공격 · 우리 길드 실전 기록 · {common.MIN_STAT_TRIES}판 이상",
-            color=0x2ECC71,
-        )
-
-        await ctx.reply(embed=embed, mention_author=False)
+        await _send_stats(_ctx_sender(ctx), "my_attack", tokens, ctx.author.id, season_spec, _guild_id(ctx), rank)
 
     except Exception:
         logger.error("!우리공격 오류:\n" + traceback.format_exc())
@@ -189,38 +344,14 @@ async def my_winrate_cmd(ctx: commands.Context, *, args: str = ""):
 @bot.command(name="상대공격")
 async def enemy_attack_winrate_cmd(ctx: commands.Context, *, args: str = ""):
     try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
         tokens = _split_csv_args(args)
-        if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 공격조합 3명. 예) `!상대공격 트루드, 겔리두스, 라드그리드`", mention_author=False)
-            return
-
-        target_disp = _join_team_disp(tokens)
-        results = raw_store.get_enemy_attack_winrates(tokens)
-
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 데이터 없음\n🎯 공격 조합: `{target_disp}`\n📌 상대 기준(기준=방어) / {common.MIN_STAT_TRIES}판 이상",
-                mention_author=False
-            )
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 공격조합 1~3명. 예) `!상대공격 트루드, 겔리두스, 라드그리드`", mention_author=False)
             return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            lines.append(
-                f"{i}. `{item['defense_disp']}` — **{item['success']}승 {item['fail']}패** "
-                f"(**{rate:.0f}%**, {item['total']}판)"
-            )
-
-        embed = build_stats_embed(
-            title="🔴 상대 공격 승률",
-            target_disp=target_disp,
-            lines=lines,
-            subtitle=f"기준=방어 · 상대가 사용한 공격조합 성적 · {common.MIN_STAT_TRIES}판 이상",
-            color=0xE74C3C,
-        )
-
-        await ctx.reply(embed=embed, mention_author=False)
+        await _send_stats(_ctx_sender(ctx), "enemy_attack", tokens, ctx.author.id, season_spec, _guild_id(ctx), rank)
 
     except Exception:
         logger.error("!상대공격 오류:\n" + traceback.format_exc())
@@ -229,38 +360,14 @@ async def enemy_attack_winrate_cmd(ctx: commands.Context, *, args: str = ""):
 @bot.command(name="공격")
 async def global_winrate_cmd(ctx: commands.Context, *, args: str = ""):
     try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
         tokens = _split_csv_args(args)
-        if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 공격조합 3명. 예) `!공격 트루드, 겔리두스, 라드그리드`", mention_author=False)
-            return
-
-        target_disp = _join_team_disp(tokens)
-        results = raw_store.get_global_attack_winrates(tokens)
-
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 데이터 없음\n🎯 공격 조합: `{target_disp}`\n📌 전체 raw data / {common.MIN_STAT_TRIES}판 이상",
-                mention_author=False
-            )
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 공격조합 1~3명. 예) `!공격 트루드, 겔리두스, 라드그리드`", mention_author=False)
             return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            lines.append(
-                f"{i}. `{item['defense_disp']}` — **{item['success']}승 {item['fail']}패** "
-                f"(**{rate:.0f}%**, {item['total']}판)"
-            )
-
-        embed = build_stats_embed(
-            title="🔵 전체 공격 승률",
-            target_disp=target_disp,
-            lines=lines,
-            subtitle=f"전체 raw data 기준 · {common.MIN_STAT_TRIES}판 이상",
-            color=0x3498DB,
-        )
-
-        await ctx.reply(embed=embed, mention_author=False)
+        await _send_stats(_ctx_sender(ctx), "global_attack", tokens, ctx.author.id, season_spec, _guild_id(ctx), rank)
 
     except Exception:
         logger.error("!공격 오류:\n" + traceback.format_exc())
@@ -270,37 +377,14 @@ async def global_winrate_cmd(ctx: commands.Context, *, args: str = ""):
 @bot.command(name="우리방어")
 async def defense_stats_cmd(ctx: commands.Context, *, args: str = ""):
     try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
         tokens = _split_csv_args(args)
-        if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 방어조합 3명. 예) `!우리방어 브브, 여포, 파이`", mention_author=False)
-            return
-
-        target_disp = _join_team_disp(tokens)
-        results = raw_store.get_defense_stats(tokens)
-
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 방어 통계가 없습니다.\n🎯 대상 조합: `{target_disp}`\n📌 기준=방어 / {common.MIN_STAT_TRIES}판 이상",
-                mention_author=False
-            )
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 방어조합 1~3명. 예) `!우리방어 브브, 여포, 파이`", mention_author=False)
             return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            lines.append(
-                f"{i}. `{item['attack_disp']}` — **{item['success']}회 막음 / {item['fail']}회 뚫림** "
-                f"(**{rate:.0f}%**, {item['total']}판)"
-            )
-
-        embed = build_stats_embed(
-            title="🛡️ 방어 통계",
-            target_disp=target_disp,
-            lines=lines,
-            subtitle=f"기준=방어 · 상대 공격조합별 방어 성공률 · {common.MIN_STAT_TRIES}판 이상",
-            color=0x2ECC71,
-        )
-        await ctx.reply(embed=embed, mention_author=False)
+        await _send_stats(_ctx_sender(ctx), "defense", tokens, ctx.author.id, season_spec, _guild_id(ctx), rank)
 
     except Exception:
         logger.error("!우리방어 오류:\n" + traceback.format_exc())
@@ -310,37 +394,14 @@ async def defense_stats_cmd(ctx: commands.Context, *, args: str = ""):
 @bot.command(name="상대방어")
 async def attack_stats_cmd(ctx: commands.Context, *, args: str = ""):
     try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
         tokens = _split_csv_args(args)
-        if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 상대 방어조합 3명. 예) `!상대방어 브브, 여포, 파이`", mention_author=False)
-            return
-
-        target_disp = _join_team_disp(tokens)
-        results = raw_store.get_attack_stats(tokens)
-
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 공격 통계가 없습니다.\n🎯 대상 조합: `{target_disp}`\n📌 기준=공격 / {common.MIN_STAT_TRIES}판 이상",
-                mention_author=False
-            )
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 상대 방어조합 1~3명. 예) `!상대방어 브브, 여포, 파이`", mention_author=False)
             return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            lines.append(
-                f"{i}. `{item['attack_disp']}` — **{item['success']}회 성공 / {item['fail']}회 실패** "
-                f"(**{rate:.0f}%**, {item['total']}판)"
-            )
-
-        embed = build_stats_embed(
-            title="⚔️ 상대 방어 통계",
-            target_disp=target_disp,
-            lines=lines,
-            subtitle=f"기준=공격 · 우리 공격조합별 돌파율 · {common.MIN_STAT_TRIES}판 이상",
-            color=0xE67E22,
-        )
-        await ctx.reply(embed=embed, mention_author=False)
+        await _send_stats(_ctx_sender(ctx), "attack", tokens, ctx.author.id, season_spec, _guild_id(ctx), rank)
 
     except Exception:
         logger.error("!상대방어 오류:\n" + traceback.format_exc())
@@ -350,58 +411,427 @@ async def attack_stats_cmd(ctx: commands.Context, *, args: str = ""):
 @bot.command(name="방어")
 async def overall_stats_cmd(ctx: commands.Context, *, args: str = ""):
     try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
+        tokens = _split_csv_args(args)
+        if not 1 <= len(tokens) <= 3:
+            await ctx.reply("❌ 입력은 대상 방어조합 1~3명. 예) `!방어 브브, 여포, 파이`", mention_author=False)
+            return
+
+        await _send_stats(_ctx_sender(ctx), "overall", tokens, ctx.author.id, season_spec, _guild_id(ctx), rank)
+
+    except Exception:
+        logger.error("!방어 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 전체 통계 처리 중 오류가 발생했어요.", mention_author=False)
+
+
+@bot.command(name="매치업")
+async def matchup_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        args, season_spec = _split_season(args)
+        tokens = _split_csv_args(args)
+        if len(tokens) > 3:
+            await ctx.reply("❌ 입력은 방어조합 0~3명. 예) `!매치업` / `!매치업 브브, 여포` / `!매치업 @최근3`", mention_author=False)
+            return
+
+        seasons = raw_store.select_seasons(season_spec)
+        if seasons == ():
+            await ctx.reply(_season_error(season_spec), mention_author=False)
+            return
+
+        tokens, corrections = hero_index.resolve_team(tokens)
+        min_tries = guild_settings.min_tries(_guild_id(ctx))
+        summary = raw_store.get_matchup_summary(tokens, seasons=seasons, min_tries=min_tries)
+        embed = build_matchup_embed(_join_team_disp(tokens), summary, min_tries, season_label(seasons))
+        await ctx.reply(format_corrections(corrections) or None, embed=embed, mention_author=False)
+
+    except Exception:
+        logger.error("!매치업 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 매치업 처리 중 오류가 발생했어요.", mention_author=False)
+
+
+@bot.command(name="분석")
+async def report_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        args, rank = _split_rank(args)
+        args, season_spec = _split_season(args)
         tokens = _split_csv_args(args)
         if len(tokens) != 3:
-            await ctx.reply("❌ 입력은 대상 방어조합 3명. 예) `!방어 브브, 여포, 파이`", mention_author=False)
+            await ctx.reply("❌ 입력은 3명. 예) `!분석 브브, 여포, 파이` / `!분석 브브, 여포, 파이 @최근3`", mention_author=False)
+            return
+
+        seasons = raw_store.select_seasons(season_spec)
+        if seasons == ():
+            await ctx.reply(_season_error(season_spec), mention_author=False)
             return
 
-        target_disp = _join_team_disp(tokens)
-        results = raw_store.get_overall_stats(tokens)
+        tokens, corrections = hero_index.resolve_team(tokens)
+        min_tries = guild_settings.min_tries(_guild_id(ctx))
+        report = raw_store.get_report(tokens, seasons, limit=REPORT_LIMIT, min_tries=min_tries, rank=rank)
+        embed = build_report_embed(_join_team_disp(tokens), report, min_tries, season_label(seasons), rank)
+        await ctx.reply(format_corrections(corrections) or None, embed=embed, mention_author=False)
+
+    except Exception:
+        logger.error("!분석 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 조합 분석 중 오류가 발생했어요.", mention_author=False)
+
+
+# 영웅 단위 통계: 마지막 단어로 공격/방어를 고른다 (기본 공격)
+_SIDE_WORDS = {"공격": "atk", "방어": "def"}
+
 
-        if not results:
-            await ctx.reply(
-                f"⚠️ 조건에 맞는 전체 통계가 없습니다.\n🎯 대상 조합: `{target_disp}`\n📌 전체 raw data / {common.MIN_STAT_TRIES}판 이상",
-                mention_author=False
-            )
+def _split_side(args: str):
+    words = (args or "").split()
+    if words and words[-1] in _SIDE_WORDS:
+        return " ".join(words[:-1]), words[-1]
+    return " ".join(words), "공격"
+
+
+@bot.command(name="영웅순위")
+async def hero_ranking_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        rest, side_name = _split_side(args)
+        if rest:
+            await ctx.reply("❌ 예) `!영웅순위` / `!영웅순위 방어`", mention_author=False)
             return
 
-        lines = []
-        for i, item in enumerate(results[:10], 1):
-            rate = item["rate"] * 100.0
-            lines.append(
-                f"{i}. `{item['attack_disp']}` — **{item['success']}회 뚫음 / {item['fail']}회 막힘** "
-                f"(**{rate:.0f}%**, {item['total']}판)"
-            )
-
-        embed = build_stats_embed(
-            title="📊 전체 방어",
-            target_disp=target_disp,
-            lines=lines,
-            subtitle=f"전체 raw data · 공격조합별 종합 돌파율 · {common.MIN_STAT_TRIES}판 이상",
-            color=0x9B59B6,
-        )
+        min_tries = guild_settings.min_tries(_guild_id(ctx))
+        items = raw_store.get_hero_ranking(_SIDE_WORDS[side_name], limit=15, min_tries=min_tries)
+        embed = build_hero_ranking_embed(side_name, items, min_tries)
         await ctx.reply(embed=embed, mention_author=False)
 
     except Exception:
-        logger.error("!방어 오류:\n" + traceback.format_exc())
-        await ctx.reply("⚠️ 전체 통계 처리 중 오류가 발생했어요.", mention_author=False)
+        logger.error("!영웅순위 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 영웅 순위 처리 중 오류가 발생했어요.", mention_author=False)
+
+
+@bot.command(name="파트너")
+async def partner_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        rest, side_name = _split_side(args)
+        if not rest:
+            await ctx.reply("❌ 예) `!파트너 카구라` / `!파트너 카구라 방어`", mention_author=False)
+            return
+
+        hero, corrected = hero_index.resolve(rest)
+        note = format_corrections([(rest, hero)] if corrected else [])
+        min_tries = guild_settings.min_tries(_guild_id(ctx))
+        summary, items = raw_store.get_hero_partners(_SIDE_WORDS[side_name], hero, min_tries=min_tries)
+        if summary["total"] == 0:
+            await ctx.reply(_with_note(note, f"⚠️ `{hero}` 의 {side_name} 기록이 없습니다."), mention_author=False)
+            return
+
+        embed = build_partner_embed(side_name, summary, items, min_tries)
+        await ctx.reply(note or None, embed=embed, mention_author=False)
+
+    except Exception:
+        logger.error("!파트너 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 파트너 통계 처리 중 오류가 발생했어요.", mention_author=False)
+
+
+@bot.command(name="길드전")
+async def war_plan_cmd(ctx: commands.Context, *, args: str = ""):
+    usage = "❌ 예) `!길드전 브브, 여포, 파이 / 제이브, 카구라, 트루드` (보유 영웅 제한: `| 영웅1, 영웅2, ...`)"
+    try:
+        defense_part, _, roster_part = args.partition("|")
+        chunks = [c for c in re.split(r"[/;\n]", defense_part) if c.strip()]
+        if not chunks or len(chunks) > MAX_DEFENSES:
+            await ctx.reply(usage + f"\n방어조합은 1~{MAX_DEFENSES}개", mention_author=False)
+            return
+
+        corrections = []
+        defenses = []
+        for chunk in chunks:
+            tokens, fixed = hero_index.resolve_team(_split_csv_args(chunk))
+            corrections.extend(fixed)
+            if len(_canon_team_key(tokens)) != 3:
+                await ctx.reply(usage + f"\n3명이 아닌 방어조합: `{chunk.strip()}`", mention_author=False)
+                return
+            defenses.append(_canon_team_key(tokens))
+
+        roster = None
+        if roster_part.strip():
+            names, fixed = hero_index.resolve_team(_split_csv_args(roster_part))
+            corrections.extend(fixed)
+            roster = set(names)
+        elif roster_store.is_on(ctx.author.id):
+            roster = set(roster_store.get(ctx.author.id))
+
+        min_tries = guild_settings.min_tries(_guild_id(ctx))
+        candidates = [collect_candidates(data_store, raw_store, d, roster, min_tries) for d in defenses]
+        expected, assignment, exhaustive = plan_attacks(candidates)
+
+        embed = build_war_plan_embed(defenses, assignment, expected, exhaustive, len(roster or ()))
+        await ctx.reply(format_corrections(corrections) or None, embed=embed, mention_author=False)
+
+    except Exception:
+        logger.error("!길드전 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 길드전 배정 중 오류가 발생했어요.", mention_author=False)
+
+
+@bot.command(name="보유")
+async def roster_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        user_id = ctx.author.id
+        arg = args.strip()
+
+        if not arg:
+            heroes = roster_store.get(user_id)
+            if not heroes:
+                await ctx.reply("🎒 등록된 보유 영웅이 없어요. 예) `!보유 제이브, 카구라, 트루드, ...`", mention_author=False)
+                return
+            state = "켜짐" if roster_store.is_on(user_id) else "꺼짐"
+            await ctx.reply(f"🎒 보유 영웅 {len(heroes)}명 (필터 {state})\n" + ", ".join(heroes), mention_author=False)
+            return
+
+        if arg in ("켜기", "끄기"):
+            if not roster_store.set_on(user_id, arg == "켜기"):
+                await ctx.reply("❌ 먼저 `!보유 영웅1, 영웅2, ...`로 등록해 주세요.", mention_author=False)
+                return
+            await ctx.reply(f"✅ 보유 영웅 필터 {'켬' if arg == '켜기' else '끔'}", mention_author=False)
+            return
+
+        if arg == "초기화":
+            roster_store.clear(user_id)
+            await ctx.reply("✅ 보유 영웅 목록을 지웠어요.", mention_author=False)
+            return
+
+        names, corrections = hero_index.resolve_team(_split_csv_args(arg))
+        unknown = [n for n in names if n not in hero_index]
+        heroes = roster_store.set(user_id, [n for n in names if n in hero_index])
+        lines = [f"✅ 보유 영웅 {len(heroes)}명 등록 (필터 켜짐)"]
+        if unknown:
+            lines.append("❓ 데이터에 없는 영웅: " + ", ".join(f"`{n}`" for n in unknown))
+        await ctx.reply(_with_note(format_corrections(corrections), "\n".join(lines)), mention_author=False)
+
+    except Exception:
+        logger.error("!보유 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 보유 영웅 처리 중 오류가 발생했어요.", mention_author=False)
+
+
+# --- slash 명령어 ---
+# 영웅 이름은 HeroIndex 의 prefix/초성 검색으로 자동완성된다. 1~2명만 넣으면 포함 조합 조회.
+
+async def hero_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=name, value=name) for name in hero_index.complete(current)]
+
+
+async def season_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    recent = [f"최근{n}" for n in (1, 3, 5) if n <= len(raw_store.seasons)]
+    options = recent + raw_store.seasons[::-1]
+    return [app_commands.Choice(name=x, value=x) for x in options if current in x][:25]
+
+
+_RANK_CHOICES = [app_commands.Choice(name=label, value=mode) for mode, label in RANK_LABELS.items()]
+
+
+def _add_slash_query(name: str, description: str, kind: Optional[str]) -> None:
+    async def run(
+        interaction: discord.Interaction,
+        heroes,
+        season: Optional[str] = None,
+        rank: Optional[app_commands.Choice[str]] = None,
+    ) -> None:
+        tokens = [h for h in heroes if h]
+        send = _interaction_sender(interaction)
+        rank_mode = rank.value if rank else RANK_DEFAULT
+        loop_monitor.tag(f"/{name}")
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            if kind is None:
+                await _send_counters(send, tokens, interaction.user.id, rank_mode)
+            else:
+                await _send_stats(
+                    send, kind, tokens, interaction.user.id, season or "", interaction.guild_id, rank_mode,
+                )
+        except Exception:
+            status = "error"
+            logger.error(f"/{name} 오류:\n" + traceback.format_exc())
+            if not interaction.response.is_done():
+                await interaction.response.send_message("⚠️ 요청 처리 중 오류가 발생했어요.", ephemeral=True)
+        finally:
+            metrics.observe_command(f"/{name}", time.perf_counter() - start, status)
+
+    if kind is None:
+        @bot.tree.command(name=name, description=description)
+        @app_commands.rename(hero1="영웅1", hero2="영웅2", hero3="영웅3", rank="정렬")
+        @app_commands.autocomplete(hero1=hero_autocomplete, hero2=hero_autocomplete, hero3=hero_autocomplete)
+        @app_commands.choices(rank=_RANK_CHOICES)
+        async def slash_cmd(
+            interaction: discord.Interaction,
+            hero1: str,
+            hero2: Optional[str] = None,
+            hero3: Optional[str] = None,
+            rank: Optional[app_commands.Choice[str]] = None,
+        ):
+            await run(interaction, (hero1, hero2, hero3), rank=rank)
+        return
+
+    @bot.tree.command(name=name, description=description)
+    @app_commands.rename(hero1="영웅1", hero2="영웅2", hero3="영웅3", season="시즌", rank="정렬")
+    @app_commands.autocomplete(
+        hero1=hero_autocomplete, hero2=hero_autocomplete, hero3=hero_autocomplete, season=season_autocomplete,
+    )
+    @app_commands.choices(rank=_RANK_CHOICES)
+    async def slash_stats_cmd(
+        interaction: discord.Interaction,
+        hero1: str,
+        hero2: Optional[str] = None,
+        hero3: Optional[str] = None,
+        season: Optional[str] = None,
+        rank: Optional[app_commands.Choice[str]] = None,
+    ):
+        await run(interaction, (hero1, hero2, hero3), season, rank)
+
+
+_add_slash_query("조합", "상대 조합의 카운터 목록", None)
+_add_slash_query("우리공격", "우리 길드 공격조합 승률", "my_attack")
+_add_slash_query("상대공격", "상대가 사용한 공격조합 성적", "enemy_attack")
+_add_slash_query("공격", "전체 raw data 공격조합 승률", "global_attack")
+_add_slash_query("우리방어", "상대 공격조합별 방어 성공률", "defense")
+_add_slash_query("상대방어", "우리 공격조합별 돌파율", "attack")
+_add_slash_query("방어", "공격조합별 종합 돌파율", "overall")
 
 @bot.command(name="통계설정")
 async def stat_setting(ctx, n: int = None):
+    guild_id = _guild_id(ctx)
     if n is None:
         await ctx.reply(
-            f"현재 최소 표본: {common.MIN_STAT_TRIES}판",
+            f"현재 최소 표본: {guild_settings.min_tries(guild_id)}판",
             mention_author=False
         )
         return
 
-    common.MIN_STAT_TRIES = n
+    if guild_id is None:
+        await ctx.reply("❌ 최소 표본은 서버 채널에서만 바꿀 수 있어요.", mention_author=False)
+        return
+    if n < 1:
+        await ctx.reply("❌ 최소 표본은 1판 이상이어야 해요.", mention_author=False)
+        return
+
+    # 서버별로만 저장한다. 집계는 판수 순 인덱스에서 잘라 쓰므로 다시 계산할 것이 없다.
+    guild_settings.set_min_tries(guild_id, n)
 
     await ctx.reply(
-        f"최소 표본을 {n}판으로 변경했습니다.",
+        f"이 서버의 최소 표본을 {n}판으로 변경했습니다.",
         mention_author=False
     )
 
+# --- 관리자 명령어 ---
+
+async def _is_admin(ctx: commands.Context) -> bool:
+    return ctx.author.id in ADMIN_USER_IDS or await bot.is_owner(ctx.author)
+
+
+_PROFILE_USAGE = "사용법: `!프로파일 [초]` / `!프로파일 명령 [N]` / `!프로파일 메모리 [시작|중지]`"
+
+
+@bot.command(name="프로파일")
+async def profile_cmd(ctx: commands.Context, *, args: str = ""):
+    try:
+        if not await _is_admin(ctx):
+            await ctx.reply("❌ 관리자만 쓸 수 있는 명령어예요.", mention_author=False)
+            return
+
+        words = args.split()
+        if words[:1] == ["메모리"]:
+            await _send_memory_profile(ctx, words[1] if len(words) > 1 else "")
+            return
+
+        if words[:1] == ["명령"]:
+            mode = profiler.MODE_CALLS
+            limit = int(words[1]) if len(words) > 1 and words[1].isdigit() else profiler.PROFILE_DEFAULT_CALLS
+            limit = max(1, min(limit, profiler.PROFILE_MAX_CALLS))
+        elif not words or words[0].isdigit():
+            mode = profiler.MODE_TIME
+            limit = int(words[0]) if words else profiler.PROFILE_DEFAULT_SECONDS
+            limit = max(1, min(limit, profiler.PROFILE_MAX_SECONDS))
+        else:
+            await ctx.reply(_PROFILE_USAGE, mention_author=False)
+            return
+
+        if profiler.active_session() is not None:
+            await ctx.reply("❌ 이미 프로파일 중이에요. 끝난 뒤 다시 실행해 주세요.", mention_author=False)
+            return
+
+        session = profiler.ProfileSession(mode, limit)
+        await ctx.reply(f"⏱️ 프로파일 시작: {session.describe()}", mention_author=False)
+        await profiler.run_profile(session)
+
+        lines = [f"✅ 프로파일 완료: {session.summary()}"]
+        lines += [f"`{x}`" for x in profiler.top_functions(session)]
+        await ctx.reply("\n".join(lines), file=profiler.report_file("profile", session.report()), mention_author=False)
+    except Exception:
+        logger.error("!프로파일 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 프로파일 중 오류가 발생했어요.", mention_author=False)
+
+
+async def _send_memory_profile(ctx: commands.Context, action: str) -> None:
+    if action == "시작":
+        started = profiler.start_tracemalloc()
+        await ctx.reply("🧠 tracemalloc 추적 시작" if started else "이미 추적 중이에요.", mention_author=False)
+        return
+    if action == "중지":
+        stopped = profiler.stop_tracemalloc()
+        await ctx.reply("🧠 tracemalloc 추적 중지" if stopped else "추적 중이 아니에요.", mention_author=False)
+        return
+
+    targets = {
+        "data_store": data_store,
+        "raw_store": raw_store,
+        "hero_index": hero_index,
+        "roster_store": roster_store,
+        "render_cache": render_cache,
+    }
+    report, sizes = await profiler.memory_report(targets)
+    summary = " · ".join(f"{name} {profiler.fmt_bytes(size)}" for name, size in sizes.items())
+    await ctx.reply(f"🧠 메모리 스냅샷: {summary}", file=profiler.report_file("memory", report), mention_author=False)
+
+
+# 스토어 메모리는 재는 데 오래 걸려서 버전이 바뀔 때만 다시 잰다 (이름 -> (버전, 크기))
+_store_sizes: Dict[str, Tuple[str, int]] = {}
+
+
+async def _memory_sizes(stores: Dict[str, object]) -> Dict[str, int]:
+    stale = {name: store for name, store in stores.items() if _store_sizes.get(name, ("",))[0] != store.version}
+    if stale:
+        measured = await asyncio.to_thread(lambda: {name: profiler.approx_size(st) for name, st in stale.items()})
+        for name, size in measured.items():
+            _store_sizes[name] = (stale[name].version, size)
+    sizes = {name: _store_sizes[name][1] for name in stores}
+    sizes["렌더 캐시"] = profiler.approx_size(render_cache)
+    return sizes
+
+
+@bot.command(name="상태")
+async def status_cmd(ctx: commands.Context):
+    try:
+        stores = {"카운터 시트": data_store, "raw 시트": raw_store}
+        sizes = await _memory_sizes(stores)
+        embed = build_status_embed(
+            {name: store.status() for name, store in stores.items()},
+            sizes,
+            render_cache,
+            bot.board_crawler,
+            notifier_manager,
+            loop_monitor.format_summary(),
+        )
+        await ctx.reply(embed=embed, mention_author=False)
+    except Exception:
+        logger.error("!상태 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 상태 조회 중 오류가 발생했어요.", mention_author=False)
+
+
+@bot.command(name="루프상태")
+async def loop_status_cmd(ctx: commands.Context):
+    try:
+        await ctx.reply(loop_monitor.format_status(), mention_author=False)
+    except Exception:
+        logger.error("!루프상태 오류:\n" + traceback.format_exc())
+        await ctx.reply("⚠️ 루프 상태 조회 중 오류가 발생했어요.", mention_author=False)
+
+
 # --- 게시판 관리 명령어 추가 ---
 @bot.command(name="게시판등록")
 async def register_board(ctx, board_id: str, *, board_name: str):
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import tempfile
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import raw_store
+from bench_data import generate_sheets
+from raw_store import STAT_KINDS, RawMatchStore
+from synergy import HeroSynergy
+
+logger = logging.getLogger("counter-bot")
+
+
+# 집계 모듈의 회귀 확인용 스크립트. 실패한 항목이 있으면 exit 1.
+#   python checks.py              # 전부
+#   python checks.py synergy      # 이름으로 골라서
+
+DELTA_CHECK_ROWS = 20000
+
+
+def check_synergy_short_teams() -> None:
+    # 3명이 안 되는 팀만 있는 묶음도 빈 자리를 건너뛰고 세야 한다
+    members = [("가", "나"), ("가", "다"), ("나",), ()]
+    success = np.array([1, 0, 1, 1])
+    s = HeroSynergy.from_members(members, success)
+    assert s.heroes == ["가", "나", "다"], s.heroes
+    assert s.hero_totals.tolist() == [2, 2, 1], s.hero_totals
+    assert s.hero_wins.tolist() == [1, 2, 0], s.hero_wins
+    pairs = sorted(zip(s.pair_a.tolist(), s.pair_b.tolist(), s.pair_wins.tolist(), s.pair_totals.tolist()))
+    assert pairs == [(0, 1, 1, 1), (0, 2, 0, 1)], pairs
+
+    # 3명 팀과 섞여도 같은 결과
+    mixed = HeroSynergy.from_members(members + [("가", "나", "다")], np.append(success, 1))
+    assert mixed.hero_totals.tolist() == [3, 3, 2], mixed.hero_totals
+
+
+def _no_bayes(x: Any) -> Any:
+    # 부분 갱신은 보정 승률 prior 를 전체 집계 때 값으로 두므로 bayes 값만 빼고 비교한다
+    if isinstance(x, dict):
+        return {k: _no_bayes(v) for k, v in x.items() if k != "bayes"}
+    if isinstance(x, (list, tuple)):
+        return [_no_bayes(v) for v in x]
+    return x
+
+
+def _raw_snapshot(store: RawMatchStore) -> Dict[str, Any]:
+    # 사용자에게 보이는 순서까지 그대로 담는다
+    snap: Dict[str, Any] = {
+        "version": store.version,
+        "seasons": store.seasons,
+        "stats": store.stats,
+        "wilson": store.ranked_stats["wilson"],
+        "team_totals": store.team_totals,
+        "attack_pairs": sorted(store.attack_pairs.items()),
+        "season_stats": store.season_stats,
+        "season_team_totals": store.season_team_totals,
+    }
+    seasons_list = [None, tuple(store.seasons[-2:])]
+    for kind in STAT_KINDS:
+        side = STAT_KINDS[kind]["target"]
+        heroes = sorted(store.hero_bits[side])[:6]
+        for rank in ("default", "wilson"):
+            for seasons in seasons_list:
+                for i in range(0, len(heroes), 2):
+                    snap[f"partial {kind} {rank} {seasons} {i}"] = store.get_stats(kind, heroes[i:i + 2], None, seasons, 1, rank)
+                for team_key in sorted(store.stats[kind])[:20]:
+                    members = list(store.team_members[side][team_key])
+                    snap[f"full {kind} {rank} {seasons} {team_key}"] = store.get_stats(kind, members, None, seasons, 3, rank)
+    for seasons in seasons_list:
+        snap[f"matchup {seasons}"] = store.get_matchup_summary((), 50, seasons, 1)
+    for side in ("atk", "def"):
+        snap[f"heroes {side}"] = store.get_hero_ranking(side, 50, 1)
+        snap[f"partners {side}"] = [store.get_hero_partners(side, h, 50, 1) for h in store.synergy[side].heroes]
+    return _no_bayes(snap)
+
+
+def _diff_keys(a: Dict[str, Any], b: Dict[str, Any]) -> List[str]:
+    return [k for k in sorted(set(a) | set(b)) if a.get(k) != b.get(k)]
+
+
+def check_raw_delta_matches_full() -> None:
+    # 부분 갱신(이전 로드 + 바뀐 행) 결과가 같은 시트를 처음부터 읽은 결과와 순서까지 같아야 한다
+    saved = raw_store.RAW_DELTA_MAX_RATIO, raw_store.RAW_DELTA_PRIOR_DRIFT
+    raw_store.RAW_DELTA_MAX_RATIO, raw_store.RAW_DELTA_PRIOR_DRIFT = 1.0, 1.0
+    try:
+        with tempfile.TemporaryDirectory(prefix="rayabot-check-") as tmp:
+            tmp_dir = Path(tmp)
+            _, raw_path, _ = generate_sheets(tmp_dir, DELTA_CHECK_ROWS, seed=7)
+            src = pd.read_csv(raw_path, dtype=str, keep_default_na=False)
+            rng = np.random.default_rng(7)
+            n = len(src)
+
+            short = src.iloc[:5].copy()
+            short["공격조합3"] = ""
+            short["공격key"] = ""
+            short["공격조합"] = ""
+
+            mixed = src.copy()
+            edit = rng.choice(n - 1000, 300, replace=False)
+            mixed.loc[edit, "승패여부"] = np.where(mixed.loc[edit, "승패여부"] == "승", "패", "승")
+            mixed.loc[edit[:100], "시즌"] = "1"
+            mixed = mixed.drop(index=rng.choice(n - 1000, 200, replace=False))
+            extra = src.iloc[:30].copy()
+            extra["방어조합1"] = "새영웅"
+            extra["방어key"] = ""
+            extra["방어조합"] = ""
+            extra["시즌"] = "99"
+            mixed = pd.concat([mixed, extra], ignore_index=True)
+
+            scenarios = {
+                "append": (src.iloc[:n - 500], pd.concat([src, short], ignore_index=True)),
+                "mixed": (src.iloc[:n - 1000], mixed),
+                "drop_season": (src, src[src["시즌"] != src["시즌"].iloc[0]]),
+                "same": (src, src),
+            }
+            for name, (before, after) in scenarios.items():
+                before_path, after_path = tmp_dir / f"{name}_before.csv", tmp_dir / f"{name}_after.csv"
+                before.to_csv(before_path, index=False)
+                after.to_csv(after_path, index=False)
+
+                delta = RawMatchStore("", "0", str(before_path))
+                delta.load()
+                delta.csv_path = str(after_path)
+                delta.load()
+                full = RawMatchStore("", "0", str(after_path))
+                full.load()
+
+                assert not delta.load_mode.startswith("전체"), f"{name}: {delta.load_mode}"
+                diff = _diff_keys(_raw_snapshot(delta), _raw_snapshot(full))
+                assert not diff, f"{name}: {diff[:5]}"
+
+                # bayes 목록은 부분 갱신 쪽 prior 로 (점수, 판수) 내림차순, 동률이면 상대 key 순이어야 한다
+                for kind, by_target in delta.ranked_stats["bayes"].items():
+                    key_field = f"{raw_store._SIDE_NAMES[STAT_KINDS[kind]['other']]}_key"
+                    for items in by_target.values():
+                        want = sorted(sorted(items, key=lambda x: x[key_field]), key=lambda x: (x["bayes"], x["total"]), reverse=True)
+                        assert [id(x) for x in items] == [id(x) for x in want], f"{name}: {kind} bayes 순서"
+    finally:
+        raw_store.RAW_DELTA_MAX_RATIO, raw_store.RAW_DELTA_PRIOR_DRIFT = saved
+
+
+CHECKS: Dict[str, Callable[[], None]] = {
+    "synergy": check_synergy_short_teams,
+    "raw_delta": check_raw_delta_matches_full,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="집계 회귀 확인")
+    parser.add_argument("names", nargs="*", help=f"돌릴 항목 (기본: 전부, {', '.join(CHECKS)})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    failed: List[str] = []
+    for name in args.names or list(CHECKS):
+        try:
+            CHECKS[name]()
+        except Exception:
+            failed.append(name)
+            print(f"FAIL {name}\n" + traceback.format_exc(), file=sys.stderr)
+        else:
+            print(f"ok   {name}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
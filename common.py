@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import re
-from typing import Any, List, Optional, Sequence, Tuple
+import shutil
+import tempfile
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
 from urllib.parse import urlencode
 
+import numpy as np
 import pandas as pd
 
 
 MIN_STAT_TRIES = 3
 _GS_PREFIX = "https://docs.google.com/spreadsheets/d/"
+# CSV export 를 받을 주소. 로컬 stand-in 서버(standin_server.py)로 돌릴 때 바꾼다.
+SHEETS_BASE_URL_DEFAULT = "https://docs.google.com"
 
 
 def _s(val: Any) -> str:
@@ -17,6 +27,27 @@ def _s(val: Any) -> str:
     return str(val).strip()
 
 
+def _str_values(series: pd.Series) -> List[str]:
+    # 컬럼 값을 _s 처리한 파이썬 문자열 목록으로. category 면 category 마다 한 번만 다듬는다.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        cats = np.array([_s(c) for c in series.cat.categories] + [""], dtype=object)
+        # 값이 없는 칸(code -1)은 마지막 "" 를 가리킨다
+        return cats[series.cat.codes.to_numpy()].tolist()
+    return [_s(v) for v in series.tolist()]
+
+
+def _int_column(series: pd.Series) -> pd.Series:
+    # _safe_int 와 같은 규칙(소수는 버림, 못 읽으면 0)을 컬럼 단위로
+    values = pd.to_numeric(series.astype(str).str.strip(), errors="coerce")
+    values = values.where(np.isfinite(values), 0)
+    return pd.Series(np.trunc(values.to_numpy(dtype=np.float64)).astype(np.int32), index=series.index)
+
+
+def _min_tries(value: Optional[int] = None) -> int:
+    # 서버별 설정이 없으면 기본값
+    return MIN_STAT_TRIES if value is None else value
+
+
 def _is_yes(val: Any) -> bool:
     return _s(val).upper() == "Y"
 
@@ -46,6 +77,74 @@ def _join_team_disp(names: Sequence[Any]) -> str:
     return ", ".join(_canon_team_key(names))
 
 
+def _df_version(df: pd.DataFrame) -> str:
+    # 시트 내용이 같으면 재시작 후에도 같은 값이 나오도록 내용 해시로 버전을 만든다
+    h = hashlib.sha1("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()[:8]
+
+
+def _combine_versions(*versions: str) -> str:
+    # 여러 데이터에서 만든 결과의 버전. 하나라도 바뀌면 값이 바뀐다 (길이는 _df_version 과 같음)
+    return hashlib.sha1(":".join(versions).encode("utf-8")).hexdigest()[:8]
+
+
+def _hero_bitsets(teams: Sequence[Sequence[str]]) -> Dict[str, int]:
+    # 영웅 -> 그 영웅이 들어간 팀 번호들의 bitset (팀 번호 = teams 의 index)
+    ids: Dict[str, List[int]] = {}
+    for i, members in enumerate(teams):
+        for hero in members:
+            ids.setdefault(hero, []).append(i)
+
+    bits: Dict[str, int] = {}
+    for hero, team_ids in ids.items():
+        mask = np.zeros(len(teams), dtype=bool)
+        mask[team_ids] = True
+        bits[hero] = int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+    return bits
+
+
+def _match_bitset(bits: Dict[str, int], heroes: Sequence[str]) -> int:
+    result = -1
+    for hero in heroes:
+        result &= bits.get(hero, 0)
+    return result if heroes else 0
+
+
+def _iter_bits(bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+# 영웅 이름 -> 비트 번호. 보유 영웅 mask 와 팀 mask 가 같은 번호를 써야 해서 프로세스에 하나만 둔다.
+_HERO_BIT_IDS: Dict[str, int] = {}
+
+
+def _team_mask(heroes: Iterable[str]) -> int:
+    # 팀에 들어간 영웅 비트를 OR. 처음 보는 영웅은 새 번호를 받는다.
+    mask = 0
+    for hero in heroes:
+        if hero:
+            mask |= 1 << _HERO_BIT_IDS.setdefault(hero, len(_HERO_BIT_IDS))
+    return mask
+
+
+def _roster_mask(heroes: Iterable[str]) -> int:
+    # 아직 어떤 팀에도 없는 영웅은 비트가 없으니 건너뛴다 (입력으로 번호가 늘어나지 않게)
+    mask = 0
+    for hero in heroes:
+        bit = _HERO_BIT_IDS.get(hero)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def _fits_roster(team_mask: int, roster_mask: Optional[int]) -> bool:
+    return roster_mask is None or not team_mask & ~roster_mask
+
+
 def _split_csv_args(s: str) -> List[str]:
     if not s:
         return []
@@ -86,8 +185,63 @@ def _guess_gid_from_url(url: str) -> Optional[int]:
 
 def _csv_url_from_sheet(sheet_url_or_id: str, gid: Optional[int]) -> str:
     sheet_id = _extract_sheet_id(sheet_url_or_id)
-    base = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export"
+    base_url = os.getenv("SHEETS_BASE_URL", SHEETS_BASE_URL_DEFAULT).rstrip("/")
+    base = f"{base_url}/spreadsheets/d/{sheet_id}/export"
     params = {"format": "csv"}
     if gid is not None:
         params["gid"] = str(gid)
     return f"{base}?{urlencode(params)}"
+
+
+def _fetch_csv_bytes(source: str, timeout: float = 30.0) -> bytes:
+    # 다운로드와 파싱 시간을 따로 재려고 바이트를 먼저 받아 둔다. 로컬 경로면 그냥 읽는다.
+    if "://" not in str(source):
+        with open(source, "rb") as f:
+            return f.read()
+    with urllib.request.urlopen(source, timeout=timeout) as resp:
+        return resp.read()
+
+
+@contextmanager
+def _downloaded_csv(source: str, timeout: float = 30.0) -> Iterator[str]:
+    # 큰 시트를 메모리에 통째로 올리지 않도록 임시 파일로 받아 두고 경로를 넘긴다. 로컬 경로면 그대로.
+    if "://" not in str(source):
+        yield source
+        return
+
+    fd, path = tempfile.mkstemp(prefix="rayabot-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as f, urllib.request.urlopen(source, timeout=timeout) as resp:
+            shutil.copyfileobj(resp, f, 1 << 20)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = build()
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -1,21 +1,36 @@
 from __future__ import annotations
 
+import io
 import logging
 import os
+import time
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 from common import (
     _canon_team_key,
+    _combine_versions,
     _csv_url_from_sheet,
+    _fetch_csv_bytes,
+    _df_version,
+    _fits_roster,
     _guess_gid_from_url,
+    _hero_bitsets,
+    _int_column,
     _is_yes,
+    _iter_bits,
+    _join_team_key,
+    _match_bitset,
     _s,
-    _safe_int,
+    _str_values,
+    _team_mask,
     _winrate,
 )
+import metrics
+from ranking import RANK_DEFAULT, SCORE_MODES, prior_rate, score_columns
 
 logger = logging.getLogger("counter-bot")
 
@@ -47,85 +62,274 @@ POS_COLS = [
     ("pos5", "pos5_set", "pos5_opt", "pos5_ring"),
 ]
 
+# 컬럼 schema. 검색/정렬에 쓰는 짧고 반복이 많은 값은 category, 전적은 정수로 읽는다.
+COUNTER_CATEGORY_COLUMNS = [
+    "enemy1", "enemy2", "enemy3",
+    "counter1", "counter2", "counter3",
+    "first", "disable", "recommend",
+]
+COUNTER_INT_COLUMNS = ["win", "lose"]
+# 상세 보기에서만 읽는 글 컬럼. 인덱스 항목에는 넣지 않고 details 에 따로 두었다가 고를 때 꺼낸다.
+# notes 만 자유 입력이라 object 로 두고 나머지(세팅/스킬 이름 등)는 category.
+COUNTER_DETAIL_COLUMNS = [c for cols in POS_COLS for c in cols] + [
+    "formation", "skill1", "skill2", "skill3", "pet", "notes",
+]
+COUNTER_TEXT_COLUMNS = ["notes"]
+
+
+def _typed_counter_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        logger.warning(f"카운터 시트 누락 컬럼 자동 생성: {missing}")
+        for c in missing:
+            df[c] = ""
+
+    # 시트에만 있고 어디서도 안 읽는 컬럼은 버린다
+    df = df[REQUIRED_COLUMNS].copy()
+    for c in COUNTER_INT_COLUMNS:
+        df[c] = _int_column(df[c])
+    for c in COUNTER_CATEGORY_COLUMNS + COUNTER_DETAIL_COLUMNS:
+        if c not in COUNTER_TEXT_COLUMNS:
+            df[c] = df[c].astype("category")
+    return df
+
 
 class DataStore:
-    def __init__(self, sheet_url: str):
+    def __init__(self, sheet_url: str, csv_path: Optional[str] = None):
         self.sheet_url = os.getenv("DATA_SHEET_URL") or sheet_url
+        # 지정하면 Google Sheets 대신 로컬 CSV 를 읽는다 (벤치마크/오프라인 테스트용)
+        self.csv_path = csv_path
+        # 인덱스에 쓰는 컬럼만 남긴 시트 (id/영웅/선공/전적/표시). 상세 글 컬럼은 details 에 있다.
         self.df: Optional[pd.DataFrame] = None
+        # 시트 행 번호 -> 상세 보기용 글 컬럼. 항목의 "row" 로 찾는다 (with_details)
+        self.details: Optional[pd.DataFrame] = None
+        self.version: str = ""
+        # 시트 내용만으로 만든 버전. raw 성적을 붙이면 version 은 둘을 합친 값이 된다.
+        self.sheet_version: str = ""
+        self.by_enemy: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        # 정렬 방식(wilson/bayes) -> 상대 조합 -> (추천, 점수, 판수) 순 목록. 항목은 by_enemy 와 공유한다.
+        self.ranked_by_enemy: Dict[str, Dict[Tuple[str, ...], List[Dict[str, Any]]]] = {}
+        # 1~2명 조회용: 상대 조합 번호 -> key, 영웅 -> 상대 조합 번호 bitset
+        self.enemy_keys: List[Tuple[str, ...]] = []
+        self.enemy_bits: Dict[str, int] = {}
+        # 마지막 로드의 단계별 시간(download/parse/index, 초)과 성공 시각(epoch)
+        self.load_phases: Dict[str, float] = {}
+        self.loaded_at: float = 0.0
+        # raw 성적이 붙은 카운터 수 (attach_raw_stats)
+        self.raw_matched = 0
 
     def load(self) -> None:
+        phases: Dict[str, float] = {}
+        ok = False
         try:
-            gid = _guess_gid_from_url(self.sheet_url)
-            csv_url = _csv_url_from_sheet(self.sheet_url, gid)
+            csv_url = self.csv_path or _csv_url_from_sheet(self.sheet_url, _guess_gid_from_url(self.sheet_url))
             logger.info(f"Loading counter sheet CSV: {csv_url}")
 
-            df = pd.read_csv(csv_url, dtype=str, keep_default_na=False)
-            df.columns = [str(c).strip() for c in df.columns]
-
-            missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
-            if missing:
-                logger.warning(f"카운터 시트 누락 컬럼 자동 생성: {missing}")
-                for c in missing:
-                    df[c] = ""
+            t0 = time.perf_counter()
+            data = _fetch_csv_bytes(csv_url)
+            t1 = time.perf_counter()
+            df = _typed_counter_frame(pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False))
+            t2 = time.perf_counter()
+            phases["download"], phases["parse"] = t1 - t0, t2 - t1
 
-            self.df = df
-            logger.info(f"Loaded counter data: shape={df.shape}")
+            self.by_enemy, self.ranked_by_enemy = self._build_index(df)
+            self.enemy_keys = list(self.by_enemy)
+            self.enemy_bits = _hero_bitsets(self.enemy_keys)
+            self.sheet_version = _df_version(df)
+            self.version = self.sheet_version
+            self.df = df.drop(columns=COUNTER_DETAIL_COLUMNS)
+            self.details = df[COUNTER_DETAIL_COLUMNS]
+            phases["index"] = time.perf_counter() - t2
+            self.loaded_at = time.time()
+            ok = True
+            logger.info(f"Loaded counter data: shape={df.shape}, version={self.version}, teams={len(self.by_enemy)}")
         except Exception:
             logger.error("카운터 데이터 로드 실패:\n" + traceback.format_exc())
             self.df = None
+            self.details = None
+            self.version = ""
+            self.sheet_version = ""
+            self.by_enemy = {}
+            self.ranked_by_enemy = {}
+            self.enemy_keys = []
+            self.enemy_bits = {}
+        finally:
+            self.load_phases = phases
+            metrics.observe_load("counter", phases, ok)
 
-    def search_by_enemy(self, enemy_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
+    def status(self) -> Dict[str, Any]:
+        # !상태 용 요약. 메모리는 비싸서 호출하는 쪽에서 따로 잰다.
+        return {
+            "version": self.version,
+            "rows": 0 if self.df is None else len(self.df),
+            "loaded_at": self.loaded_at,
+            "load_phases": dict(self.load_phases),
+            "index": {
+                "상대 조합": len(self.by_enemy),
+                "카운터": sum(len(v) for v in self.by_enemy.values()),
+                "raw 연결": self.raw_matched,
+                "영웅 bitset": len(self.enemy_bits),
+            },
+        }
 
-        want = _canon_team_key(enemy_team_input)
-        if len(want) != 3:
-            return results
+    def _build_index(self, df: pd.DataFrame):
+        keys: List[Tuple[str, ...]] = []
+        rows: List[Dict[str, Any]] = []
+
+        # iterrows 대신 필요한 컬럼만 파이썬 목록으로 한 번 꺼내서 돈다
+        ids = _str_values(df["id"])
+        enemies = zip(*(_str_values(df[c]) for c in ("enemy1", "enemy2", "enemy3")))
+        counters = zip(*(_str_values(df[c]) for c in ("counter1", "counter2", "counter3")))
+        firsts = _str_values(df["first"])
+        disables = _str_values(df["disable"])
+        recommends = _str_values(df["recommend"])
+        wins = df["win"].tolist()
+        loses = df["lose"].tolist()
 
-        for _, row in self.df.iterrows():
-            if _is_yes(row.get("disable")):
+        for row, (enemy, counter_disp) in enumerate(zip(enemies, counters)):
+            if _is_yes(disables[row]):
                 continue
 
-            enemy_key = _canon_team_key([row.get("enemy1"), row.get("enemy2"), row.get("enemy3")])
-            if enemy_key != want:
+            enemy_key = _canon_team_key(enemy)
+            if len(enemy_key) != 3:
                 continue
 
-            counter_disp = [_s(row.get("counter1")), _s(row.get("counter2")), _s(row.get("counter3"))]
+            counter_disp = list(counter_disp)
             if not any(counter_disp):
                 continue
 
-            win = _safe_int(row.get("win"))
-            lose = _safe_int(row.get("lose"))
+            win = wins[row]
+            lose = loses[row]
             total = win + lose
 
             item = {
-                "id": _s(row.get("id")),
-                "enemy_disp": ", ".join(want),
+                "id": ids[row],
+                # details 에서 상세 글 컬럼을 찾을 시트 행 번호
+                "row": row,
+                "enemy_disp": ", ".join(enemy_key),
                 "counter_disp": counter_disp,
-                "first": _s(row.get("first")) or "정보 없음",
+                "counter_key": _join_team_key(counter_disp),
+                "counter_mask": _team_mask(counter_disp),
+                "first": firsts[row] or "정보 없음",
                 "win": win,
                 "lose": lose,
                 "total": total,
                 "rate": _winrate(win, lose),
-                "formation": _s(row.get("formation")),
-                "pet": _s(row.get("pet")),
-                "notes": _s(row.get("notes")),
-                "skill_texts": [_s(row.get("skill1")), _s(row.get("skill2")), _s(row.get("skill3"))],
-                "positions": [],
-                "recommend": _is_yes(row.get("recommend")),
+                "recommend": _is_yes(recommends[row]),
+                # 전체 raw data 에서 같은 (상대, 카운터) 쌍의 실전 성적. attach_raw_stats 에서 채운다.
+                "raw": None,
             }
 
-            for p, s_col, o_col, r_col in POS_COLS:
-                item["positions"].append({
-                    "pos": p,
-                    "unit": _s(row.get(p)),
-                    "set": _s(row.get(s_col)),
-                    "opt": _s(row.get(o_col)),
-                    "ring": _s(row.get(r_col)),
-                })
+            keys.append(enemy_key)
+            rows.append(item)
+
+        # 정렬용 숫자 열을 한 번에 만들고 상대 조합별 순서는 lexsort 로 정한다 (동점이면 시트 순서 유지)
+        n = len(rows)
+        win = np.fromiter((x["win"] for x in rows), dtype=np.int64, count=n)
+        total = np.fromiter((x["total"] for x in rows), dtype=np.int64, count=n)
+        rate = np.fromiter((x["rate"] for x in rows), dtype=np.float64, count=n)
+        rec = np.fromiter((x["recommend"] for x in rows), dtype=np.int64, count=n)
+        scores = score_columns(win, total, prior_rate(win, total))
+        for mode in SCORE_MODES:
+            for item, value in zip(rows, scores[mode].tolist()):
+                item[mode] = value
+
+        codes, _ = pd.factorize(pd.Series(["|".join(k) for k in keys], dtype=object))
+        index: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for i in np.lexsort((-total, -rate, -rec, codes)).tolist():
+            index.setdefault(keys[i], []).append(rows[i])
+        for items in index.values():
+            # 보유 영웅으로 걸러낸 목록에서도 원래 순번(get_counter 의 idx)을 알 수 있게 남겨둔다
+            for idx, item in enumerate(items):
+                item["idx"] = idx
+
+        ranked: Dict[str, Dict[Tuple[str, ...], List[Dict[str, Any]]]] = {}
+        for mode in SCORE_MODES:
+            by_mode: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for i in np.lexsort((-total, -scores[mode], -rec, codes)).tolist():
+                by_mode.setdefault(keys[i], []).append(rows[i])
+            ranked[mode] = by_mode
+        return index, ranked
+
+    def attach_raw_stats(self, raw_store) -> int:
+        # 손으로 적은 win/lose 옆에 raw 실전 성적을 붙인다. 조회 때는 item["raw"] 만 읽으면 된다.
+        matched = 0
+        for enemy_key, items in self.by_enemy.items():
+            defense_key = "".join(enemy_key)
+            for item in items:
+                item["raw"] = raw_store.get_attack_pair(defense_key, item["counter_key"])
+                matched += item["raw"] is not None
+        self.raw_matched = matched
+
+        # raw 가 바뀌면 같은 카운터 시트라도 화면이 달라지므로 캐시/버튼 버전에 raw 버전을 섞는다
+        if self.sheet_version and raw_store.version:
+            self.version = _combine_versions(self.sheet_version, raw_store.version)
+        else:
+            self.version = self.sheet_version
+        logger.info(f"Attached raw stats to counters: matched={matched}, version={self.version}")
+        return matched
+
+    def search_by_enemy(
+        self,
+        enemy_team_input: List[str],
+        roster_mask: Optional[int] = None,
+        rank: str = RANK_DEFAULT,
+    ) -> List[Dict[str, Any]]:
+        want = _canon_team_key(enemy_team_input)
+        if len(want) != 3:
+            return []
+        by_enemy = self.by_enemy if rank == RANK_DEFAULT else self.ranked_by_enemy.get(rank, {})
+        items = by_enemy.get(want, [])
+        if roster_mask is None:
+            return list(items)
+        return [x for x in items if _fits_roster(x["counter_mask"], roster_mask)]
+
+    def find_enemy_teams(self, heroes: List[str]) -> List[Dict[str, Any]]:
+        # 상대 영웅을 1~2명만 알 때: 그 영웅이 모두 들어간 상대 조합과 카운터 요약
+        want = _canon_team_key(heroes)
+        if not 1 <= len(want) <= 2:
+            return []
+
+        teams: List[Dict[str, Any]] = []
+        for i in _iter_bits(_match_bitset(self.enemy_bits, want)):
+            enemy_key = self.enemy_keys[i]
+            items = self.by_enemy[enemy_key]
+            best = max(items, key=lambda x: (x["rate"], x["total"]))
+            teams.append({
+                "enemy_key": enemy_key,
+                "enemy_disp": ", ".join(enemy_key),
+                "count": len(items),
+                "best_rate": best["rate"],
+                "best_total": best["total"],
+                "recommend": any(x.get("recommend") for x in items),
+            })
+
+        teams.sort(key=lambda x: (x["count"], x["best_rate"], x["best_total"]), reverse=True)
+        return teams
+
+    def with_details(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        # 상세 보기용: 인덱스 항목에 진형/펫/스킬/메모/자리별 세팅을 붙인 새 dict
+        row = self.details.iloc[item["row"]] if self.details is not None else {}
+
+        def text(col: str) -> str:
+            return _s(row.get(col, ""))
 
-            results.append(item)
+        return {
+            **item,
+            "formation": text("formation"),
+            "pet": text("pet"),
+            "notes": text("notes"),
+            "skill_texts": [text("skill1"), text("skill2"), text("skill3")],
+            "positions": [
+                {"pos": p, "unit": text(p), "set": text(s_col), "opt": text(o_col), "ring": text(r_col)}
+                for p, s_col, o_col, r_col in POS_COLS
+            ],
+        }
 
-        results.sort(key=lambda x: (1 if x.get("recommend") else 0, x["rate"], x["total"]), reverse=True)
-        return results
\ No newline at end of file
+    def get_counter(self, enemy_key: Sequence[str], idx: int) -> Optional[Dict[str, Any]]:
+        items = self.by_enemy.get(_canon_team_key(enemy_key), [])
+        if 0 <= idx < len(items):
+            return items[idx]
+        return None
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import discord
 
-from common import _badge_for_item, _format_blockquote
+import loop_monitor
+import metrics
+from common import LRUCache, _badge_for_item, _format_blockquote, _min_tries
+from ranking import RANK_DEFAULT, RANK_LABELS, RANK_SHORT
+from raw_store import season_label
 
 
 FORMATION_LAYOUT: Dict[str, Dict[str, List[int]]] = {
@@ -15,6 +22,18 @@ FORMATION_LAYOUT: Dict[str, Dict[str, List[int]]] = {
 }
 
 
+def _raw_detail_text(raw: Optional[Dict[str, Any]]) -> str:
+    if not raw:
+        return "📈 실전(raw): 기록 없음"
+    return f"📈 실전(raw): **{raw['success']}승 {raw['fail']}패** (승률 **{raw['rate'] * 100.0:.1f}%**, {raw['total']}판)"
+
+
+def _raw_list_text(raw: Optional[Dict[str, Any]]) -> str:
+    if not raw:
+        return ""
+    return f" · 실전 {raw['rate'] * 100.0:.0f}% ({raw['total']}판)"
+
+
 def build_detail_embed(enemy_disp: str, item: Dict[str, Any]) -> discord.Embed:
     win, lose = item["win"], item["lose"]
     total = win + lose
@@ -31,7 +50,8 @@ def build_detail_embed(enemy_disp: str, item: Dict[str, Any]) -> discord.Embed:
         description=(
             f"🛡️ 카운터: `{counter_combo}`"
             f"{badge}\n"
-            f"📊 전적: **{win}승 {lose}패** (승률 **{rate:.1f}%**, {total}판)"
+            f"📊 전적: **{win}승 {lose}패** (승률 **{rate:.1f}%**, {total}판)\n"
+            f"{_raw_detail_text(item.get('raw'))}"
         ),
         color=color
     )
@@ -111,40 +131,683 @@ def build_stats_embed(
     )
 
 
+# !분석: 공격조합으로서 / 방어조합으로서 순서
+REPORT_KINDS = ["global_attack", "my_attack", "enemy_attack", "overall", "attack", "defense"]
+REPORT_LIMIT = 5
+
+
+def build_report_embed(
+    team_disp: str,
+    report: Dict[str, Dict[str, Any]],
+    min_tries: int,
+    season: str = "",
+    rank: str = RANK_DEFAULT,
+) -> discord.Embed:
+    source = f"시즌 {season}" if season else "전체 raw data"
+    order = f" · {RANK_LABELS[rank]}순" if rank != RANK_DEFAULT else ""
+    embed = discord.Embed(
+        title="🔎 조합 분석",
+        description=f"🎯 대상 조합: `{team_disp}`\n📌 {source} · 상대별 {min_tries}판 이상 · 관점별 상위 {REPORT_LIMIT}개{order}",
+        color=0x34495E,
+    )
+
+    for kind in REPORT_KINDS:
+        spec = STAT_PAGES[kind]
+        section = report.get(kind) or {}
+        summary = section.get("summary")
+
+        name = spec["title"]
+        if summary and summary["total"] > 0:
+            name += f" · {summary['total']}판 {summary['rate'] * 100.0:.0f}%"
+
+        lines = [
+            f"{i}. " + spec["line"].format(disp=item[spec["disp"]], **item)
+            + f" (**{item['rate'] * 100.0:.0f}%**, {item['total']}판{_score_text(item, rank)})"
+            for i, item in enumerate(section.get("items", []), 1)
+        ]
+        more = section.get("count", 0) - len(lines)
+        if more > 0:
+            lines.append(f"… 외 {more}개")
+        embed.add_field(name=name[:256], value="\n".join(lines)[:1024] or "기록 없음", inline=False)
+    return embed
+
+
+def build_matchup_embed(
+    target_disp: str,
+    summary: Dict[str, List[Dict[str, Any]]],
+    min_tries: int,
+    season: str = "",
+) -> discord.Embed:
+    scope = f"`{target_disp}` 포함 방어조합 상대" if target_disp else "전체 방어조합 상대"
+    source = f"시즌 {season}" if season else "전체 raw data"
+    embed = discord.Embed(
+        title="🧮 매치업 요약",
+        description=f"🎯 {scope}\n📌 {source} · {min_tries}판 이상",
+        color=0x1ABC9C,
+    )
+
+    atk_lines = [
+        f"{i}. `{x['attack_disp']}` — **{x['success']}승** / {x['total']}판 (**{x['rate'] * 100.0:.0f}%**)"
+        for i, x in enumerate(summary.get("attacks", []), 1)
+    ]
+    def_lines = [
+        f"{i}. `{x['defense_disp']}` — **{x['success']}회 뚫림** / {x['total']}판 (**{x['rate'] * 100.0:.0f}%**)"
+        for i, x in enumerate(summary.get("defenses", []), 1)
+    ]
+    embed.add_field(name="⚔️ 가장 잘 뚫는 공격조합", value="\n".join(atk_lines)[:1024] or "조건에 맞는 통계가 없습니다.", inline=False)
+    embed.add_field(name="🛡️ 가장 단단한 방어조합", value="\n".join(def_lines)[:1024] or "조건에 맞는 통계가 없습니다.", inline=False)
+    return embed
+
+
+def build_hero_ranking_embed(side_name: str, items: List[Dict[str, Any]], min_tries: int) -> discord.Embed:
+    lines = [
+        f"{i}. `{x['hero']}` — **{x['rate'] * 100.0:.0f}%** ({x['success']}승 / {x['total']}판)"
+        for i, x in enumerate(items, 1)
+    ]
+    return discord.Embed(
+        title=f"🏆 {side_name} 영웅 승률 순위",
+        description=(
+            f"📌 전체 raw data · 영웅이 들어간 {side_name}조합 기준 · {min_tries}판 이상\n\n"
+            + ("\n".join(lines) or "조건에 맞는 통계가 없습니다.")
+        )[:4096],
+        color=0xE67E22,
+    )
+
+
+def build_partner_embed(
+    side_name: str,
+    hero: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    min_tries: int,
+) -> discord.Embed:
+    lines = [
+        f"{i}. `{x['hero']}` — **{x['rate'] * 100.0:.0f}%** ({x['total']}판) · {x['lift'] * 100.0:+.0f}%p"
+        for i, x in enumerate(items, 1)
+    ]
+    return discord.Embed(
+        title=f"🤝 {hero['hero']} 파트너 ({side_name})",
+        description=(
+            f"🎯 `{hero['hero']}` 단독: **{hero['rate'] * 100.0:.0f}%** ({hero['total']}판)\n"
+            f"📌 같은 {side_name}조합에 들어간 영웅별 승률 · 괄호 뒤는 단독 대비 · {min_tries}판 이상\n\n"
+            + ("\n".join(lines) or "조건에 맞는 통계가 없습니다.")
+        )[:4096],
+        color=0xE67E22,
+    )
+
+
+def build_war_plan_embed(
+    defenses: List[Sequence[str]],
+    assignment: List[Optional[Dict[str, Any]]],
+    expected: float,
+    exhaustive: bool,
+    roster_size: int = 0,
+) -> discord.Embed:
+    lines = []
+    for i, (defense, pick) in enumerate(zip(defenses, assignment), 1):
+        lines.append(f"**{i}.** 🛡️ `{', '.join(defense)}`")
+        if pick is None:
+            lines.append("　→ 배정 가능한 공격조합 없음")
+            continue
+        source = "raw" if pick["source"] == "raw" else "카운터"
+        lines.append(
+            f"　→ ⚔️ `{', '.join(pick['members'])}` (**{pick['rate'] * 100.0:.0f}%**, {pick['total']}판 · {source})"
+        )
+
+    scope = f"보유 영웅 {roster_size}명 기준 · " if roster_size else ""
+    embed = discord.Embed(
+        title="🏰 길드전 공격 배정",
+        description=(
+            f"📌 {scope}영웅 중복 없이 기대 승수 최대\n"
+            f"🎯 기대 승수: **{expected:.2f}** / {len(defenses)}\n\n" + "\n".join(lines)
+        )[:4096],
+        color=0x8E44AD,
+    )
+    if not exhaustive:
+        embed.set_footer(text="탐색 제한에 걸려 최적이 아닐 수 있어요")
+    return embed
+
+
+# 완성된 embed 캐시. key 에 데이터 버전이 들어가므로 리로드되면 자연히 새로 만든다.
+render_cache = LRUCache(int(os.getenv("RENDER_CACHE_SIZE", "512")))
+
+# 한 페이지에 보여줄 결과 수 (기존 명령어의 results[:10] 과 동일)
+PAGE_SIZE = 10
+
+# raw 통계 종류(RawMatchStore.STAT_KINDS)별 표시 형식
+STAT_PAGES: Dict[str, Dict[str, Any]] = {
+    "defense": {
+        "title": "🛡️ 방어 통계",
+        "empty": "⚠️ 조건에 맞는 방어 통계가 없습니다.\n🎯 대상 조합: `{target}`\n📌 기준=방어 / {min_tries}판 이상",
+        "subtitle": "기준=방어 · 상대 공격조합별 방어 성공률",
+        "color": 0x2ECC71,
+        "disp": "attack_disp",
+        "line": "`{disp}` — **{success}회 막음 / {fail}회 뚫림**",
+    },
+    "my_attack": {
+        "title": "🟢 우리 공격 승률",
+        "empty": "⚠️ 조건에 맞는 데이터 없음\n🎯 공격 조합: `{target}`\n📌 우리 길드 기준 / {min_tries}판 이상",
+        "subtitle": "기준=공격 · 우리 길드 실전 기록",
+        "color": 0x2ECC71,
+        "disp": "defense_disp",
+        "line": "`{disp}` — **{success}승 {fail}패**",
+    },
+    "enemy_attack": {
+        "title": "🔴 상대 공격 승률",
+        "empty": "⚠️ 조건에 맞는 데이터 없음\n🎯 공격 조합: `{target}`\n📌 상대 기준(기준=방어) / {min_tries}판 이상",
+        "subtitle": "기준=방어 · 상대가 사용한 공격조합 성적",
+        "color": 0xE74C3C,
+        "disp": "defense_disp",
+        "line": "`{disp}` — **{success}승 {fail}패**",
+    },
+    "global_attack": {
+        "title": "🔵 전체 공격 승률",
+        "empty": "⚠️ 조건에 맞는 데이터 없음\n🎯 공격 조합: `{target}`\n📌 전체 raw data / {min_tries}판 이상",
+        "subtitle": "전체 raw data 기준",
+        "color": 0x3498DB,
+        "disp": "defense_disp",
+        "line": "`{disp}` — **{success}승 {fail}패**",
+    },
+    "attack": {
+        "title": "⚔️ 상대 방어 통계",
+        "empty": "⚠️ 조건에 맞는 공격 통계가 없습니다.\n🎯 대상 조합: `{target}`\n📌 기준=공격 / {min_tries}판 이상",
+        "subtitle": "기준=공격 · 우리 공격조합별 돌파율",
+        "color": 0xE67E22,
+        "disp": "attack_disp",
+        "line": "`{disp}` — **{success}회 성공 / {fail}회 실패**",
+    },
+    "overall": {
+        "title": "📊 전체 방어",
+        "empty": "⚠️ 조건에 맞는 전체 통계가 없습니다.\n🎯 대상 조합: `{target}`\n📌 전체 raw data / {min_tries}판 이상",
+        "subtitle": "전체 raw data · 공격조합별 종합 돌파율",
+        "color": 0x9B59B6,
+        "disp": "attack_disp",
+        "line": "`{disp}` — **{success}회 뚫음 / {fail}회 막힘**",
+    },
+}
+
+
+def _score_text(item: Dict[str, Any], rank: str) -> str:
+    # 기본 정렬이 아니면 정렬에 쓴 점수도 같이 보여준다
+    if rank == RANK_DEFAULT or rank not in item:
+        return ""
+    return f" · {RANK_SHORT[rank]} {item[rank] * 100.0:.0f}%"
+
+
+def _page_count(n: int) -> int:
+    return max(1, (n + PAGE_SIZE - 1) // PAGE_SIZE)
+
+
+def _set_page_footer(embed: discord.Embed, page: int, n: int) -> None:
+    if n > PAGE_SIZE:
+        embed.set_footer(text=f"{page + 1}/{_page_count(n)} 페이지 · 총 {n}개")
+
+
+def build_counter_page(
+    enemy_disp: str,
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    rank: str = RANK_DEFAULT,
+) -> discord.Embed:
+    start = page * PAGE_SIZE
+    lines = []
+    for i, item in enumerate(results[start:start + PAGE_SIZE], start + 1):
+        rate = item["rate"] * 100.0
+        total = item["win"] + item["lose"]
+        combo = ", ".join([x for x in item["counter_disp"] if x]) or "정보 없음"
+
+        star = _badge_for_item(item, i)
+        rec_text = "**추천** · " if item.get("recommend") else ""
+        lines.append(
+            f"{star}{i}. `{combo}` — {rec_text}**{rate:.0f}%** ({total}판{_score_text(item, rank)})"
+            + _raw_list_text(item.get("raw"))
+        )
+
+    order = "승률순" if rank == RANK_DEFAULT else f"{RANK_LABELS[rank]}순"
+    embed = discord.Embed(
+        title=f"📋 카운터 목록 (추천 우선/{order})",
+        description=f"🎯 상대 조합: `{enemy_disp}`\n\n" + "\n".join(lines),
+        color=0xF1C40F
+    )
+    _set_page_footer(embed, page, len(results))
+    return embed
+
+
+def build_counter_teams_page(hero_disp: str, teams: List[Dict[str, Any]], page: int = 0) -> discord.Embed:
+    start = page * PAGE_SIZE
+    lines = []
+    for i, team in enumerate(teams[start:start + PAGE_SIZE], start + 1):
+        rate = team["best_rate"] * 100.0
+        star = "⭐ " if team.get("recommend") else ""
+        lines.append(
+            f"{star}{i}. `{team['enemy_disp']}` — 카운터 {team['count']}개 · 최고 **{rate:.0f}%** ({team['best_total']}판)"
+        )
+
+    embed = discord.Embed(
+        title="📋 포함 조합 목록 (카운터 많은 순)",
+        description=(
+            f"🎯 포함 영웅: `{hero_disp}`\n📌 3명을 모두 입력하면 카운터 상세를 볼 수 있어요\n\n"
+            + "\n".join(lines)
+        )[:4096],
+        color=0xF1C40F
+    )
+    _set_page_footer(embed, page, len(teams))
+    return embed
+
+
+def build_stats_page(
+    kind: str,
+    target_disp: str,
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    min_tries: Optional[int] = None,
+    season: str = "",
+    rank: str = RANK_DEFAULT,
+) -> discord.Embed:
+    spec = STAT_PAGES[kind]
+    min_tries = _min_tries(min_tries)
+
+    # 1~2명 조회 결과는 상대 조합 대신 영웅이 포함된 팀(team_disp)을 나열한다
+    partial = bool(results) and "team_disp" in results[0]
+    disp_key = "team_disp" if partial else spec["disp"]
+    subtitle = f"{spec['subtitle']} · 포함 조합별 합계" if partial else spec["subtitle"]
+    if season:
+        subtitle += f" · 시즌 {season}"
+    if rank != RANK_DEFAULT:
+        subtitle += f" · {RANK_LABELS[rank]}순"
+
+    start = page * PAGE_SIZE
+    lines = []
+    for i, item in enumerate(results[start:start + PAGE_SIZE], start + 1):
+        rate = item["rate"] * 100.0
+        lines.append(
+            f"{i}. " + spec["line"].format(disp=item[disp_key], **item)
+            + f" (**{rate:.0f}%**, {item['total']}판{_score_text(item, rank)})"
+        )
+
+    embed = build_stats_embed(
+        title=spec["title"],
+        target_disp=target_disp,
+        lines=lines,
+        subtitle=f"{subtitle} · {min_tries}판 이상",
+        color=spec["color"],
+    )
+    _set_page_footer(embed, page, len(results))
+    return embed
+
+
+def cached_detail_embed(version: str, enemy_key: Sequence[str], idx: int, item: Dict[str, Any]) -> discord.Embed:
+    enemy_disp = ", ".join(enemy_key)
+    if not version:
+        return build_detail_embed(enemy_disp, item)
+    return render_cache.get_or_build(
+        ("detail", version, tuple(enemy_key), idx),
+        lambda: build_detail_embed(enemy_disp, item),
+    )
+
+
+def cached_counter_page(
+    version: str,
+    enemy_key: Sequence[str],
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    roster_mask: Optional[int] = None,
+    rank: str = RANK_DEFAULT,
+) -> discord.Embed:
+    enemy_disp = ", ".join(enemy_key)
+    if not version:
+        return build_counter_page(enemy_disp, results, page, rank)
+    return render_cache.get_or_build(
+        (COUNTER_CUSTOM_ID_PREFIX, version, tuple(enemy_key), page, roster_mask, rank),
+        lambda: build_counter_page(enemy_disp, results, page, rank),
+    )
+
+
+def cached_counter_teams_page(
+    version: str,
+    heroes: Sequence[str],
+    teams: List[Dict[str, Any]],
+    page: int = 0,
+) -> discord.Embed:
+    hero_disp = ", ".join(heroes)
+    if not version:
+        return build_counter_teams_page(hero_disp, teams, page)
+    return render_cache.get_or_build(
+        (COUNTER_TEAMS_KIND, version, tuple(heroes), page),
+        lambda: build_counter_teams_page(hero_disp, teams, page),
+    )
+
+
+def cached_stats_page(
+    kind: str,
+    version: str,
+    team_key: Sequence[str],
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    roster_mask: Optional[int] = None,
+    season: str = "",
+    min_tries: Optional[int] = None,
+    rank: str = RANK_DEFAULT,
+) -> discord.Embed:
+    team_disp = ", ".join(team_key)
+    min_tries = _min_tries(min_tries)
+    if not version:
+        return build_stats_page(kind, team_disp, results, page, min_tries, season, rank)
+    return render_cache.get_or_build(
+        (kind, version, tuple(team_key), page, min_tries, roster_mask, season, rank),
+        lambda: build_stats_page(kind, team_disp, results, page, min_tries, season, rank),
+    )
+
+
+def _counter_options(results: List[Dict[str, Any]], start: int = 0, count: int = 25) -> List[discord.SelectOption]:
+    options: List[discord.SelectOption] = []
+    for i, item in enumerate(results[start:start + count], start):
+        rank = i + 1
+        win, lose = item["win"], item["lose"]
+        total = win + lose
+        rate = item["rate"] * 100.0
+
+        combo = ", ".join([x for x in item["counter_disp"] if x]) or "정보 없음"
+        star = _badge_for_item(item, rank)
+        rec = "추천 · " if item.get("recommend") else ""
+
+        label = f"{star}{rank}. {combo}"
+        desc = f"{rec}{rate:.0f}% · {total}판"
+
+        options.append(discord.SelectOption(
+            label=label[:100],
+            description=desc[:100],
+            value=str(item.get("idx", i)),
+        ))
+    return options
+
+
 class CounterSelect(discord.ui.Select):
-    def __init__(self, enemy_disp: str, results: List[Dict[str, Any]]):
+    def __init__(self, version: str, enemy_disp: str, results: List[Dict[str, Any]]):
+        # 항목의 "row" 는 만든 시점 시트의 상세 행 번호라서 버전이 바뀌면 다른 행을 가리킨다
+        self.version = version
         self.enemy_disp = enemy_disp
         self.results = results
+        self.by_value = {str(x.get("idx", i)): x for i, x in enumerate(results)}
+        super().__init__(placeholder="보고 싶은 카운터를 선택하세요", options=_counter_options(results))
+
+    async def callback(self, interaction: discord.Interaction):
+        store = interaction.client.data_store
+        if store.version != self.version:
+            await interaction.response.send_message(_STALE_MESSAGE, ephemeral=True)
+            return
+
+        item = store.with_details(self.by_value[self.values[0]])
+        embed = build_detail_embed(self.enemy_disp, item)
+        await interaction.response.edit_message(embed=embed, view=self.view)
+
+
+class CounterView(discord.ui.View):
+    def __init__(self, version: str, enemy_disp: str, results: List[Dict[str, Any]]):
+        super().__init__(timeout=180)
+        self.add_item(CounterSelect(version, enemy_disp, results))
 
-        options: List[discord.SelectOption] = []
-        for i, item in enumerate(results[:25]):
-            rank = i + 1
-            win, lose = item["win"], item["lose"]
-            total = win + lose
-            rate = item["rate"] * 100.0
 
-            combo = ", ".join([x for x in item["counter_disp"] if x]) or "정보 없음"
-            star = _badge_for_item(item, rank)
-            rec = "추천 · " if item.get("recommend") else ""
+# --- persistent (stateless) 카운터 선택 ---
+# custom_id 에 데이터 버전 + 상대 조합 key 를 담아두고, 선택 시점에 DataStore 인덱스에서 다시 찾는다.
+# 메시지별로 들고 있는 상태가 없어서 재시작/리로드 후에도 그대로 동작한다.
 
-            label = f"{star}{rank}. {combo}"
-            desc = f"{rec}{rate:.0f}% · {total}판"
+COUNTER_CUSTOM_ID_PREFIX = "ctr"
+# 1~2명으로 조회한 상대 조합 목록의 페이지 종류
+COUNTER_TEAMS_KIND = "ctrteam"
+_CUSTOM_ID_MAX = 100
+_STALE_MESSAGE = "⚠️ 데이터가 갱신되어 이 메뉴는 만료되었어요. 명령어를 다시 실행해 주세요."
 
-            options.append(discord.SelectOption(
-                label=label[:100],
-                description=desc[:100],
-                value=str(i),
-            ))
 
-        super().__init__(placeholder="보고 싶은 카운터를 선택하세요", options=options)
+def counter_custom_id(version: str, enemy_key: Sequence[str]) -> str:
+    return f"{COUNTER_CUSTOM_ID_PREFIX}:{version}:{','.join(enemy_key)}"
+
+
+async def _timed_callback(name: str, handler, interaction: discord.Interaction) -> None:
+    # persistent 컴포넌트는 명령어 훅을 안 타서 여기서 처리 시간을 잰다
+    loop_monitor.tag(name)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        await handler(interaction)
+        status = "ok"
+    finally:
+        metrics.observe_command(name, time.perf_counter() - start, status)
+
+
+class PersistentCounterSelect(
+    discord.ui.DynamicItem[discord.ui.Select],
+    template=re.compile(r"ctr:(?P<version>[0-9a-f]+):(?P<key>[^:]+)"),
+):
+    def __init__(self, version: str, enemy_key: Sequence[str], options: List[discord.SelectOption]):
+        self.version = version
+        self.enemy_key = tuple(enemy_key)
+        super().__init__(discord.ui.Select(
+            placeholder="보고 싶은 카운터를 선택하세요",
+            options=options,
+            custom_id=counter_custom_id(version, self.enemy_key),
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match: re.Match[str], /):
+        return cls(match["version"], match["key"].split(","), item.options)
 
     async def callback(self, interaction: discord.Interaction):
-        idx = int(self.values[0])
-        embed = build_detail_embed(self.enemy_disp, self.results[idx])
+        await _timed_callback(f"select:{COUNTER_CUSTOM_ID_PREFIX}", self._select, interaction)
+
+    async def _select(self, interaction: discord.Interaction):
+        store = interaction.client.data_store
+        item = None
+        if store.version == self.version:
+            item = store.get_counter(self.enemy_key, int(self.item.values[0]))
+
+        if item is None:
+            await interaction.response.send_message(_STALE_MESSAGE, ephemeral=True)
+            return
+
+        embed = cached_detail_embed(self.version, self.enemy_key, int(self.item.values[0]), store.with_details(item))
         await interaction.response.edit_message(embed=embed, view=self.view)
 
 
-class CounterView(discord.ui.View):
-    def __init__(self, enemy_disp: str, results: List[Dict[str, Any]]):
-        super().__init__(timeout=180)
-        self.add_item(CounterSelect(enemy_disp, results))
\ No newline at end of file
+# --- 페이지 넘기기 ---
+# 버튼 custom_id 에는 (종류, 데이터 버전, 페이지, [보유 영웅 주인], [시즌], [정렬], 조합 key) 커서만 담고,
+# 누를 때마다 해당 페이지만 스토어 인덱스에서 다시 그린다.
+# 보유 영웅으로 거른 목록이면 주인 user id 를 남겨서 같은 mask 로 다시 거른다.
+
+PAGE_CUSTOM_ID_PREFIX = "pg"
+
+
+def page_custom_id(
+    kind: str,
+    version: str,
+    page: int,
+    team_key: Sequence[str],
+    owner: int = 0,
+    season_span: str = "",
+    rank: str = RANK_DEFAULT,
+) -> str:
+    owner_part = f"u{owner}:" if owner else ""
+    season_part = f"s{season_span}:" if season_span else ""
+    rank_part = f"r{rank}:" if rank != RANK_DEFAULT else ""
+    return f"{PAGE_CUSTOM_ID_PREFIX}:{kind}:{version}:{page}:{owner_part}{season_part}{rank_part}{','.join(team_key)}"
+
+
+class PageButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=re.compile(
+        r"pg:(?P<kind>[a-z_]+):(?P<version>[0-9a-f]+):(?P<page>\d+):"
+        r"(?:u(?P<owner>\d+):)?(?:s(?P<season>\d+-\d+):)?(?:r(?P<rank>[a-z]+):)?(?P<key>[^:]+)"
+    ),
+):
+    def __init__(
+        self,
+        kind: str,
+        version: str,
+        page: int,
+        team_key: Sequence[str],
+        label: str,
+        disabled: bool = False,
+        owner: int = 0,
+        season_span: str = "",
+        rank: str = RANK_DEFAULT,
+    ):
+        self.kind = kind
+        self.version = version
+        self.page = page
+        self.team_key = tuple(team_key)
+        self.owner = owner
+        # 표시용 시즌 이름 대신 RawMatchStore.seasons 번호 범위("처음-끝")를 담는다.
+        # 이름에 '-' 나 ':' 가 들어가도 다시 풀 수 있고, 데이터 버전이 같으면 시즌 목록도 같다.
+        self.season_span = season_span
+        self.rank = rank
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.secondary,
+            custom_id=page_custom_id(kind, version, page, self.team_key, owner, season_span, rank),
+            disabled=disabled,
+            row=1,
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str], /):
+        return cls(
+            match["kind"], match["version"], int(match["page"]), match["key"].split(","), item.label or "",
+            owner=int(match["owner"] or 0),
+            season_span=match["season"] or "",
+            rank=match["rank"] or RANK_DEFAULT,
+        )
+
+    async def callback(self, interaction: discord.Interaction):
+        await _timed_callback(f"page:{self.kind}", self._turn_page, interaction)
+
+    async def _turn_page(self, interaction: discord.Interaction):
+        client = interaction.client
+
+        if self.kind in (COUNTER_CUSTOM_ID_PREFIX, COUNTER_TEAMS_KIND):
+            store = client.data_store
+        else:
+            store = client.raw_store
+        roster_mask = client.roster_store.mask(self.owner) if self.owner else None
+        min_tries = client.guild_settings.min_tries(interaction.guild_id)
+
+        results = []
+        season = ""
+        if store.version == self.version:
+            if self.kind == COUNTER_CUSTOM_ID_PREFIX:
+                results = store.search_by_enemy(list(self.team_key), roster_mask, self.rank)
+            elif self.kind == COUNTER_TEAMS_KIND:
+                results = store.find_enemy_teams(list(self.team_key))
+            else:
+                seasons = store.seasons_from_span(self.season_span)
+                season = season_label(seasons)
+                if seasons != ():
+                    results = store.get_stats(self.kind, self.team_key, roster_mask, seasons, min_tries, self.rank)
+
+        if not results:
+            await interaction.response.send_message(_STALE_MESSAGE, ephemeral=True)
+            return
+
+        page = min(self.page, _page_count(len(results)) - 1)
+        owner = self.owner if roster_mask is not None else 0
+        embed, view = render_results_page(
+            self.kind, self.version, self.team_key, results, page, owner, roster_mask, season, min_tries, self.rank,
+            self.season_span,
+        )
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+def _add_page_buttons(
+    view: discord.ui.View,
+    kind: str,
+    version: str,
+    team_key: Sequence[str],
+    page: int,
+    n: int,
+    owner: int = 0,
+    season_span: str = "",
+    rank: str = RANK_DEFAULT,
+) -> None:
+    last = _page_count(n) - 1
+    view.add_item(PageButton(
+        kind, version, max(page - 1, 0), team_key, "◀ 이전", disabled=page <= 0,
+        owner=owner, season_span=season_span, rank=rank,
+    ))
+    view.add_item(PageButton(
+        kind, version, min(page + 1, last), team_key, "다음 ▶", disabled=page >= last,
+        owner=owner, season_span=season_span, rank=rank,
+    ))
+
+
+def _fits_custom_id(
+    kind: str,
+    version: str,
+    team_key: Sequence[str],
+    n: int,
+    owner: int = 0,
+    season_span: str = "",
+    rank: str = RANK_DEFAULT,
+) -> bool:
+    return len(page_custom_id(kind, version, _page_count(n), team_key, owner, season_span, rank)) <= _CUSTOM_ID_MAX
+
+
+def make_counter_view(
+    version: str,
+    enemy_key: Sequence[str],
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    owner: int = 0,
+    rank: str = RANK_DEFAULT,
+) -> discord.ui.View:
+    # custom_id 길이 제한(100자)에 못 담으면 기존 in-memory view 로 대체
+    if not version or len(counter_custom_id(version, enemy_key)) > _CUSTOM_ID_MAX:
+        return CounterView(version, ", ".join(enemy_key), results)
+
+    view = discord.ui.View(timeout=None)
+    view.add_item(PersistentCounterSelect(version, enemy_key, _counter_options(results, page * PAGE_SIZE, PAGE_SIZE)))
+    n = len(results)
+    if n > PAGE_SIZE and _fits_custom_id(COUNTER_CUSTOM_ID_PREFIX, version, enemy_key, n, owner, rank=rank):
+        _add_page_buttons(view, COUNTER_CUSTOM_ID_PREFIX, version, enemy_key, page, n, owner, rank=rank)
+    return view
+
+
+def make_page_view(
+    kind: str,
+    version: str,
+    team_key: Sequence[str],
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    owner: int = 0,
+    season_span: str = "",
+    rank: str = RANK_DEFAULT,
+) -> Optional[discord.ui.View]:
+    if not version or len(results) <= PAGE_SIZE:
+        return None
+    if not _fits_custom_id(kind, version, team_key, len(results), owner, season_span, rank):
+        return None
+
+    view = discord.ui.View(timeout=None)
+    _add_page_buttons(view, kind, version, team_key, page, len(results), owner, season_span, rank)
+    return view
+
+
+def render_results_page(
+    kind: str,
+    version: str,
+    team_key: Sequence[str],
+    results: List[Dict[str, Any]],
+    page: int = 0,
+    owner: int = 0,
+    roster_mask: Optional[int] = None,
+    season: str = "",
+    min_tries: Optional[int] = None,
+    rank: str = RANK_DEFAULT,
+    season_span: str = "",
+) -> Tuple[discord.Embed, Optional[discord.ui.View]]:
+    # season 은 화면에 쓰는 시즌 이름, season_span 은 페이지 버튼에 담는 시즌 번호 범위
+    if kind == COUNTER_CUSTOM_ID_PREFIX:
+        embed = cached_counter_page(version, team_key, results, page, roster_mask, rank)
+        return embed, make_counter_view(version, team_key, results, page, owner, rank)
+    if kind == COUNTER_TEAMS_KIND:
+        embed = cached_counter_teams_page(version, team_key, results, page)
+    else:
+        embed = cached_stats_page(kind, version, team_key, results, page, roster_mask, season, min_tries, rank)
+    return embed, make_page_view(kind, version, team_key, results, page, owner, season_span, rank)
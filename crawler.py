@@ -1,23 +1,41 @@
 import json
 import os
+import time
 import requests
 
+import metrics
+
+
+# 로컬 stand-in 서버(standin_server.py)로 돌릴 때 환경변수로 바꾼다
+NAVER_API_BASE_URL_DEFAULT = "https://comm-api.game.naver.com"
+NAVER_WEB_BASE_URL_DEFAULT = "https://game.naver.com"
+
+# 게시판 조회가 연속으로 실패하면 그 게시판만 잠시 쉬었다가 다시 시도한다 (초)
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 1800
+
 
 class BoardCrawler:
-    def __init__(self):
+    def __init__(self, api_base_url=None, web_base_url=None):
         self.lounge_id = "sena_rebirth"
-        self.api_url = f"https://comm-api.game.naver.com/nng_main/v1/community/lounge/{self.lounge_id}/feed"
-        self.detail_url = f"https://game.naver.com/lounge/{self.lounge_id}/board/detail/"
+        self.api_base_url = (api_base_url or os.getenv("NAVER_API_BASE_URL", NAVER_API_BASE_URL_DEFAULT)).rstrip("/")
+        self.web_base_url = (web_base_url or os.getenv("NAVER_WEB_BASE_URL", NAVER_WEB_BASE_URL_DEFAULT)).rstrip("/")
+        self.api_url = f"{self.api_base_url}/nng_main/v1/community/lounge/{self.lounge_id}/feed"
+        self.detail_url = f"{self.web_base_url}/lounge/{self.lounge_id}/board/detail/"
 
         self.headers = {
             'User-Agent': 'Mozilla/5.0',
             'Accept': 'application/json, text/plain, */*',
-            'Origin': 'https://game.naver.com',
-            'Referer': f'https://game.naver.com/lounge/{self.lounge_id}/board/1'
+            'Origin': self.web_base_url,
+            'Referer': f'{self.web_base_url}/lounge/{self.lounge_id}/board/1'
         }
 
         self.monitored_boards = {}
 
+        # 게시판별 폴링 상태 (!상태 에서 보여준다)
+        self.poll_state = {}
+        self.last_poll_at = 0.0
+
         self.save_file = "board_cache.json"
         self.saved_ids = self._load_cache()
 
@@ -64,6 +82,7 @@ class BoardCrawler:
     def unregister(self, board_id):
         if board_id in self.monitored_boards:
             del self.monitored_boards[board_id]
+            self.poll_state.pop(board_id, None)
             return True
         return False
 
@@ -87,7 +106,7 @@ class BoardCrawler:
             }
 
             headers = self.headers.copy()
-            headers['Referer'] = f'https://game.naver.com/lounge/{self.lounge_id}/board/{board_id}'
+            headers['Referer'] = f'{self.web_base_url}/lounge/{self.lounge_id}/board/{board_id}'
 
             response = requests.get(
                 self.api_url,
@@ -97,7 +116,8 @@ class BoardCrawler:
             )
 
             if response.status_code != 200:
-                return []
+                metrics.count_poll_error("naver_board", f"http_{response.status_code}")
+                return None
 
             json_data = response.json()
 
@@ -117,9 +137,40 @@ class BoardCrawler:
 
         except Exception as e:
             print(e)
+            metrics.count_poll_error("naver_board", "exception")
+            return None
 
         return posts
 
+    # ------------------------
+    # 폴링 상태 / backoff
+    # ------------------------
+
+    def _board_state(self, board_id):
+        if board_id not in self.poll_state:
+            self.poll_state[board_id] = {
+                "last_poll_at": 0.0,
+                "last_ok_at": 0.0,
+                "failures": 0,
+                "next_poll_at": 0.0,
+            }
+        return self.poll_state[board_id]
+
+    def _poll_done(self, board_id, ok):
+        state = self._board_state(board_id)
+        now = time.time()
+        state["last_poll_at"] = now
+
+        if ok:
+            state["last_ok_at"] = now
+            state["failures"] = 0
+            state["next_poll_at"] = 0.0
+            return
+
+        state["failures"] += 1
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** (state["failures"] - 1), BACKOFF_MAX_SECONDS)
+        state["next_poll_at"] = now + delay
+
     # ------------------------
     # 새 글 체크
     # ------------------------
@@ -127,9 +178,15 @@ class BoardCrawler:
     def check_new_posts(self):
         updates = []
         changed = False
+        now = time.time()
+        self.last_poll_at = now
 
         for board_id, data in self.monitored_boards.items():
+            if now < self._board_state(board_id)["next_poll_at"]:
+                continue
+
             current_posts = self._fetch_posts(board_id)
+            self._poll_done(board_id, current_posts is not None)
 
             if not current_posts:
                 continue
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import traceback
+from pathlib import Path
+from typing import Dict, Optional
+
+import common
+
+logger = logging.getLogger("counter-bot")
+
+
+# 서버(guild)별 설정. 지금은 통계 최소 표본(판수)만 둔다.
+# 설정하지 않은 서버와 DM 은 common.MIN_STAT_TRIES 를 쓴다.
+SETTINGS_PATH = Path(os.getenv("GUILD_SETTINGS_PATH", "guild_settings.json"))
+
+
+class GuildSettings:
+    def __init__(self, path: Path = SETTINGS_PATH):
+        self.path = path
+        self.min_stat_tries: Dict[str, int] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.min_stat_tries = {str(k): int(v) for k, v in data.get("min_stat_tries", {}).items()}
+            logger.info(f"Loaded guild settings: guilds={len(self.min_stat_tries)}")
+        except Exception:
+            logger.error(f"서버 설정 로드 실패: {self.path}\n" + traceback.format_exc())
+
+    def save(self) -> None:
+        self.path.write_text(
+            json.dumps({"min_stat_tries": self.min_stat_tries}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+    def min_tries(self, guild_id: Optional[int]) -> int:
+        if guild_id is None:
+            return common.MIN_STAT_TRIES
+        return self.min_stat_tries.get(str(guild_id), common.MIN_STAT_TRIES)
+
+    def set_min_tries(self, guild_id: int, n: int) -> None:
+        self.min_stat_tries[str(guild_id)] = n
+        self.save()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from common import _s
+
+logger = logging.getLogger("counter-bot")
+
+
+# 두 시트에서 영웅 이름이 들어있는 컬럼
+COUNTER_HERO_COLUMNS = ["enemy1", "enemy2", "enemy3", "counter1", "counter2", "counter3"]
+RAW_HERO_COLUMNS = ["방어조합1", "방어조합2", "방어조합3", "공격조합1", "공격조합2", "공격조합3"]
+
+AUTOCOMPLETE_LIMIT = 25
+
+# 오타 보정: n-gram 으로 후보를 추린 뒤 자모 편집거리가 가장 가까운 이름을 고른다
+ALIAS_PATH = Path(os.getenv("HERO_ALIAS_PATH", "hero_aliases.json"))
+FUZZY_MAX_CANDIDATES = 20
+
+# --- 한글 자모 분해 ---
+# 입력 중인 글자("틀" = 트 + ㄹ 받침)나 초성만 친 경우("ㅌㄹㄷ")도 prefix 로 찾을 수 있게
+# 이름과 입력을 모두 호환 자모열로 풀어서 비교한다.
+
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+         "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+
+# 겹모음/겹받침은 타이핑 순서대로 쪼갠다
+_COMPOUND_JAMO = {
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ",
+    "ㄽ": "ㄹㅅ", "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+}
+
+
+def _split_compound(jamo: str) -> str:
+    return _COMPOUND_JAMO.get(jamo, jamo)
+
+
+def decompose_jamo(text: str) -> str:
+    out: List[str] = []
+    for ch in text.casefold():
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            idx = code - _HANGUL_BASE
+            out.append(_CHO[idx // 588])
+            out.append(_split_compound(_JUNG[(idx % 588) // 28]))
+            out.append(_split_compound(_JONG[idx % 28]))
+        elif not ch.isspace():
+            out.append(_split_compound(ch))
+    return "".join(out)
+
+
+def choseong(text: str) -> str:
+    out: List[str] = []
+    for ch in text.casefold():
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            out.append(_CHO[(code - _HANGUL_BASE) // 588])
+        elif not ch.isspace():
+            out.append(ch)
+    return "".join(out)
+
+
+def _norm_name(text: str) -> str:
+    return "".join(_s(text).casefold().split())
+
+
+def _jamo_ngrams(jamo: str, n: int = 2) -> List[str]:
+    padded = f"^{jamo}$"
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def _bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    # limit 을 넘으면 바로 limit + 1 을 돌려준다
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+def load_aliases(path: Path = ALIAS_PATH) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        logger.error(f"영웅 별칭 로드 실패: {path}\n" + traceback.format_exc())
+        return {}
+    return {_norm_name(k): _s(v) for k, v in data.items() if _norm_name(k) and _s(v)}
+
+
+def count_hero_names(data_df: Optional[pd.DataFrame], raw_df: Optional[pd.DataFrame]) -> Counter:
+    counts: Counter = Counter()
+    for df, cols in ((data_df, COUNTER_HERO_COLUMNS), (raw_df, RAW_HERO_COLUMNS)):
+        if df is None or df.empty:
+            continue
+        present = [c for c in cols if c in df.columns]
+        if not present:
+            continue
+        names = df[present].stack().map(_s)
+        counts.update(names[names != ""].value_counts().to_dict())
+    return counts
+
+
+class HeroIndex:
+    def __init__(self):
+        self.names: List[str] = []
+        self.counts: Dict[str, int] = {}
+        # (자모열, 이름 id) 를 정렬해 둔 목록. prefix 검색은 bisect 두 번이면 끝난다.
+        self._forms: List[str] = []
+        self._form_ids: List[int] = []
+        self._popular: List[str] = []
+        self._exact: Dict[str, str] = {}
+        self._jamo: List[str] = []
+        self._ngrams: Dict[str, List[int]] = {}
+        self.aliases: Dict[str, str] = load_aliases()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.counts
+
+    def build(self, counts: Dict[str, int]) -> None:
+        names = sorted(counts, key=lambda n: (-counts[n], n))
+
+        entries: List[Tuple[str, int]] = []
+        for i, name in enumerate(names):
+            forms = {decompose_jamo(name), choseong(name)}
+            entries.extend((form, i) for form in forms if form)
+        entries.sort()
+
+        self.names = names
+        self.counts = dict(counts)
+        self._forms = [form for form, _ in entries]
+        self._form_ids = [i for _, i in entries]
+        self._popular = names[:AUTOCOMPLETE_LIMIT]
+        self._exact = {_norm_name(n): n for n in names}
+        self._jamo = [decompose_jamo(n) for n in names]
+
+        ngrams: Dict[str, List[int]] = {}
+        for i, jamo in enumerate(self._jamo):
+            for gram in set(_jamo_ngrams(jamo)):
+                ngrams.setdefault(gram, []).append(i)
+        self._ngrams = ngrams
+        logger.info(f"Built hero index: heroes={len(names)}, forms={len(entries)}")
+
+    def build_from_frames(self, data_df: Optional[pd.DataFrame], raw_df: Optional[pd.DataFrame]) -> None:
+        # !리로드 도 여기를 타므로 별칭 파일도 같이 다시 읽는다 (재시작 없이 별칭 수정 반영)
+        self.aliases = load_aliases()
+        self.build(count_hero_names(data_df, raw_df))
+
+    def complete(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[str]:
+        query = decompose_jamo(prefix)
+        if not query:
+            return self._popular[:limit]
+
+        lo = bisect.bisect_left(self._forms, query)
+        hi = bisect.bisect_left(self._forms, query + "\uffff", lo)
+
+        # 이름 id 가 곧 인기순이므로 id 순으로 정렬하면 자주 쓰이는 영웅이 먼저 나온다
+        ids = sorted(set(self._form_ids[lo:hi]))
+        return [self.names[i] for i in ids[:limit]]
+
+    def resolve(self, token: str) -> Tuple[str, bool]:
+        # (이름, 보정 여부). 못 찾으면 입력을 그대로 돌려준다.
+        key = _norm_name(token)
+        if key in self._exact:
+            return self._exact[key], False
+
+        alias = self.aliases.get(key)
+        if alias:
+            return alias, True
+
+        query = decompose_jamo(key)
+        if not query or not self._ngrams:
+            return _s(token), False
+
+        shared: Counter = Counter()
+        for gram in set(_jamo_ngrams(query)):
+            shared.update(self._ngrams.get(gram, ()))
+
+        best: Optional[Tuple[int, int]] = None
+        for i, _ in shared.most_common(FUZZY_MAX_CANDIDATES):
+            # 자모 4개(대략 한 글자 반)당 오타 1개까지 허용
+            limit = max(1, max(len(query), len(self._jamo[i])) // 4)
+            dist = _bounded_levenshtein(query, self._jamo[i], limit)
+            # 거리가 같으면 id 가 작은(자주 쓰이는) 이름
+            if dist <= limit and (best is None or (dist, i) < best):
+                best = (dist, i)
+
+        if best is None:
+            return _s(token), False
+        return self.names[best[1]], True
+
+    def resolve_team(self, tokens: Sequence[str]) -> Tuple[List[str], List[Tuple[str, str]]]:
+        resolved: List[str] = []
+        corrections: List[Tuple[str, str]] = []
+        for token in tokens:
+            name, corrected = self.resolve(token)
+            resolved.append(name)
+            if corrected:
+                corrections.append((_s(token), name))
+        return resolved, corrections
+
+
+def format_corrections(corrections: Sequence[Tuple[str, str]]) -> str:
+    if not corrections:
+        return ""
+    return "🔤 이름 보정: " + ", ".join(f"`{src}` → `{dst}`" for src, dst in corrections)
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bench_data import DEFAULT_HEROES, generate_sheets
+
+
+# Discord 연결 없이 bot.py 의 실제 명령어 콜백을 가짜 Context/Interaction 으로 두드려서
+# 동시 사용자 수별 응답 지연(p50/p95/p99), 처리량, 이벤트 루프 지연을 잰다.
+#   python loadtest.py --concurrency 1,8,32 --requests 2000
+#   python loadtest.py --mix "조합=5,방어=5" --send-latency 50 --out load.json
+# 데이터는 bench_data 로 만든 합성 시트를 COUNTER_CSV_PATH / RAW_CSV_PATH 로 넘겨서 읽는다.
+
+DEFAULT_MIX = "조합=4,방어=3,우리방어=1,공격=2,분석=1,매치업=1,영웅순위=1,slash_조합=1,slash_방어=1,page=2"
+LAG_INTERVAL = 0.005
+
+
+def _is_error_reply(content: Optional[str]) -> bool:
+    # 명령어의 except 블록이 보내는 답장은 모두 "⚠️ ... 오류" 형태다
+    return bool(content) and content.startswith("⚠️") and "오류" in content
+
+
+# --- 가짜 discord 객체 ---
+# 명령어 콜백이 실제로 건드리는 속성만 흉내 낸다. 보낸 내용은 sent 에 쌓인다.
+
+class _Sink:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent: List[Tuple[Optional[str], Dict[str, Any]]] = []
+
+    async def deliver(self, content: Optional[str], kwargs: Dict[str, Any]) -> None:
+        # Discord API 왕복 시간 흉내. 0 이면 이벤트 루프에 양보만 한다.
+        await asyncio.sleep(self.latency)
+        self.sent.append((content, kwargs))
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+
+class FakeContext:
+    def __init__(self, sink: _Sink, user_id: int, guild_id: int):
+        self._sink = sink
+        self.author = FakeUser(user_id)
+        self.guild = FakeGuild(guild_id)
+
+    async def reply(self, content: Optional[str] = None, **kwargs):
+        kwargs.pop("mention_author", None)
+        await self._sink.deliver(content, kwargs)
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        await self._sink.deliver(content, kwargs)
+
+
+class FakeResponse:
+    def __init__(self, sink: _Sink):
+        self._sink = sink
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content: Optional[str] = None, **kwargs):
+        self._done = True
+        await self._sink.deliver(content, kwargs)
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        await self._sink.deliver(kwargs.pop("content", None), kwargs)
+
+
+class FakeInteraction:
+    def __init__(self, sink: _Sink, client, user_id: int, guild_id: int):
+        self.client = client
+        self.user = FakeUser(user_id)
+        self.guild_id = guild_id
+        self.response = FakeResponse(sink)
+
+
+# --- 질의 만들기 ---
+
+def _weighted_teams(totals: Dict[str, Dict[str, Any]], members: Dict[str, tuple], limit: int = 500):
+    keys = sorted(totals, key=lambda k: totals[k]["total"], reverse=True)[:limit]
+    teams = [list(members[k]) for k in keys if len(members.get(k, ())) == 3]
+    weights = [totals[k]["total"] for k in keys if len(members.get(k, ())) == 3]
+    return teams, weights
+
+
+def _typo(name: str, rng: random.Random) -> str:
+    # 퍼지 보정 경로도 타도록 한 글자를 뺀다
+    if len(name) < 3:
+        return name
+    i = rng.randrange(1, len(name))
+    return name[:i] + name[i + 1:]
+
+
+class QueryMaker:
+    def __init__(self, bot_module, rng: random.Random, typo_rate: float, partial_rate: float):
+        raw = bot_module.raw_store
+        self.rng = rng
+        self.typo_rate = typo_rate
+        self.partial_rate = partial_rate
+        self.def_teams, self.def_w = _weighted_teams(raw.team_totals.get("overall", {}), raw.team_members.get("def", {}))
+        self.atk_teams, self.atk_w = _weighted_teams(raw.team_totals.get("global_attack", {}), raw.team_members.get("atk", {}))
+        counter = bot_module.data_store.by_enemy
+        self.enemies = [list(k) for k in counter] or self.def_teams
+        self.enemy_w = [len(v) for v in counter.values()] or self.def_w
+        if not self.def_teams or not self.atk_teams:
+            raise RuntimeError("질의를 만들 raw 데이터가 없습니다")
+
+    def _pick(self, teams, weights) -> List[str]:
+        team = list(self.rng.choices(teams, weights=weights)[0])
+        if self.rng.random() < self.partial_rate:
+            team = team[: self.rng.choice((1, 2))]
+        return [_typo(h, self.rng) if self.rng.random() < self.typo_rate else h for h in team]
+
+    def defense(self) -> List[str]:
+        return self._pick(self.def_teams, self.def_w)
+
+    def attack(self) -> List[str]:
+        return self._pick(self.atk_teams, self.atk_w)
+
+    def enemy(self) -> List[str]:
+        return self._pick(self.enemies, self.enemy_w)
+
+    def full_defense(self) -> List[str]:
+        return list(self.rng.choices(self.def_teams, weights=self.def_w)[0])
+
+
+# --- 시나리오 ---
+# 이름 -> (질의를 받아 코루틴을 돌리는 함수). 모두 bot.py 의 실제 콜백을 부른다.
+
+def build_scenarios(bot_module, maker: QueryMaker) -> Dict[str, Callable[[_Sink, int, int], Any]]:
+    bot = bot_module.bot
+
+    def prefix(name: str, make_args: Callable[[], str]):
+        callback = bot.get_command(name).callback
+
+        async def run(sink: _Sink, user_id: int, guild_id: int):
+            await callback(FakeContext(sink, user_id, guild_id), args=make_args())
+        return run
+
+    def slash(name: str, make_team: Callable[[], List[str]]):
+        callback = bot.tree.get_command(name).callback
+
+        async def run(sink: _Sink, user_id: int, guild_id: int):
+            team = make_team() + [None, None]
+            await callback(FakeInteraction(sink, bot, user_id, guild_id), hero1=team[0], hero2=team[1], hero3=team[2])
+        return run
+
+    async def page(sink: _Sink, user_id: int, guild_id: int):
+        # 두 번째 페이지 버튼 클릭. custom_id 에서 복원되는 것과 같은 객체를 만든다.
+        team = sorted(maker.full_defense())
+        button = bot_module.PageButton("overall", bot_module.raw_store.version, 1, team, "다음 ▶")
+        await button.callback(FakeInteraction(sink, bot, user_id, guild_id))
+
+    comma = ", ".join
+    return {
+        "조합": prefix("조합", lambda: comma(maker.enemy())),
+        "방어": prefix("방어", lambda: comma(maker.defense())),
+        "우리방어": prefix("우리방어", lambda: comma(maker.defense())),
+        "공격": prefix("공격", lambda: comma(maker.attack())),
+        "분석": prefix("분석", lambda: comma(maker.full_defense())),
+        "매치업": prefix("매치업", lambda: comma(maker.defense()[:2])),
+        "영웅순위": prefix("영웅순위", lambda: maker.rng.choice(("공격", "방어"))),
+        "slash_조합": slash("조합", maker.enemy),
+        "slash_방어": slash("방어", maker.defense),
+        "page": page,
+    }
+
+
+def parse_mix(text: str, available: Sequence[str]) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in available:
+            raise SystemExit(f"알 수 없는 명령어 '{name}' (가능: {', '.join(available)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --- 측정 ---
+
+class LagMonitor:
+    # interval 마다 깨어나서 예정보다 얼마나 늦게 깨어났는지 기록한다 (= 이벤트 루프가 막혀 있던 시간)
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class _ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+def _ms_stats(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "mean_ms": 0.0}
+    arr = np.asarray(values) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+        "mean_ms": float(arr.mean()),
+    }
+
+
+async def run_level(
+    scenarios: Dict[str, Callable],
+    mix: Dict[str, float],
+    concurrency: int,
+    requests: int,
+    send_latency: float,
+    rng: random.Random,
+    users: int,
+) -> Dict[str, Any]:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    plan = rng.choices(names, weights=weights, k=requests)
+    queue: asyncio.Queue = asyncio.Queue()
+    for name in plan:
+        queue.put_nowait(name)
+
+    errors = _ErrorCounter()
+    logging.getLogger("counter-bot").addHandler(errors)
+    latencies: Dict[str, List[float]] = {n: [] for n in names}
+    error_replies = 0
+    lag = LagMonitor()
+
+    async def worker(worker_id: int) -> None:
+        nonlocal error_replies
+        while True:
+            try:
+                name = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            sink = _Sink(send_latency)
+            user_id = 1000 + rng.randrange(users)
+            start = time.perf_counter()
+            await scenarios[name](sink, user_id, 1 + user_id % 3)
+            latencies[name].append(time.perf_counter() - start)
+            if any(_is_error_reply(content) for content, _ in sink.sent):
+                error_replies += 1
+
+    lag.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await lag.stop()
+    logging.getLogger("counter-bot").removeHandler(errors)
+
+    every = [x for values in latencies.values() for x in values]
+    return {
+        "concurrency": concurrency,
+        "requests": len(every),
+        "seconds": elapsed,
+        "throughput_rps": len(every) / elapsed if elapsed > 0 else 0.0,
+        "errors_logged": errors.count,
+        "error_replies": error_replies,
+        "latency": _ms_stats(every),
+        "by_command": {name: {"count": len(v), **_ms_stats(v)} for name, v in latencies.items() if v},
+        "loop_lag": _ms_stats(lag.samples),
+    }
+
+
+def _print_level(result: Dict[str, Any]) -> None:
+    lat, lag = result["latency"], result["loop_lag"]
+    print(
+        f"c={result['concurrency']:>4}  {result['throughput_rps']:>8.1f} req/s  "
+        f"p50 {lat['p50_ms']:>7.2f}ms  p95 {lat['p95_ms']:>7.2f}ms  p99 {lat['p99_ms']:>7.2f}ms  "
+        f"lag p99 {lag['p99_ms']:>6.2f}ms max {lag['max_ms']:>6.2f}ms  "
+        f"errors {result['errors_logged']}/{result['error_replies']}",
+        file=sys.stderr,
+    )
+
+
+def prepare_environment(work_dir: Path, rows: int, heroes: int, seed: int, counter_csv: Optional[str], raw_csv: Optional[str]) -> None:
+    # bot import 전에 설정해야 한다 (bot.py 는 import 시점에 스토어를 만들고 로드한다)
+    if not (counter_csv and raw_csv):
+        counter_path, raw_path, _ = generate_sheets(work_dir, rows, heroes=heroes, seed=seed)
+        counter_csv = counter_csv or str(counter_path)
+        raw_csv = raw_csv or str(raw_path)
+    os.environ["COUNTER_CSV_PATH"] = counter_csv
+    os.environ["RAW_CSV_PATH"] = raw_csv
+    # 보유 영웅/서버 설정 파일은 임시 폴더로 돌려서 실제 파일을 건드리지 않는다
+    os.environ["ROSTER_PATH"] = str(work_dir / "rosters.json")
+    os.environ["GUILD_SETTINGS_PATH"] = str(work_dir / "guild_settings.json")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="bot.py 명령어 콜백 오프라인 부하 테스트")
+    parser.add_argument("--concurrency", default="1,8,32", help="동시 사용자 수 목록 (쉼표 구분)")
+    parser.add_argument("--requests", type=int, default=1000, help="동시성 단계별 요청 수")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="명령어=가중치 목록")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="가짜 reply/send 왕복 지연 (ms)")
+    parser.add_argument("--users", type=int, default=200, help="가짜 유저 수")
+    parser.add_argument("--typo-rate", type=float, default=0.05, help="영웅 이름을 틀리게 넣는 비율")
+    parser.add_argument("--partial-rate", type=float, default=0.2, help="1~2명만 넣는 비율")
+    parser.add_argument("--rows", type=int, default=50000, help="합성 raw 시트 행 수")
+    parser.add_argument("--heroes", type=int, default=DEFAULT_HEROES)
+    parser.add_argument("--counter-csv", help="합성 대신 쓸 카운터 CSV")
+    parser.add_argument("--raw-csv", help="합성 대신 쓸 raw CSV")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rayabot-load-") as tmp:
+        prepare_environment(Path(tmp), args.rows, args.heroes, args.seed, args.counter_csv, args.raw_csv)
+        import bot as bot_module
+
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("counter-bot").setLevel(logging.WARNING)
+
+        rng = random.Random(args.seed)
+        maker = QueryMaker(bot_module, rng, args.typo_rate, args.partial_rate)
+        scenarios = build_scenarios(bot_module, maker)
+        mix = parse_mix(args.mix, list(scenarios))
+
+        levels = []
+        for concurrency in (int(x) for x in args.concurrency.split(",") if x.strip()):
+            result = asyncio.run(run_level(
+                scenarios, mix, concurrency, args.requests, args.send_latency / 1000.0, rng, args.users,
+            ))
+            _print_level(result)
+            levels.append(result)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "args": vars(args),
+            "raw_rows": 0 if bot_module.raw_store.df is None else len(bot_module.raw_store.df),
+            "counter_rows": 0 if bot_module.data_store.df is None else len(bot_module.data_store.df),
+        },
+        "levels": levels,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger("counter-bot")
+
+
+# 이벤트 루프 지연 감시.
+# 루프 위의 heartbeat 가 interval 마다 깨어나면서 늦게 깨어난 만큼을 lag 로 잰다.
+# 별도 감시 스레드는 heartbeat 가 threshold 넘게 멈추면 그 순간 루프 스레드에서 돌고 있는
+# task(명령어/loop 이름)와 스택을 잡아 둔다. 루프가 풀리면 막힌 시간과 함께 기록한다.
+#   LOOP_LAG_INTERVAL=0.1 (초), LOOP_SLOW_THRESHOLD=0.25 (초)
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+LOOP_SLOW_THRESHOLD = float(os.getenv("LOOP_SLOW_THRESHOLD", "0.25"))
+# 최근 lag 분포는 이 개수만큼만 들고 있는다 (기본 0.1초 간격이면 약 5분)
+RECENT_SAMPLES = 3000
+RECENT_STALLS = 20
+
+_TASK_PREFIX = "discord-ext-tasks: "
+_UNKNOWN = "(알 수 없음)"
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOOP_LAG = metrics.REGISTRY.add(metrics.Histogram(
+    "rayabot_loop_lag_seconds", "이벤트 루프 heartbeat 지연",
+))
+SLOW_CALLBACKS = metrics.REGISTRY.add(metrics.Counter(
+    "rayabot_loop_slow_callbacks_total", "threshold 넘게 루프를 막은 횟수 (label)",
+))
+BLOCKED_SECONDS = metrics.REGISTRY.add(metrics.Counter(
+    "rayabot_loop_blocked_seconds_total", "threshold 넘게 루프를 막은 시간 합 (label)",
+))
+
+# task -> 명령어 이름 등. 끝난 task 는 알아서 빠진다.
+_task_labels: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+
+
+def tag(label: str) -> None:
+    # 지금 도는 task 에 이름을 붙인다. 명령어는 on_message task 안에서 돌아서 이름만으로는 구분이 안 된다.
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return
+    if task is not None:
+        _task_labels[task] = label
+
+
+def _task_label(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return _UNKNOWN
+    label = _task_labels.get(task)
+    if label:
+        return label
+    name = task.get_name()
+    # discord.ext.tasks 는 "discord-ext-tasks: NotifierManager.check_sources" 처럼 이름을 붙인다
+    if name.startswith(_TASK_PREFIX):
+        return name[len(_TASK_PREFIX):].rsplit(".", 1)[-1]
+    return name
+
+
+def _where(frame) -> str:
+    # 봇 코드 안에서 가장 안쪽 위치 + 실제로 멈춰 있던 맨 안쪽 위치
+    if frame is None:
+        return ""
+    stack = traceback.extract_stack(frame)
+    inner = stack[-1]
+    ours = [f for f in stack if f.filename.startswith(_REPO_DIR) and f.filename != __file__]
+    top = f"{os.path.basename(inner.filename)}:{inner.lineno}({inner.name})"
+    if ours and ours[-1] is not inner:
+        own = ours[-1]
+        return f"{os.path.basename(own.filename)}:{own.lineno}({own.name}) → {top}"
+    return top
+
+
+class _Offender:
+    __slots__ = ("count", "total", "worst", "where", "last_at")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.where = ""
+        self.last_at = 0.0
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_SLOW_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.started_at = 0.0
+        self.lags: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+        self.max_lag = 0.0
+        # label -> 누적 (횟수, 막힌 시간, 최악, 마지막 위치)
+        self.offenders: Dict[str, _Offender] = {}
+        # 최근 막힘 (시각, label, 막힌 시간, 위치)
+        self.recent: Deque[Tuple[float, str, float, str]] = deque(maxlen=RECENT_STALLS)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id = 0
+        self._beat = 0.0
+        # 감시 스레드가 잡은 (label, 위치). heartbeat 가 풀리면서 가져간다.
+        self._stall: Optional[Tuple[str, str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name="loop-monitor")
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"이벤트 루프 감시 시작: interval={self.interval}s, threshold={self.threshold}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.perf_counter()
+            self._beat = start
+            self._stall = None
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - start - self.interval, 0.0)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self._record(lag)
+
+    def _watch(self) -> None:
+        # 루프가 멈춰 있는 동안에는 루프 스레드가 아무것도 못 하니 여기서 잡는다
+        poll = max(min(self.threshold / 4, self.interval), 0.01)
+        while not self._stop.wait(poll):
+            stalled = time.perf_counter() - self._beat - self.interval
+            if stalled < self.threshold or self._stall is not None:
+                continue
+            try:
+                task = asyncio.current_task(self._loop)
+                frame = sys._current_frames().get(self._loop_thread_id)
+                self._stall = (_task_label(task), _where(frame))
+            except Exception:
+                self._stall = (_UNKNOWN, "")
+
+    def _record(self, lag: float) -> None:
+        label, where = self._stall or (_UNKNOWN, "")
+        now = time.time()
+        offender = self.offenders.get(label)
+        if offender is None:
+            offender = self.offenders[label] = _Offender()
+        offender.count += 1
+        offender.total += lag
+        offender.worst = max(offender.worst, lag)
+        offender.where = where or offender.where
+        offender.last_at = now
+        self.recent.append((now, label, lag, where))
+
+        SLOW_CALLBACKS.inc(label=label)
+        BLOCKED_SECONDS.inc(lag, label=label)
+        logger.warning(f"이벤트 루프 {lag * 1000:.0f}ms 막힘: {label} @ {where or '?'}")
+
+    def lag_summary(self) -> Dict[str, float]:
+        values = sorted(self.lags)
+        if not values:
+            return {"samples": 0, "p50": 0.0, "p99": 0.0, "max": 0.0, "max_all": self.max_lag}
+
+        def pct(q: float) -> float:
+            return values[min(int(len(values) * q), len(values) - 1)]
+
+        return {"samples": len(values), "p50": pct(0.5), "p99": pct(0.99), "max": values[-1], "max_all": self.max_lag}
+
+    def worst_offenders(self, n: int = 5) -> List[Tuple[str, _Offender]]:
+        return sorted(self.offenders.items(), key=lambda x: -x[1].total)[:n]
+
+
+monitor = LoopMonitor()
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms"
+
+
+def format_summary(mon: Optional[LoopMonitor] = None) -> str:
+    # !상태 에 넣는 한두 줄 요약
+    mon = mon or monitor
+    if not mon.is_running():
+        return "감시 꺼짐"
+    s = mon.lag_summary()
+    stalls = sum(o.count for o in mon.offenders.values())
+    text = f"p50 {_ms(s['p50'])} · p99 {_ms(s['p99'])} · 최대 {_ms(s['max_all'])} · {_ms(mon.threshold)} 넘게 막힘 {stalls}회"
+    worst = mon.worst_offenders(1)
+    if worst:
+        label, o = worst[0]
+        text += f"\n최악: `{label}` 합 {_ms(o.total)} (`!루프상태` 참고)"
+    return text
+
+
+def format_status(mon: Optional[LoopMonitor] = None, n: int = 5) -> str:
+    mon = mon or monitor
+    if not mon.is_running():
+        return "이벤트 루프 감시가 꺼져 있어요."
+
+    s = mon.lag_summary()
+    lines = [
+        f"**이벤트 루프 지연** (최근 {s['samples']}회, {mon.interval}s 간격)",
+        f"p50 {_ms(s['p50'])} · p99 {_ms(s['p99'])} · 최근 최대 {_ms(s['max'])} · 시작 후 최대 {_ms(s['max_all'])}",
+        f"기준 {_ms(mon.threshold)} 넘게 막힌 횟수: {sum(o.count for o in mon.offenders.values())}",
+    ]
+    worst = mon.worst_offenders(n)
+    if worst:
+        lines.append("")
+        lines.append("**가장 오래 막은 곳**")
+        for label, o in worst:
+            lines.append(f"• `{label}` {o.count}회 · 합 {_ms(o.total)} · 최악 {_ms(o.worst)}")
+            if o.where:
+                lines.append(f"  └ `{o.where}`")
+    if mon.recent:
+        lines.append("")
+        lines.append("**최근 막힘**")
+        for at, label, lag, _ in list(mon.recent)[-n:][::-1]:
+            lines.append(f"• {time.strftime('%H:%M:%S', time.localtime(at))} `{label}` {_ms(lag)}")
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# 방어 x 공격 칸 수가 이 값을 넘으면 dense 행렬 대신 (방어, 공격) 쌍 목록(COO)으로 들고 있는다
+DENSE_CELL_LIMIT = int(os.getenv("MATCHUP_DENSE_LIMIT", "4000000"))
+
+
+class MatchupMatrix:
+    def __init__(
+        self,
+        n_def: int,
+        n_atk: int,
+        def_ids: np.ndarray,
+        atk_ids: np.ndarray,
+        wins: np.ndarray,
+        totals: np.ndarray,
+        dense: bool,
+    ):
+        self.n_def = n_def
+        self.n_atk = n_atk
+        # 쌍 목록 (def_id 순 정렬). dense 모드에서도 순회용으로 같이 둔다.
+        self.def_ids = def_ids
+        self.atk_ids = atk_ids
+        self.wins = wins
+        self.totals = totals
+        self.dense = dense
+        self.win_matrix: Optional[np.ndarray] = None
+        self.total_matrix: Optional[np.ndarray] = None
+
+        if dense:
+            self.win_matrix = np.zeros((n_def, n_atk), dtype=np.int32)
+            self.total_matrix = np.zeros((n_def, n_atk), dtype=np.int32)
+            self.win_matrix[def_ids, atk_ids] = wins
+            self.total_matrix[def_ids, atk_ids] = totals
+
+    @classmethod
+    def empty(cls) -> "MatchupMatrix":
+        none = np.zeros(0, dtype=np.int32)
+        return cls(0, 0, none, none, none, none, dense=True)
+
+    @classmethod
+    def from_codes(
+        cls,
+        def_codes: np.ndarray,
+        atk_codes: np.ndarray,
+        attack_wins: np.ndarray,
+        n_def: int,
+        n_atk: int,
+        dense: Optional[bool] = None,
+        counts: Optional[np.ndarray] = None,
+    ) -> "MatchupMatrix":
+        # raw 한 줄 = (방어 id, 공격 id, 공격 승 여부). 같은 칸끼리 bincount 로 합친다.
+        # counts 를 주면 한 줄을 그만큼(삭제된 행은 -1)으로 센다. 판수가 0 이 된 칸은 뺀다.
+        flat = def_codes.astype(np.int64) * max(n_atk, 1) + atk_codes.astype(np.int64)
+        cells, inverse = np.unique(flat, return_inverse=True)
+        if counts is None:
+            totals = np.bincount(inverse, minlength=len(cells)).astype(np.int32)
+        else:
+            totals = np.bincount(inverse, weights=counts, minlength=len(cells)).astype(np.int32)
+        wins = np.bincount(inverse, weights=attack_wins.astype(np.int32), minlength=len(cells)).astype(np.int32)
+        if counts is not None:
+            keep = totals > 0
+            cells, totals, wins = cells[keep], totals[keep], wins[keep]
+
+        def_ids = (cells // max(n_atk, 1)).astype(np.int32)
+        atk_ids = (cells % max(n_atk, 1)).astype(np.int32)
+        if dense is None:
+            dense = n_def * n_atk <= DENSE_CELL_LIMIT
+        return cls(n_def, n_atk, def_ids, atk_ids, wins, totals, dense)
+
+    def with_delta(
+        self,
+        def_codes: np.ndarray,
+        atk_codes: np.ndarray,
+        attack_wins: np.ndarray,
+        signs: np.ndarray,
+        n_def: int,
+        n_atk: int,
+        dense: Optional[bool] = None,
+    ) -> "MatchupMatrix":
+        # 기존 칸에 바뀐 raw 행(추가 +1 / 삭제 -1)을 더한 새 행렬. 팀 번호는 늘어나기만 한다.
+        return MatchupMatrix.from_codes(
+            np.concatenate([self.def_ids, def_codes.astype(np.int32)]),
+            np.concatenate([self.atk_ids, atk_codes.astype(np.int32)]),
+            np.concatenate([self.wins, (attack_wins * signs).astype(np.int32)]),
+            n_def,
+            n_atk,
+            dense,
+            counts=np.concatenate([self.totals, signs]),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        size = self.def_ids.nbytes + self.atk_ids.nbytes + self.wins.nbytes + self.totals.nbytes
+        if self.dense:
+            size += self.win_matrix.nbytes + self.total_matrix.nbytes
+        return size
+
+    def get(self, def_id: int, atk_id: int) -> Tuple[int, int]:
+        if self.dense:
+            return int(self.win_matrix[def_id, atk_id]), int(self.total_matrix[def_id, atk_id])
+        lo, hi = np.searchsorted(self.def_ids, [def_id, def_id + 1])
+        pos = lo + np.searchsorted(self.atk_ids[lo:hi], atk_id)
+        if pos < hi and self.atk_ids[pos] == atk_id:
+            return int(self.wins[pos]), int(self.totals[pos])
+        return 0, 0
+
+    def attack_totals(self, def_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # 공격조합별 (승, 판수). def_mask 가 있으면 그 방어조합들 상대로만 합친다.
+        if self.dense:
+            wins, totals = self.win_matrix, self.total_matrix
+            if def_mask is not None:
+                wins, totals = wins[def_mask], totals[def_mask]
+            return wins.sum(axis=0), totals.sum(axis=0)
+
+        sel = slice(None) if def_mask is None else def_mask[self.def_ids]
+        atk_ids = self.atk_ids[sel]
+        return (
+            np.bincount(atk_ids, weights=self.wins[sel], minlength=self.n_atk).astype(np.int64),
+            np.bincount(atk_ids, weights=self.totals[sel], minlength=self.n_atk).astype(np.int64),
+        )
+
+    def defense_totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        # 방어조합별 (공격측 승, 판수)
+        if self.dense:
+            return self.win_matrix.sum(axis=1), self.total_matrix.sum(axis=1)
+        return (
+            np.bincount(self.def_ids, weights=self.wins, minlength=self.n_def).astype(np.int64),
+            np.bincount(self.def_ids, weights=self.totals, minlength=self.n_def).astype(np.int64),
+        )
+
+
+def rank_by_rate(
+    wins: np.ndarray,
+    totals: np.ndarray,
+    min_tries: int,
+    ascending: bool,
+    limit: int,
+    tie: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    # 판수 조건을 통과한 id 를 승률(동률이면 판수 많은 순)로 정렬해 상위 limit 개.
+    # tie 를 주면 그래도 같을 때 tie 작은 순 (없으면 id 순)
+    eligible = np.flatnonzero(totals >= max(min_tries, 1))
+    if eligible.size == 0:
+        return eligible
+    rates = wins[eligible] / totals[eligible]
+    keys = (-totals[eligible], rates if ascending else -rates)
+    if tie is not None:
+        keys = (tie[eligible],) + keys
+    order = np.lexsort(keys)
+    return eligible[order[:limit]]
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+import traceback
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("counter-bot")
+
+
+# 봇 내부 계측. 명령어 지연 히스토그램, 캐시 적중률, 스토어 로드 단계별 시간,
+# 게시판/알림 폴링 시간과 오류, 나가는 메시지 대기 수를 모아서
+# 봇 이벤트 루프 위의 작은 HTTP 리스너로 Prometheus text 형식으로 내보낸다.
+#   METRICS_PORT=9108 (0 이면 끔), METRICS_HOST=127.0.0.1
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# 초 단위. 명령어는 대부분 수 ms, 시트 로드는 수 초라서 양쪽을 다 덮는다.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(values: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        # 스토어 로드는 to_thread 로 돌 수도 있어서 값 갱신은 lock 으로 감싼다
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: Any) -> None:
+        # 다른 객체가 이미 세고 있는 누적값을 collector 에서 옮겨 올 때
+        with self._lock:
+            self.values[_labels(labels)] = value
+
+    def get(self, **labels: Any) -> float:
+        return self.values.get(_labels(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.set_total(value, **labels)
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket 별 개수..., +Inf 개수], 합계
+        self.counts: Dict[Labels, List[int]] = {}
+        self.sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+                self.sums[key] = 0.0
+            counts[i] += 1
+            self.sums[key] += value
+
+    def count(self, **labels: Any) -> int:
+        return sum(self.counts.get(_labels(labels), ()))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v), self.sums[k]) for k, v in self.counts.items()]
+        lines = []
+        for key, counts, total in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, [('le', _fmt_value(bound))])} {running}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        # 내보낼 때마다 값을 읽어오는 것들 (캐시 적중률, 스토어 크기 등)
+        self.collectors: List[Callable[[], None]] = []
+
+    def add(self, metric: _Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self) -> str:
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception:
+                logger.error("metrics collector 오류:\n" + traceback.format_exc())
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.add(Histogram(
+    "rayabot_command_duration_seconds", "명령어/버튼 처리 시간 (command, status)",
+))
+LOAD_SECONDS = REGISTRY.add(Histogram(
+    "rayabot_store_load_duration_seconds", "스토어 로드 전체 시간 (store)",
+))
+LOAD_PHASE_SECONDS = REGISTRY.add(Gauge(
+    "rayabot_store_load_phase_seconds", "마지막 스토어 로드의 단계별 시간 (store, phase)",
+))
+LOADS = REGISTRY.add(Counter(
+    "rayabot_store_loads_total", "스토어 로드 횟수 (store, result)",
+))
+POLL_SECONDS = REGISTRY.add(Histogram(
+    "rayabot_poll_duration_seconds", "게시판/알림 폴링 시간 (source)",
+))
+POLL_ERRORS = REGISTRY.add(Counter(
+    "rayabot_poll_errors_total", "게시판/알림 폴링 오류 (source, reason)",
+))
+SEND_SECONDS = REGISTRY.add(Histogram(
+    "rayabot_send_duration_seconds", "Discord 로 메시지를 보내는 데 걸린 시간 (target)",
+))
+SEND_QUEUE = REGISTRY.add(Gauge(
+    "rayabot_send_queue_depth", "보내는 중(응답 대기)인 메시지 수",
+))
+CACHE_HITS = REGISTRY.add(Counter("rayabot_cache_hits_total", "캐시 적중 수 (cache)"))
+CACHE_MISSES = REGISTRY.add(Counter("rayabot_cache_misses_total", "캐시 미스 수 (cache)"))
+CACHE_ENTRIES = REGISTRY.add(Gauge("rayabot_cache_entries", "캐시에 들어 있는 항목 수 (cache)"))
+CACHE_HIT_RATIO = REGISTRY.add(Gauge("rayabot_cache_hit_ratio", "캐시 적중률 (cache)"))
+LOG_ERRORS = REGISTRY.add(Counter("rayabot_log_errors_total", "ERROR 이상 로그 수 (logger)"))
+
+# 명령어가 하나 끝날 때마다 불린다 (command, seconds, status). 프로파일러의 "다음 N번" 모드 등.
+command_listeners: List[Callable[[str, float, str], None]] = []
+
+
+def observe_command(command: str, seconds: float, status: str = "ok") -> None:
+    COMMAND_SECONDS.observe(seconds, command=command, status=status)
+    for listener in list(command_listeners):
+        listener(command, seconds, status)
+
+
+def observe_load(store: str, phases: Dict[str, float], ok: bool) -> None:
+    LOADS.inc(store=store, result="ok" if ok else "error")
+    for phase, seconds in phases.items():
+        LOAD_PHASE_SECONDS.set(seconds, store=store, phase=phase)
+    LOAD_SECONDS.observe(sum(phases.values()), store=store)
+
+
+def observe_poll(source: str, seconds: float) -> None:
+    POLL_SECONDS.observe(seconds, source=source)
+
+
+def count_poll_error(source: str, reason: str) -> None:
+    POLL_ERRORS.inc(source=source, reason=reason)
+
+
+@asynccontextmanager
+async def track_send(target: str):
+    # 보내기 시작부터 Discord 응답까지. 레이트 리밋에 걸리면 queue depth 가 쌓인다.
+    SEND_QUEUE.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SEND_QUEUE.dec()
+        SEND_SECONDS.observe(time.perf_counter() - start, target=target)
+
+
+def register_cache(name: str, cache: Any) -> None:
+    # common.LRUCache 처럼 hits / misses / len() 이 있는 캐시
+    def collect() -> None:
+        hits, misses = cache.hits, cache.misses
+        CACHE_HITS.set_total(hits, cache=name)
+        CACHE_MISSES.set_total(misses, cache=name)
+        CACHE_ENTRIES.set(len(cache), cache=name)
+        CACHE_HIT_RATIO.set(hits / (hits + misses) if hits + misses else 0.0, cache=name)
+
+    REGISTRY.collectors.append(collect)
+
+
+class _ErrorLogCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        LOG_ERRORS.inc(logger=record.name)
+
+
+_error_handler: Optional[_ErrorLogCounter] = None
+
+
+def install_log_counter(names: Iterable[str] = ("counter-bot", "notifier")) -> None:
+    global _error_handler
+    if _error_handler is not None:
+        return
+    _error_handler = _ErrorLogCounter()
+    for name in names:
+        logging.getLogger(name).addHandler(_error_handler)
+
+
+# --- HTTP 리스너 ---
+# 봇과 같은 이벤트 루프에서 도는 최소한의 HTTP/1.0 서버. GET /metrics 만 처리한다.
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        # 헤더는 읽고 버린다
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if not line or line in (b"\r\n", b"\n"):
+                break
+
+        parts = request.decode("latin-1").split()
+        path = parts[1].split("?")[0] if len(parts) > 1 else ""
+        if len(parts) > 1 and parts[0] == "GET" and path == "/metrics":
+            status, body, content_type = "200 OK", REGISTRY.collect().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+
+        writer.write(
+            f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except Exception:
+        logger.error("metrics 요청 처리 오류:\n" + traceback.format_exc())
+    finally:
+        writer.close()
+
+
+async def start_http_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> Optional[asyncio.AbstractServer]:
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_handle, host, port)
+    except OSError:
+        logger.error(f"metrics 리스너 시작 실패: {host}:{port}\n" + traceback.format_exc())
+        return None
+    logger.info(f"metrics 리스너: http://{host}:{port}/metrics")
+    return server
@@ -3,17 +3,26 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set
 
 import discord
 import feedparser
 from discord.ext import tasks
 
+import metrics
+
 logger = logging.getLogger("notifier")
 
 CONFIG_PATH = Path("notifiers.json")
+# 소스 조회가 연속으로 실패하면 그 소스만 잠시 건너뛴다 (초)
+BACKOFF_BASE_SECONDS = 300
+BACKOFF_MAX_SECONDS = 3600
 STATE_PATH = Path("notifier_state.json")
+# 로컬 stand-in 서버(standin_server.py)로 돌릴 때 YOUTUBE_FEED_BASE_URL 로 바꾼다
+YOUTUBE_FEED_BASE_URL_DEFAULT = "https://www.youtube.com"
 
 
 def load_json(path: Path, default: Any) -> Any:
@@ -34,13 +43,15 @@ def save_json(path: Path, data: Any) -> None:
 
 
 async def fetch_latest_youtube_video(source: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    # 조회/파싱 실패면 None, 피드는 정상인데 영상이 하나도 없으면 빈 dict
     channel_id = source.get("channel_id")
 
     if not channel_id:
         logger.warning("[YOUTUBE] channel_id 없음: %s", source.get("id"))
         return None
         
-    feed_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+    base_url = os.getenv("YOUTUBE_FEED_BASE_URL", YOUTUBE_FEED_BASE_URL_DEFAULT).rstrip("/")
+    feed_url = f"{base_url}/feeds/videos.xml?channel_id={channel_id}"
 
     logger.info("[YOUTUBE] feed_url=%s", feed_url)
 
@@ -56,12 +67,22 @@ async def fetch_latest_youtube_video(source: Dict[str, Any]) -> Optional[Dict[st
         getattr(parsed, "bozo", None),
     )
 
+    status = getattr(parsed, "status", 200)
+    if status >= 400:
+        logger.warning("[YOUTUBE] feed 조회 실패: status=%s", status)
+        metrics.count_poll_error("youtube", f"http_{status}")
+        return None
+
+    # feedparser 는 예외를 던지지 않고 bozo 로 알려준다. entries 가 있으면 읽을 만큼은 읽은 것.
     if getattr(parsed, "bozo", False):
         logger.warning("[YOUTUBE] feed 파싱 오류: %s", getattr(parsed, "bozo_exception", None))
+        metrics.count_poll_error("youtube", "parse")
+        if not parsed.entries:
+            return None
 
     if not parsed.entries:
-        logger.warning("[YOUTUBE] feed entries 비어있음")
-        return None
+        logger.info("[YOUTUBE] feed entries 비어있음")
+        return {}
 
     entry = parsed.entries[0]
 
@@ -83,6 +104,11 @@ class NotifierManager:
         self.bot = bot
         self.config = load_json(CONFIG_PATH, {"check_interval_seconds": 300, "sources": []})
         self.state = load_json(STATE_PATH, {})
+        # 소스 id -> 폴링 상태 (!상태 에서 보여준다). 재시작하면 비운다.
+        self.poll_state: Dict[str, Dict[str, float]] = {}
+        self.last_poll_at = 0.0
+        # 설정이 잘못된 소스는 한 번만 로그를 남기고 폴링하지 않는다
+        self.config_errors: Set[str] = set()
 
     async def start(self) -> None:
         interval = int(self.config.get("check_interval_seconds", 300))
@@ -96,22 +122,68 @@ class NotifierManager:
     def cog_unload(self) -> None:
         self.check_sources.cancel()
 
+    def _source_state(self, source_id: str) -> Dict[str, float]:
+        if source_id not in self.poll_state:
+            self.poll_state[source_id] = {"last_poll_at": 0.0, "last_ok_at": 0.0, "failures": 0, "next_poll_at": 0.0}
+        return self.poll_state[source_id]
+
+    def _poll_done(self, source_id: str, ok: bool) -> None:
+        state = self._source_state(source_id)
+        now = time.time()
+        state["last_poll_at"] = now
+        if ok:
+            state["last_ok_at"] = now
+            state["failures"] = 0
+            state["next_poll_at"] = 0.0
+            return
+
+        state["failures"] += 1
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** (state["failures"] - 1), BACKOFF_MAX_SECONDS)
+        state["next_poll_at"] = now + delay
+        logger.warning("알림 소스 %s 연속 %s회 실패, %s초 뒤 다시 시도", source_id, state["failures"], delay)
+
+    def _config_error(self, source: Dict[str, Any]) -> Optional[str]:
+        if source.get("type") == "youtube" and not source.get("channel_id"):
+            return "channel_id 없음"
+        return None
+
     @tasks.loop(seconds=300)
     async def check_sources(self) -> None:
+        self.last_poll_at = time.time()
+
         for source in self.config.get("sources", []):
             if not source.get("enabled", True):
                 continue
 
+            source_id = str(source.get("id"))
+            config_error = self._config_error(source)
+            if config_error:
+                if source_id not in self.config_errors:
+                    self.config_errors.add(source_id)
+                    logger.error("알림 소스 %s 설정 오류: %s", source_id, config_error)
+                continue
+            self.config_errors.discard(source_id)
+
+            if time.time() < self._source_state(source_id)["next_poll_at"]:
+                continue
+
             source_type = source.get("type")
+            start = time.perf_counter()
+            ok = False
 
             try:
                 if source_type == "youtube":
-                    await self.check_youtube(source)
+                    ok = await self.check_youtube(source)
                 else:
                     logger.warning("지원하지 않는 알림 타입: %s", source_type)
+                    ok = True
 
             except Exception:
                 logger.exception("알림 체크 실패: %s", source.get("id"))
+                metrics.count_poll_error(str(source_type), "exception")
+
+            metrics.observe_poll(str(source_type), time.perf_counter() - start)
+            self._poll_done(source_id, ok)
 
         save_json(CONFIG_PATH, self.config)
         save_json(STATE_PATH, self.state)
@@ -120,16 +192,21 @@ class NotifierManager:
     async def before_check_sources(self) -> None:
         await self.bot.wait_until_ready()
 
-    async def check_youtube(self, source: Dict[str, Any]) -> None:
+    async def check_youtube(self, source: Dict[str, Any]) -> bool:
+        # 피드를 제대로 읽었으면 True (새 영상이 없거나 피드가 비어 있어도). False 면 backoff 대상.
         source_id = source["id"]
     
         logger.info("[YOUTUBE] 체크 시작: %s", source_id)
     
         latest = await fetch_latest_youtube_video(source)
     
+        if latest is None:
+            logger.warning("[YOUTUBE] 피드 조회/파싱 실패: %s", source_id)
+            return False
+
         if not latest:
-            logger.warning("[YOUTUBE] 최신 영상 없음 또는 피드 파싱 실패: %s", source_id)
-            return
+            logger.info("[YOUTUBE] 아직 올라온 영상 없음: %s", source_id)
+            return True
     
         logger.info(
             "[YOUTUBE] 최신 영상 감지: source=%s, id=%s, title=%s, url=%s, published=%s",
@@ -142,7 +219,7 @@ class NotifierManager:
     
         if not latest["id"]:
             logger.warning("[YOUTUBE] 영상 ID 없음: %s / %s", source_id, latest)
-            return
+            return False
     
         last_seen_id = self.state.get(source_id, {}).get("last_seen_id")
     
@@ -162,11 +239,11 @@ class NotifierManager:
             save_json(STATE_PATH, self.state)
     
             logger.info("[YOUTUBE] 첫 실행이라 알림 없이 상태만 저장: %s", latest["title"])
-            return
+            return True
     
         if latest["id"] == last_seen_id:
             logger.info("[YOUTUBE] 새 영상 없음: %s", source_id)
-            return
+            return True
     
         channel_id = int(source["discord_channel_id"])
         logger.info("[YOUTUBE] 디스코드 채널 조회: %s", channel_id)
@@ -191,7 +268,8 @@ class NotifierManager:
     
         logger.info("[YOUTUBE] 알림 전송 시도: %s", message)
     
-        await channel.send(message)
+        async with metrics.track_send("notifier"):
+            await channel.send(message)
     
         self.state[source_id] = {
             "last_seen_id": latest["id"],
@@ -200,3 +278,4 @@ class NotifierManager:
         save_json(STATE_PATH, self.state)
     
         logger.info("[YOUTUBE] 알림 전송 완료: %s", latest["title"])
+        return True
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import types
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+import numpy as np
+import pandas as pd
+
+import metrics
+
+
+# 운영 중인 봇을 재시작 없이 들여다보는 용도 (!프로파일, 관리자 전용).
+# - 시간 구간 / 다음 N개 명령어 동안 cProfile 을 켜고 hotspot 보고서를 첨부파일로 돌려준다.
+# - 스토어/렌더 캐시의 대략적인 메모리와 tracemalloc 스냅샷 상위 할당 위치를 보여준다.
+#   PROFILE_TRACEMALLOC=1 로 띄우면 스토어 로드 전부터 추적해서 스토어 할당도 줄 단위로 잡힌다.
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_DEFAULT_CALLS = 20
+PROFILE_MAX_CALLS = 500
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))
+TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "5"))
+
+MODE_TIME = "time"
+MODE_CALLS = "calls"
+
+_active: Optional["ProfileSession"] = None
+
+
+class ProfileSession:
+    def __init__(self, mode: str, limit: int):
+        self.mode = mode
+        self.limit = limit
+        self.profile = cProfile.Profile()
+        # 프로파일 중 끝난 명령어 이름 -> 횟수
+        self.calls: Dict[str, int] = {}
+        self.errors = 0
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self._done = asyncio.Event()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def describe(self) -> str:
+        if self.mode == MODE_CALLS:
+            return f"다음 명령어 {self.limit}개 (최대 {PROFILE_MAX_SECONDS}초)"
+        return f"{self.limit}초 동안"
+
+    def summary(self) -> str:
+        return f"{self.elapsed:.1f}초, 명령어 {self.total_calls}개 (오류 {self.errors})"
+
+    def _on_command(self, command: str, seconds: float, status: str) -> None:
+        self.calls[command] = self.calls.get(command, 0) + 1
+        if status != "ok":
+            self.errors += 1
+        if self.mode == MODE_CALLS and self.total_calls >= self.limit:
+            self._done.set()
+
+    async def run(self) -> None:
+        timeout = self.limit if self.mode == MODE_TIME else PROFILE_MAX_SECONDS
+        metrics.command_listeners.append(self._on_command)
+        self.started_at = time.time()
+        start = time.perf_counter()
+        # 이벤트 루프 스레드 전체를 잡는다 (그 사이 도는 모든 명령어/task 포함)
+        self.profile.enable()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.profile.disable()
+            self.elapsed = time.perf_counter() - start
+            metrics.command_listeners.remove(self._on_command)
+
+    def report(self, top: int = PROFILE_TOP) -> str:
+        out = io.StringIO()
+        out.write("# rayabot profile\n")
+        out.write(f"구간: {self.describe()}\n")
+        out.write(f"시작: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}\n")
+        out.write(f"결과: {self.summary()}\n\n")
+
+        out.write("## 명령어\n")
+        for name, n in sorted(self.calls.items(), key=lambda x: -x[1]):
+            out.write(f"  {n:5d}  {name}\n")
+        if not self.calls:
+            out.write("  (없음)\n")
+
+        # 함수 단위 hotspot. cumulative 는 어디서 시간이 새는지, tottime 은 실제로 돈 곳.
+        for sort_key in ("cumulative", "tottime"):
+            out.write(f"\n## {sort_key} 상위 {top}\n")
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.strip_dirs().sort_stats(sort_key).print_stats(top)
+        return out.getvalue()
+
+
+def active_session() -> Optional[ProfileSession]:
+    return _active
+
+
+async def run_profile(session: ProfileSession) -> ProfileSession:
+    # cProfile 은 한 번에 하나만 켤 수 있다
+    global _active
+    if _active is not None:
+        raise RuntimeError("이미 프로파일 중")
+    _active = session
+    try:
+        await session.run()
+    finally:
+        _active = None
+    return session
+
+
+# --- 메모리 ---
+
+# 따라가지 않는 것들 (모듈/클래스/함수, 이벤트 루프, discord 클라이언트 등 전역 상태로 새는 경로)
+_SKIP_TYPES = (
+    types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    asyncio.AbstractEventLoop, discord.Client,
+)
+
+
+def approx_size(obj: Any) -> int:
+    # 컨테이너와 인스턴스 __dict__ 를 따라가며 sys.getsizeof 를 더한다. 공유 객체는 한 번만 센다.
+    # pandas/numpy 는 자체 계산(deep)으로 센다. 대략적인 값이라 로드 중에 바뀌는 dict 는 건너뛴다.
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP_TYPES):
+            continue
+        seen.add(id(o))
+
+        if isinstance(o, pd.DataFrame):
+            total += int(o.memory_usage(deep=True).sum())
+            continue
+        if isinstance(o, (pd.Series, pd.Index)):
+            total += int(o.memory_usage(deep=True))
+            continue
+        if isinstance(o, np.ndarray):
+            total += sys.getsizeof(o) if o.base is None else o.nbytes
+            if o.dtype == object:
+                stack.extend(o.ravel().tolist())
+            continue
+
+        total += sys.getsizeof(o)
+        try:
+            if isinstance(o, dict):
+                items = list(o.items())
+                stack.extend(k for k, _ in items)
+                stack.extend(v for _, v in items)
+            elif isinstance(o, (list, tuple, set, frozenset)):
+                stack.extend(list(o))
+            elif hasattr(o, "__dict__"):
+                stack.append(vars(o))
+            elif hasattr(o, "__slots__"):
+                stack.extend(getattr(o, s) for s in o.__slots__ if hasattr(o, s))
+        except RuntimeError:
+            continue
+    return total
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def start_tracemalloc() -> bool:
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    return True
+
+
+def start_tracemalloc_from_env() -> None:
+    if os.getenv("PROFILE_TRACEMALLOC", "").strip() in ("1", "true", "yes"):
+        start_tracemalloc()
+
+
+def stop_tracemalloc() -> bool:
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def tracemalloc_report(top: int = 25) -> str:
+    if not tracemalloc.is_tracing():
+        return "tracemalloc 꺼짐\n"
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    out = io.StringIO()
+    out.write(f"추적 중 메모리: 현재 {fmt_bytes(current)}, 최대 {fmt_bytes(peak)}\n")
+
+    out.write(f"\n### 파일별 상위 {top}\n")
+    for stat in snapshot.statistics("filename")[:top]:
+        out.write(f"  {fmt_bytes(stat.size):>10}  {stat.count:8d}개  {stat.traceback[0].filename}\n")
+
+    out.write(f"\n### 줄별 상위 {top}\n")
+    for stat in snapshot.statistics("lineno")[:top]:
+        frame = stat.traceback[0]
+        out.write(f"  {fmt_bytes(stat.size):>10}  {stat.count:8d}개  {frame.filename}:{frame.lineno}\n")
+    return out.getvalue()
+
+
+async def memory_report(targets: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+    # 객체 크기 계산은 큰 스토어에서 수 초 걸릴 수 있어서 스레드로 뺀다
+    sizes = await asyncio.to_thread(lambda: {name: approx_size(obj) for name, obj in targets.items()})
+
+    out = io.StringIO()
+    out.write("# rayabot memory\n")
+    out.write(f"시각: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    out.write("## 객체별 대략적인 크기 (공유 객체는 먼저 센 쪽에만 포함)\n")
+    for name, size in sizes.items():
+        out.write(f"  {fmt_bytes(size):>10}  {name}\n")
+    out.write(f"  {fmt_bytes(sum(sizes.values())):>10}  합계\n")
+
+    out.write("\n## tracemalloc\n")
+    out.write(tracemalloc_report())
+    return out.getvalue(), sizes
+
+
+def report_file(kind: str, text: str) -> discord.File:
+    filename = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+    return discord.File(io.BytesIO(text.encode("utf-8")), filename=filename)
+
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def top_functions(session: ProfileSession, n: int = 5) -> List[str]:
+    # 채팅에 바로 보여줄 봇 코드 안의 cumulative 상위 몇 개 (첨부파일 열기 전에 감 잡기용)
+    stats = pstats.Stats(session.profile)
+    rows = []
+    for (filename, lineno, func), (_cc, _nc, tt, ct, _callers) in stats.stats.items():
+        if not filename.startswith(_REPO_DIR) or filename == __file__:
+            continue
+        rows.append((ct, tt, f"{os.path.basename(filename)}:{lineno}({func})"))
+    rows.sort(reverse=True)
+    return [f"{ct * 1000:.0f}ms (self {tt * 1000:.0f}ms) {name}" for ct, tt, name in rows[:n]]
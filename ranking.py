@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+
+# 표본이 적은 조합(3판 3승)이 많이 검증된 조합(50판 45승)보다 위로 오지 않게 하는 정렬 점수.
+# wilson: 승률 신뢰구간 하한 / bayes: 전체 평균 승률을 prior 로 섞은 보정 승률
+WILSON_Z = float(os.getenv("RANK_WILSON_Z", "1.96"))
+BAYES_PRIOR_WEIGHT = float(os.getenv("RANK_PRIOR_WEIGHT", "10"))
+
+RANK_DEFAULT = "default"
+RANK_MODES = (RANK_DEFAULT, "wilson", "bayes")
+SCORE_MODES = ("wilson", "bayes")
+RANK_LABELS = {"default": "기본", "wilson": "신뢰하한", "bayes": "보정승률"}
+# 목록 한 줄 뒤에 붙이는 짧은 점수 이름
+RANK_SHORT = {"wilson": "하한", "bayes": "보정"}
+# 명령어 뒤에 "#신뢰" 처럼 붙이는 단어
+RANK_WORDS = {"기본": "default", "승률": "default", "신뢰": "wilson", "보정": "bayes"}
+
+
+def wilson_lower(success: np.ndarray, total: np.ndarray, z: float = WILSON_Z) -> np.ndarray:
+    success = np.asarray(success, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    safe = np.maximum(total, 1.0)
+    p = success / safe
+    z2 = z * z
+    center = p + z2 / (2 * safe)
+    margin = z * np.sqrt(p * (1 - p) / safe + z2 / (4 * safe * safe))
+    return np.where(total > 0, (center - margin) / (1 + z2 / safe), 0.0)
+
+
+def bayes_rate(
+    success: np.ndarray,
+    total: np.ndarray,
+    prior: float,
+    weight: float = BAYES_PRIOR_WEIGHT,
+) -> np.ndarray:
+    success = np.asarray(success, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    return (success + prior * weight) / (total + weight)
+
+
+def prior_rate(success: np.ndarray, total: np.ndarray) -> float:
+    n = float(np.sum(total))
+    return float(np.sum(success)) / n if n > 0 else 0.5
+
+
+def score_columns(success: np.ndarray, total: np.ndarray, prior: float) -> Dict[str, np.ndarray]:
+    return {"wilson": wilson_lower(success, total), "bayes": bayes_rate(success, total, prior)}
+
+
+def attach_scores(items: List[Dict[str, Any]], prior: float, success_field: str = "success") -> None:
+    # 그때그때 합친 목록(시즌/부분 조회)에 점수 필드를 한 번에 붙인다
+    if not items:
+        return
+    success = np.fromiter((x[success_field] for x in items), dtype=np.float64, count=len(items))
+    total = np.fromiter((x["total"] for x in items), dtype=np.float64, count=len(items))
+    for mode, values in score_columns(success, total, prior).items():
+        for item, value in zip(items, values.tolist()):
+            item[mode] = value
+
+
+def sort_by_score(items: List[Dict[str, Any]], mode: str, lead: Sequence[np.ndarray] = ()) -> List[Dict[str, Any]]:
+    # (lead..., 점수, 판수) 내림차순. 같은 값이면 원래 순서를 유지한다.
+    if len(items) < 2:
+        return list(items)
+    score = np.fromiter((x[mode] for x in items), dtype=np.float64, count=len(items))
+    total = np.fromiter((x["total"] for x in items), dtype=np.int64, count=len(items))
+    order = np.lexsort((-total, -score) + tuple(-np.asarray(k) for k in reversed(lead)))
+    return [items[i] for i in order]
@@ -1,23 +1,36 @@
 from __future__ import annotations
 
+import bisect
 import logging
 import os
+import re
+import time
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
-import common
+from pandas.api.types import union_categoricals
 
 from common import (
     _canon_team_key,
     _csv_url_from_sheet,
-    _is_yes,
+    _downloaded_csv,
+    _df_version,
+    _fits_roster,
+    _hero_bitsets,
+    _iter_bits,
     _join_team_disp,
     _join_team_key,
-    _result_is_attack_lose,
-    _result_is_attack_win,
-    _s,
+    _match_bitset,
+    _min_tries,
+    _str_values,
+    _team_mask,
 )
+import metrics
+from matchup import MatchupMatrix, rank_by_rate
+from ranking import RANK_DEFAULT, SCORE_MODES, attach_scores, prior_rate, score_columns, sort_by_score
+from synergy import HeroSynergy
 
 logger = logging.getLogger("counter-bot")
 
@@ -36,330 +49,1071 @@ RAW_REQUIRED_COLUMNS = [
     "방어조합",
     "공격조합",
 ]
+# 로드할 때 실제로 읽는 컬럼. 비고/방어메인은 어디서도 안 써서 아예 읽지 않는다.
+# 남는 컬럼은 전부 영웅/조합/결과/기준/시즌처럼 같은 값이 계속 반복돼서 category 로 들고 있는다.
+RAW_LOAD_COLUMNS = [c for c in RAW_REQUIRED_COLUMNS if c not in ("비고", "방어메인")]
+# 한 번에 파싱하는 행 수. 청크마다 COUNT 로 바로 걸러서 최대 메모리가 남는 행 수를 따라가게 한다.
+RAW_CSV_CHUNK_ROWS = int(os.getenv("RAW_CSV_CHUNK_ROWS", "50000"))
+# 다시 읽을 때 바뀐 행(추가+삭제)이 전체의 이 비율 이하면 바뀐 행만 기존 집계에 더하고 빼고, 넘으면 전부 다시 집계한다.
+RAW_DELTA_MAX_RATIO = float(os.getenv("RAW_DELTA_MAX_RATIO", "0.2"))
+# 부분 갱신 동안 보정 승률 prior 는 마지막 전체 집계 값을 그대로 쓴다. 실제 평균이 이만큼 넘게 벌어지면 전체 다시 집계.
+RAW_DELTA_PRIOR_DRIFT = float(os.getenv("RAW_DELTA_PRIOR_DRIFT", "0.002"))
+
+
+# 통계 종류별 관점: 기준 필터 / 조회 대상 쪽 / 상대 쪽 / 공격측 결과 중 성공으로 치는 것 / 정렬
+# 조회 대상/상대 쪽은 "def"(방어조합) 또는 "atk"(공격조합)
+STAT_KINDS: Dict[str, Dict[str, Any]] = {
+    "defense":       {"basis": "방어", "target": "def", "other": "atk", "success": "lose", "order": "total"},
+    "my_attack":     {"basis": "공격", "target": "atk", "other": "def", "success": "win",  "order": "total"},
+    "enemy_attack":  {"basis": "방어", "target": "atk", "other": "def", "success": "win",  "order": "total"},
+    "global_attack": {"basis": None,   "target": "atk", "other": "def", "success": "win",  "order": "total"},
+    "attack":        {"basis": "공격", "target": "def", "other": "atk", "success": "win",  "order": "rate"},
+    "overall":       {"basis": None,   "target": "def", "other": "atk", "success": "win",  "order": "rate"},
+}
+
+_SIDE_NAMES = {"def": "defense", "atk": "attack"}
+
+
+def _sort_key_total(x: Dict[str, Any]):
+    return (x["total"], x["rate"], x["success"])
+
+
+def _sort_key_rate(x: Dict[str, Any]):
+    return (x["rate"], x["total"], x["success"])
+
+
+_SORT_KEYS = {"total": _sort_key_total, "rate": _sort_key_rate}
+
+# 시즌 지정: "12" / "10~12" (또는 10-12) / "최근3"
+_SEASON_RECENT_RE = re.compile(r"^최근\s*(\d+)$")
+# 범위 구분자. 시즌 이름에 '-' 가 들어갈 수 있어서 '~' 를 먼저 보고, 양쪽이 모두 시즌 이름인 자리에서만 나눈다.
+_SEASON_SEPARATORS = (re.compile(r"\s*~\s*"), re.compile(r"\s*-\s*"))
+
+
+def _season_sort_key(season: str):
+    # 숫자가 들어간 시즌 이름("S12", "12")은 숫자 순, 나머지는 이름 순
+    m = re.search(r"\d+", season)
+    return (0, int(m.group()), season) if m else (1, 0, season)
+
+
+# kind -> 조회 대상 team key -> 정렬된 상대 조합별 집계
+StatIndex = Dict[str, Dict[str, List[Dict[str, Any]]]]
+
+
+def _group_in_order(keys: Sequence[str], items: List[Dict[str, Any]], order: np.ndarray) -> Dict[str, List[Dict[str, Any]]]:
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for i in order.tolist():
+        grouped.setdefault(keys[i], []).append(items[i])
+    return grouped
+
+
+def _total_cut_index(items: List[Dict[str, Any]], by_total: bool) -> Tuple[List[int], Optional[List[int]]]:
+    # (판수 내림차순으로 늘어놓은 -판수, 그 순서의 원래 index). 판수 순 정렬 목록이면 index 는 필요 없다.
+    if by_total:
+        return [-x["total"] for x in items], None
+    order = sorted(range(len(items)), key=lambda i: -items[i]["total"])
+    return [-items[i]["total"] for i in order], order
+
+
+def _cut_by_total(
+    items: List[Dict[str, Any]],
+    index: Tuple[List[int], Optional[List[int]]],
+    min_tries: int,
+) -> List[Dict[str, Any]]:
+    # 판수 >= min_tries 인 항목을 이분 탐색 한 번으로 잘라낸다 (원래 정렬 순서 유지)
+    neg_totals, order = index
+    n = bisect.bisect_right(neg_totals, -min_tries)
+    if order is None:
+        return items[:n]
+    if n == len(items):
+        return list(items)
+    return [items[i] for i in sorted(order[:n])]
+
+
+def season_label(seasons: Optional[Sequence[str]]) -> str:
+    if not seasons:
+        return ""
+    if len(seasons) == 1:
+        return seasons[0]
+    return f"{seasons[0]}~{seasons[-1]}"
+
+
+def _members(df: pd.DataFrame, prefix: str):
+    return zip(*(_str_values(df[f"{prefix}{i}"]) for i in (1, 2, 3)))
+
+
+def _team_key_col(df: pd.DataFrame, key_col: str, prefix: str) -> List[str]:
+    return [k or _join_team_key(m) for k, m in zip(_str_values(df[key_col]), _members(df, prefix))]
+
+
+def _team_members_col(df: pd.DataFrame, prefix: str) -> List[tuple]:
+    return [_canon_team_key(m) for m in _members(df, prefix)]
+
+
+def _team_disp_col(df: pd.DataFrame, disp_col: str, prefix: str) -> List[str]:
+    return [d or _join_team_disp(m) for d, m in zip(_str_values(df[disp_col]), _members(df, prefix))]
+
+
+def _row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    # 행 내용 해시. category 는 code 가 아니라 값으로 해시돼서 로드마다 category 목록이 달라도 같게 나온다.
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _surplus_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # a 에 b 보다 더 많이 들어 있는 fingerprint 의 a 쪽 행 번호. 내용이 같은 행은 개수로만 비교한다.
+    order = np.argsort(a, kind="stable")
+    sorted_a = a[order]
+    rank = np.arange(len(sorted_a)) - np.searchsorted(sorted_a, sorted_a, side="left")
+    sorted_b = np.sort(b)
+    in_b = np.searchsorted(sorted_b, sorted_a, side="right") - np.searchsorted(sorted_b, sorted_a, side="left")
+    return np.sort(order[rank >= in_b])
+
+
+def _key_order(keys: Sequence[str]) -> np.ndarray:
+    # 팀 번호 -> team key 정렬 순위
+    order = np.empty(len(keys), dtype=np.int64)
+    order[sorted(range(len(keys)), key=keys.__getitem__)] = np.arange(len(keys))
+    return order
+
+
+def _team_total(team_key: str, team_disp: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    success = sum(x["success"] for x in items)
+    total = sum(x["total"] for x in items)
+    return {
+        "team_key": team_key,
+        "team_disp": team_disp,
+        "success": success,
+        "fail": sum(x["fail"] for x in items),
+        "total": total,
+        "rate": success / total if total > 0 else 0.0,
+    }
+
+
+def _merge_items(
+    items: List[Dict[str, Any]],
+    updated: Dict[str, Dict[str, Any]],
+    key_field: str,
+) -> List[Dict[str, Any]]:
+    # 바뀐 항목은 새 dict 로 바꾸고 판수 0 이 된 건 빼고 새로 생긴 항목을 더해서 상대 조합 key 순으로 돌려준다.
+    # 이어서 하는 정렬은 안정 정렬이라 동률이면 _build_stats 처럼 key 순이 된다.
+    merged = []
+    seen = set()
+    for x in items:
+        key = x[key_field]
+        seen.add(key)
+        y = updated.get(key, x)
+        if y["total"] > 0:
+            merged.append(y)
+    merged += [y for key, y in updated.items() if key not in seen and y["total"] > 0]
+    merged.sort(key=lambda x: x[key_field])
+    return merged
+
+
+def _read_counted_rows(path: str, chunk_rows: int = RAW_CSV_CHUNK_ROWS) -> pd.DataFrame:
+    header = [str(c).strip() for c in pd.read_csv(path, dtype=str, nrows=0).columns]
+    missing = [c for c in RAW_LOAD_COLUMNS if c not in header]
+    if missing:
+        logger.warning(f"raw 시트 누락 컬럼 자동 생성: {missing}")
+
+    wanted = set(RAW_LOAD_COLUMNS)
+    kept: List[pd.DataFrame] = []
+    with pd.read_csv(
+        path,
+        dtype=str,
+        keep_default_na=False,
+        usecols=lambda c: str(c).strip() in wanted,
+        chunksize=chunk_rows,
+    ) as reader:
+        for chunk in reader:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            chunk = chunk.reindex(columns=RAW_LOAD_COLUMNS, fill_value="")
+            chunk = chunk[chunk["COUNT"].str.strip().str.upper() == "Y"]
+            kept.append(chunk.astype("category"))
+
+    if not kept:
+        return pd.DataFrame({c: pd.Series(dtype="category") for c in RAW_LOAD_COLUMNS})
+    # 청크마다 category 목록이 달라서 그냥 concat 하면 object 로 풀린다. 컬럼별로 합친다.
+    return pd.DataFrame({
+        c: pd.Series(union_categoricals([chunk[c] for chunk in kept]))
+        for c in RAW_LOAD_COLUMNS
+    })
 
 
 class RawMatchStore:
-    def __init__(self, sheet_url: str, raw_gid: str):
+    def __init__(self, sheet_url: str, raw_gid: str, csv_path: Optional[str] = None):
         self.sheet_url = os.getenv("DATA_SHEET_URL") or sheet_url
         self.raw_gid = os.getenv("RAW_SHEET_GID") or raw_gid
+        # 지정하면 Google Sheets 대신 로컬 CSV 를 읽는다 (벤치마크/오프라인 테스트용)
+        self.csv_path = csv_path
         self.df: Optional[pd.DataFrame] = None
+        self.version: str = ""
+        # kind -> 조회 대상 team key -> 상대 조합별 집계 (판수 제한 없이 정렬된 상태)
+        self.stats: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        # kind -> 조회 대상 team key -> 판수 컷용 인덱스 (_cut_by_total)
+        self.stat_cuts: Dict[str, Dict[str, Tuple[List[int], Optional[List[int]]]]] = {}
+        # 정렬 방식(wilson/bayes) -> 위와 같은 구조. 항목 dict 는 기본 목록과 같은 객체를 공유한다.
+        self.ranked_stats: Dict[str, StatIndex] = {}
+        self.ranked_cuts: Dict[str, Dict[str, Dict[str, Tuple[List[int], Optional[List[int]]]]]] = {}
+        # kind -> 보정 승률 prior (그 kind 전체 평균 승률)
+        self.rank_priors: Dict[str, float] = {}
+        # (방어 team key, 공격 team key) -> 전체 raw 기준 공격 성적 (overall 항목과 같은 dict)
+        self.attack_pairs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # kind -> 조회 대상 team key -> 상대 전체를 합친 팀 단위 집계 (1~2명 조회용)
+        self.team_totals: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # 시즌별 부분 집계. 시즌을 지정한 조회는 해당 시즌들만 그때 더한다.
+        # kind -> 시즌 -> 조회 대상 team key -> [(상대 key, 상대 disp, 성공, 실패, 판수)]
+        self.seasons: List[str] = []
+        self.season_stats: Dict[str, Dict[str, Dict[str, List[tuple]]]] = {}
+        # kind -> 시즌 -> 조회 대상 team key -> (성공, 실패, 판수)
+        self.season_team_totals: Dict[str, Dict[str, Dict[str, Tuple[int, int, int]]]] = {}
+        # side("def"/"atk") -> 팀 번호별 team key / 영웅 -> 팀 번호 bitset
+        self.team_keys: Dict[str, List[str]] = {}
+        self.team_disp: Dict[str, Dict[str, str]] = {}
+        self.team_members: Dict[str, Dict[str, tuple]] = {}
+        self.team_masks: Dict[str, Dict[str, int]] = {}
+        self.hero_bits: Dict[str, Dict[str, int]] = {}
+        # side -> 팀 번호별 team key 정렬 순위. 팀 번호는 부분 갱신을 거치면 전체 집계와 달라져서 동률은 key 순으로 정한다.
+        self.team_order: Dict[str, np.ndarray] = {}
+        # 방어 team 번호 x 공격 team 번호 전적 (기준 무관, 공격측 승 기준)
+        self.matchup: MatchupMatrix = MatchupMatrix.empty()
+        self.season_matchup: Dict[str, MatchupMatrix] = {}
+        # side -> 영웅 / 영웅 2명 조합 승률 (기준 무관)
+        self.synergy: Dict[str, HeroSynergy] = {}
+        # 마지막 로드의 단계별 시간(download/parse/index, 초)과 성공 시각(epoch)
+        self.load_phases: Dict[str, float] = {}
+        self.loaded_at: float = 0.0
+        # 부분 갱신용: self.df 행별 fingerprint, kind -> 전체 (성공, 판수) 합, 마지막 로드 방식
+        self._fingerprints: Optional[np.ndarray] = None
+        self._prior_counts: Dict[str, Tuple[int, int]] = {}
+        self.load_mode: str = ""
 
     def load(self) -> None:
+        phases: Dict[str, float] = {}
+        ok = False
         try:
-            gid = int(str(self.raw_gid))
-            csv_url = _csv_url_from_sheet(self.sheet_url, gid)
+            csv_url = self.csv_path or _csv_url_from_sheet(self.sheet_url, int(str(self.raw_gid)))
             logger.info(f"Loading raw sheet CSV: {csv_url}")
 
-            df = pd.read_csv(csv_url, dtype=str, keep_default_na=False)
-            df.columns = [str(c).strip() for c in df.columns]
-
-            missing = [c for c in RAW_REQUIRED_COLUMNS if c not in df.columns]
-            if missing:
-                logger.warning(f"raw 시트 누락 컬럼 자동 생성: {missing}")
-                for c in missing:
-                    df[c] = ""
-
-            df = df[df["COUNT"].apply(_is_yes)].copy()
-            df.reset_index(drop=True, inplace=True)
+            # 임시 파일로 받은 뒤 필요한 컬럼만 청크로 읽으면서 COUNT=Y 인 행만 남긴다
+            t0 = time.perf_counter()
+            with _downloaded_csv(csv_url) as path:
+                t1 = time.perf_counter()
+                df = _read_counted_rows(path)
+            t2 = time.perf_counter()
+            phases["download"], phases["parse"] = t1 - t0, t2 - t1
 
+            # 이전 로드와 비교해 바뀐 행만 집계에 반영한다. 처음이거나 많이 바뀌었으면 전부 다시 만든다.
+            fingerprints = _row_fingerprints(df)
+            try:
+                delta_ok = self._apply_delta(df, fingerprints)
+            except Exception:
+                logger.error("raw 부분 갱신 실패, 전체 다시 집계:\n" + traceback.format_exc())
+                delta_ok = False
+            if not delta_ok:
+                self._rebuild(df)
+            self._fingerprints = fingerprints
+            self.version = _df_version(df)
             self.df = df
-            logger.info(f"Loaded raw data: shape={df.shape}")
+            phases["index"] = time.perf_counter() - t2
+            self.loaded_at = time.time()
+            ok = True
+            logger.info(f"Loaded raw data: shape={df.shape}, version={self.version}")
         except Exception:
             logger.error("raw 데이터 로드 실패:\n" + traceback.format_exc())
             self.df = None
+            self.version = ""
+            self._fingerprints = None
+            self._prior_counts = {}
+            self.load_mode = ""
+            self.stats = {}
+            self.stat_cuts = {}
+            self.ranked_stats = {}
+            self.ranked_cuts = {}
+            self.rank_priors = {}
+            self.team_totals = {}
+            self.attack_pairs = {}
+            self.seasons = []
+            self.season_stats = {}
+            self.season_team_totals = {}
+            self.team_keys = {}
+            self.team_disp = {}
+            self.team_members = {}
+            self.team_masks = {}
+            self.hero_bits = {}
+            self.team_order = {}
+            self.matchup = MatchupMatrix.empty()
+            self.season_matchup = {}
+            self.synergy = {}
+        finally:
+            self.load_phases = phases
+            metrics.observe_load("raw", phases, ok)
 
-    def _defense_key_from_row(self, row: pd.Series) -> str:
-        key = _s(row.get("방어key"))
-        if key:
-            return key
-        return _join_team_key([row.get("방어조합1"), row.get("방어조합2"), row.get("방어조합3")])
-
-    def _attack_key_from_row(self, row: pd.Series) -> str:
-        key = _s(row.get("공격key"))
-        if key:
-            return key
-        return _join_team_key([row.get("공격조합1"), row.get("공격조합2"), row.get("공격조합3")])
-
-    def _defense_disp_from_row(self, row: pd.Series) -> str:
-        disp = _s(row.get("방어조합"))
-        if disp:
-            return disp
-        return _join_team_disp([row.get("방어조합1"), row.get("방어조합2"), row.get("방어조합3")])
-
-    def _attack_disp_from_row(self, row: pd.Series) -> str:
-        disp = _s(row.get("공격조합"))
-        if disp:
-            return disp
-        return _join_team_disp([row.get("공격조합1"), row.get("공격조합2"), row.get("공격조합3")])
+    def status(self) -> Dict[str, Any]:
+        # !상태 용 요약. 메모리는 비싸서 호출하는 쪽에서 따로 잰다.
+        return {
+            "version": self.version,
+            "rows": 0 if self.df is None else len(self.df),
+            "loaded_at": self.loaded_at,
+            "load_phases": dict(self.load_phases),
+            "index": {
+                "갱신": self.load_mode or "-",
+                "집계 조합": sum(len(v) for v in self.stats.values()),
+                "팀 합계": sum(len(v) for v in self.team_totals.values()),
+                "공격 pair": len(self.attack_pairs),
+                "시즌": len(self.seasons),
+                "매치업": f"{self.matchup.n_def}x{self.matchup.n_atk}",
+                "시너지 영웅": sum(len(s.heroes) for s in self.synergy.values()),
+            },
+        }
 
-    def get_defense_stats(self, defense_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
+    def _rebuild(self, df: pd.DataFrame) -> None:
+        work = self._work_frame(df)
+        self.stats, self.ranked_stats = self._build_stats(work)
+        self.stat_cuts, self.ranked_cuts = self._build_stat_cuts()
+        self.team_totals = self._build_team_totals(work)
+        self.attack_pairs = self._build_attack_pairs()
+        self._build_season_stats(work)
+        self._build_hero_index(work)
+        self.matchup, self.season_matchup = self._build_matchup(work)
+        self.synergy = self._build_synergy(work)
+        self.load_mode = f"전체 {len(df):,}행"
 
-        want_key = _join_team_key(defense_team_input)
-        if len(_canon_team_key(defense_team_input)) != 3:
-            return results
+    def _work_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        result = np.array(_str_values(df["승패여부"]), dtype=object)
+        return pd.DataFrame({
+            "basis": _str_values(df["기준"]),
+            "season": _str_values(df["시즌"]),
+            "def": _team_key_col(df, "방어key", "방어조합"),
+            "atk": _team_key_col(df, "공격key", "공격조합"),
+            "def_disp": _team_disp_col(df, "방어조합", "방어조합"),
+            "atk_disp": _team_disp_col(df, "공격조합", "공격조합"),
+            "def_members": _team_members_col(df, "방어조합"),
+            "atk_members": _team_members_col(df, "공격조합"),
+            "win": result == "승",
+            "lose": result == "패",
+        })
 
-        bucket: Dict[str, Dict[str, Any]] = {}
+    def _build_stats(self, work: pd.DataFrame) -> Tuple[StatIndex, Dict[str, StatIndex]]:
+        # (기본 정렬 목록, 정렬 방식별 목록). 점수와 정렬 순서는 집계 배열에서 한 번에 구한다.
+        stats: StatIndex = {}
+        ranked: Dict[str, StatIndex] = {mode: {} for mode in SCORE_MODES}
+        priors: Dict[str, float] = {}
+        prior_counts: Dict[str, Tuple[int, int]] = {}
+        for kind, spec in STAT_KINDS.items():
+            sub = work if spec["basis"] is None else work[work["basis"] == spec["basis"]]
+            target, other = spec["target"], spec["other"]
+            fail_col = "lose" if spec["success"] == "win" else "win"
+            other_name = _SIDE_NAMES[other]
 
-        for _, row in self.df.iterrows():
-            if _s(row.get("기준")) != "방어":
-                continue
-            if self._defense_key_from_row(row) != want_key:
-                continue
+            # 조합 key 순으로 묶어서 동점이면 key 순이 된다. 부분 갱신도 같은 순서를 만든다.
+            grouped = sub.groupby([target, other], sort=True).agg(
+                total=("win", "size"),
+                success=(spec["success"], "sum"),
+                fail=(fail_col, "sum"),
+                disp=(f"{other}_disp", "first"),
+            )
+
+            total = grouped["total"].to_numpy(dtype=np.int64)
+            success = grouped["success"].to_numpy(dtype=np.int64)
+            rate = np.divide(success, total, out=np.zeros(len(total)), where=total > 0)
+            priors[kind] = prior_rate(success, total)
+            prior_counts[kind] = (int(success.sum()), int(total.sum()))
+            scores = score_columns(success, total, priors[kind])
 
-            atk_key = self._attack_key_from_row(row)
-            atk_disp = self._attack_disp_from_row(row)
-
-            if atk_key not in bucket:
-                bucket[atk_key] = {
-                    "attack_key": atk_key,
-                    "attack_disp": atk_disp,
-                    "success": 0,
-                    "fail": 0,
-                    "total": 0,
-                    "rate": 0.0,
+            target_keys = grouped.index.get_level_values(0)
+            items = [
+                {
+                    f"{other_name}_key": other_key,
+                    f"{other_name}_disp": disp,
+                    "success": int(n_success),
+                    "fail": int(n_fail),
+                    "total": int(n_total),
+                    "rate": n_rate,
+                    "wilson": wilson,
+                    "bayes": bayes,
                 }
+                for other_key, disp, n_success, n_fail, n_total, n_rate, wilson, bayes in zip(
+                    grouped.index.get_level_values(1),
+                    grouped["disp"],
+                    success.tolist(),
+                    grouped["fail"].tolist(),
+                    total.tolist(),
+                    rate.tolist(),
+                    scores["wilson"].tolist(),
+                    scores["bayes"].tolist(),
+                )
+            ]
 
-            bucket[atk_key]["total"] += 1
-            if _result_is_attack_lose(row.get("승패여부")):
-                bucket[atk_key]["success"] += 1
-            elif _result_is_attack_win(row.get("승패여부")):
-                bucket[atk_key]["fail"] += 1
+            # 조회 대상별로 묶은 뒤 내림차순. lexsort 는 안정 정렬이라 동점이면 상대 조합 key 순을 유지한다.
+            codes, _ = pd.factorize(target_keys)
+            if spec["order"] == "total":
+                default_order = np.lexsort((-success, -rate, -total, codes))
+            else:
+                default_order = np.lexsort((-success, -total, -rate, codes))
+            stats[kind] = _group_in_order(target_keys, items, default_order)
+            for mode in SCORE_MODES:
+                order = np.lexsort((-total, -scores[mode], codes))
+                ranked[mode][kind] = _group_in_order(target_keys, items, order)
 
-        for item in bucket.values():
-            if item["total"] < common.MIN_STAT_TRIES:
-                continue
-            item["rate"] = item["success"] / item["total"] if item["total"] > 0 else 0.0
-            results.append(item)
+        self.rank_priors = priors
+        self._prior_counts = prior_counts
+        return stats, ranked
 
-        results.sort(key=lambda x: (x["total"], x["rate"], x["success"]), reverse=True)
-        return results
+    def _build_stat_cuts(self):
+        cuts: Dict[str, Dict[str, Tuple[List[int], Optional[List[int]]]]] = {}
+        for kind, by_target in self.stats.items():
+            by_total = STAT_KINDS[kind]["order"] == "total"
+            cuts[kind] = {key: _total_cut_index(items, by_total) for key, items in by_target.items()}
 
-    def get_my_attack_winrates(self, attack_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
-    
-        want_key = _join_team_key(attack_team_input)
-        if len(_canon_team_key(attack_team_input)) != 3:
-            return results
-    
-        bucket: Dict[str, Dict[str, Any]] = {}
-    
-        for _, row in self.df.iterrows():
-            if _s(row.get("기준")) != "공격":
-                continue
-    
-            if self._attack_key_from_row(row) != want_key:
-                continue
-    
-            def_key = self._defense_key_from_row(row)
-            def_disp = self._defense_disp_from_row(row)
-    
-            if def_key not in bucket:
-                bucket[def_key] = {
-                    "defense_key": def_key,
-                    "defense_disp": def_disp,
-                    "success": 0,
-                    "fail": 0,
-                    "total": 0,
-                    "rate": 0.0,
-                }
-    
-            bucket[def_key]["total"] += 1
-    
-            if _result_is_attack_win(row.get("승패여부")):
-                bucket[def_key]["success"] += 1
-            elif _result_is_attack_lose(row.get("승패여부")):
-                bucket[def_key]["fail"] += 1
-    
-        for item in bucket.values():
-            if item["total"] < common.MIN_STAT_TRIES:
-                continue
-            item["rate"] = item["success"] / item["total"]
-            results.append(item)
-    
-        # 판수 우선 정렬
-        results.sort(key=lambda x: (x["total"], x["rate"], x["success"]), reverse=True)
-        return results
+        ranked_cuts = {
+            mode: {
+                kind: {key: _total_cut_index(items, False) for key, items in by_target.items()}
+                for kind, by_target in by_kind.items()
+            }
+            for mode, by_kind in self.ranked_stats.items()
+        }
+        return cuts, ranked_cuts
 
-    def get_enemy_attack_winrates(self, attack_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
-    
-        want_key = _join_team_key(attack_team_input)
-        if len(_canon_team_key(attack_team_input)) != 3:
-            return results
-    
-        bucket: Dict[str, Dict[str, Any]] = {}
-    
-        for _, row in self.df.iterrows():
-            if _s(row.get("기준")) != "방어":
-                continue
-    
-            if self._attack_key_from_row(row) != want_key:
-                continue
-    
-            def_key = self._defense_key_from_row(row)
-            def_disp = self._defense_disp_from_row(row)
-    
-            if def_key not in bucket:
-                bucket[def_key] = {
-                    "defense_key": def_key,
-                    "defense_disp": def_disp,
-                    "success": 0,
-                    "fail": 0,
-                    "total": 0,
-                    "rate": 0.0,
-                }
-    
-            bucket[def_key]["total"] += 1
-    
-            if _result_is_attack_win(row.get("승패여부")):
-                bucket[def_key]["success"] += 1
-            elif _result_is_attack_lose(row.get("승패여부")):
-                bucket[def_key]["fail"] += 1
-    
-        for item in bucket.values():
-            if item["total"] < common.MIN_STAT_TRIES:
-                continue
-            item["rate"] = item["success"] / item["total"]
-            results.append(item)
-    
-        results.sort(key=lambda x: (x["total"], x["rate"], x["success"]), reverse=True)
-        return results
+    def _full_stats(self, kind: str, team_key: str, min_tries: int, rank: str = RANK_DEFAULT) -> List[Dict[str, Any]]:
+        if rank == RANK_DEFAULT:
+            stats, cuts = self.stats, self.stat_cuts
+        else:
+            stats, cuts = self.ranked_stats.get(rank, {}), self.ranked_cuts.get(rank, {})
+        items = stats.get(kind, {}).get(team_key)
+        if not items:
+            return []
+        return _cut_by_total(items, cuts[kind][team_key], min_tries)
 
-    def get_global_attack_winrates(self, attack_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
-    
-        want_key = _join_team_key(attack_team_input)
-        if len(_canon_team_key(attack_team_input)) != 3:
-            return results
-    
-        bucket: Dict[str, Dict[str, Any]] = {}
-    
-        for _, row in self.df.iterrows():
-            if self._attack_key_from_row(row) != want_key:
-                continue
-    
-            def_key = self._defense_key_from_row(row)
-            def_disp = self._defense_disp_from_row(row)
-    
-            if def_key not in bucket:
-                bucket[def_key] = {
-                    "defense_key": def_key,
-                    "defense_disp": def_disp,
-                    "success": 0,
-                    "fail": 0,
-                    "total": 0,
-                    "rate": 0.0,
-                }
-    
-            bucket[def_key]["total"] += 1
-    
-            if _result_is_attack_win(row.get("승패여부")):
-                bucket[def_key]["success"] += 1
-            elif _result_is_attack_lose(row.get("승패여부")):
-                bucket[def_key]["fail"] += 1
-    
-        for item in bucket.values():
-            if item["total"] < common.MIN_STAT_TRIES:
-                continue
-            item["rate"] = item["success"] / item["total"]
-            results.append(item)
-    
-        results.sort(key=lambda x: (x["total"], x["rate"], x["success"]), reverse=True)
-        return results
+    def _sort_items(self, kind: str, items: List[Dict[str, Any]], rank: str) -> List[Dict[str, Any]]:
+        # 그때그때 합친 목록(시즌/부분 조회) 정렬
+        if rank == RANK_DEFAULT:
+            items.sort(key=_SORT_KEYS[STAT_KINDS[kind]["order"]], reverse=True)
+            return items
+        attach_scores(items, self.rank_priors.get(kind, 0.5))
+        return sort_by_score(items, rank)
 
-    def get_attack_stats(self, defense_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
+    def _build_attack_pairs(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        # 카운터 시트처럼 (상대 방어, 우리 공격) 한 쌍을 바로 찾는 쪽에서 쓰는 key 인덱스
+        return {
+            (def_key, item["attack_key"]): item
+            for def_key, items in self.stats.get("overall", {}).items()
+            for item in items
+        }
 
-        want_key = _join_team_key(defense_team_input)
-        if len(_canon_team_key(defense_team_input)) != 3:
-            return results
+    def get_attack_pair(self, defense_key: str, attack_key: str) -> Optional[Dict[str, Any]]:
+        return self.attack_pairs.get((defense_key, attack_key))
 
-        bucket: Dict[str, Dict[str, Any]] = {}
+    def _build_team_totals(self, work: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        disp = {
+            side: dict(zip(work[side][::-1], work[f"{side}_disp"][::-1]))
+            for side in ("def", "atk")
+        }
+        self.team_disp = disp
 
-        for _, row in self.df.iterrows():
-            if _s(row.get("기준")) != "공격":
-                continue
-            if self._defense_key_from_row(row) != want_key:
-                continue
+        totals: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for kind, by_target in self.stats.items():
+            side = STAT_KINDS[kind]["target"]
+            by_team = {
+                team_key: _team_total(team_key, disp[side].get(team_key, team_key), items)
+                for team_key, items in by_target.items()
+            }
+            attach_scores(list(by_team.values()), self.rank_priors.get(kind, 0.5))
+            totals[kind] = by_team
+        return totals
 
-            atk_key = self._attack_key_from_row(row)
-            atk_disp = self._attack_disp_from_row(row)
-
-            if atk_key not in bucket:
-                bucket[atk_key] = {
-                    "attack_key": atk_key,
-                    "attack_disp": atk_disp,
-                    "success": 0,
-                    "fail": 0,
-                    "total": 0,
-                    "rate": 0.0,
-                }
+    def _build_season_stats(self, work: pd.DataFrame) -> None:
+        season_stats: Dict[str, Dict[str, Dict[str, List[tuple]]]] = {}
+        season_team_totals: Dict[str, Dict[str, Dict[str, Tuple[int, int, int]]]] = {}
+        for kind, spec in STAT_KINDS.items():
+            sub = work if spec["basis"] is None else work[work["basis"] == spec["basis"]]
+            target, other = spec["target"], spec["other"]
+            fail_col = "lose" if spec["success"] == "win" else "win"
 
-            bucket[atk_key]["total"] += 1
-            if _result_is_attack_win(row.get("승패여부")):
-                bucket[atk_key]["success"] += 1
-            elif _result_is_attack_lose(row.get("승패여부")):
-                bucket[atk_key]["fail"] += 1
+            grouped = sub.groupby(["season", target, other], sort=True).agg(
+                total=("win", "size"),
+                success=(spec["success"], "sum"),
+                fail=(fail_col, "sum"),
+                disp=(f"{other}_disp", "first"),
+            )
 
-        for item in bucket.values():
-            if item["total"] < common.MIN_STAT_TRIES:
-                continue
-            item["rate"] = item["success"] / item["total"] if item["total"] > 0 else 0.0
-            results.append(item)
+            by_season: Dict[str, Dict[str, List[tuple]]] = {}
+            totals: Dict[str, Dict[str, List[int]]] = {}
+            for (season, target_key, other_key), total, success, fail, disp in grouped.itertuples(name=None):
+                if not season:
+                    continue
+                row = (other_key, disp, int(success), int(fail), int(total))
+                by_season.setdefault(season, {}).setdefault(target_key, []).append(row)
+                acc = totals.setdefault(season, {}).setdefault(target_key, [0, 0, 0])
+                acc[0] += row[2]
+                acc[1] += row[3]
+                acc[2] += row[4]
 
-        results.sort(key=lambda x: (x["rate"], x["total"], x["success"]), reverse=True)
-        return results
+            season_stats[kind] = by_season
+            season_team_totals[kind] = {
+                season: {k: tuple(v) for k, v in by_team.items()} for season, by_team in totals.items()
+            }
 
-    def get_overall_stats(self, defense_team_input: List[str]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        if self.df is None or self.df.empty:
-            return results
+        self.seasons = sorted({s for s in work["season"].unique() if s}, key=_season_sort_key)
+        self.season_stats = season_stats
+        self.season_team_totals = season_team_totals
+
+    def select_seasons(self, spec: str) -> Optional[Tuple[str, ...]]:
+        # None = 시즌 지정 없음(전체), () = 해당하는 시즌 없음
+        spec = (spec or "").strip()
+        if not spec:
+            return None
+
+        m = _SEASON_RECENT_RE.match(spec)
+        if m:
+            n = int(m.group(1))
+            return tuple(self.seasons[-n:]) if n > 0 else ()
+
+        if spec in self.seasons:
+            return (spec,)
+
+        for sep in _SEASON_SEPARATORS:
+            for m in sep.finditer(spec):
+                first, last = spec[:m.start()], spec[m.end():]
+                if first in self.seasons and last in self.seasons:
+                    lo, hi = sorted((self.seasons.index(first), self.seasons.index(last)))
+                    return tuple(self.seasons[lo:hi + 1])
+        return ()
+
+    def season_span(self, seasons: Optional[Sequence[str]]) -> str:
+        # select_seasons 결과(항상 연속 구간)를 "처음-끝" 시즌 번호로. 페이지 버튼 custom_id 용.
+        if not seasons:
+            return ""
+        return f"{self.seasons.index(seasons[0])}-{self.seasons.index(seasons[-1])}"
+
+    def seasons_from_span(self, span: str) -> Optional[Tuple[str, ...]]:
+        # season_span 의 반대. None = 전체, () = 지금 시즌 목록에 없는 범위
+        if not span:
+            return None
+        lo, _, hi = span.partition("-")
+        if not (lo.isdigit() and hi.isdigit()) or not int(lo) <= int(hi) < len(self.seasons):
+            return ()
+        return tuple(self.seasons[int(lo):int(hi) + 1])
+
+    def _season_items(
+        self,
+        kind: str,
+        target_key: str,
+        seasons: Sequence[str],
+        rank: str = RANK_DEFAULT,
+    ) -> List[Dict[str, Any]]:
+        other_name = _SIDE_NAMES[STAT_KINDS[kind]["other"]]
+        by_season = self.season_stats.get(kind, {})
+
+        acc: Dict[str, List[Any]] = {}
+        for season in seasons:
+            for other_key, disp, success, fail, total in by_season.get(season, {}).get(target_key, ()):
+                cur = acc.get(other_key)
+                if cur is None:
+                    acc[other_key] = [disp, success, fail, total]
+                else:
+                    cur[1] += success
+                    cur[2] += fail
+                    cur[3] += total
+
+        items = [
+            {
+                f"{other_name}_key": other_key,
+                f"{other_name}_disp": disp,
+                "success": success,
+                "fail": fail,
+                "total": total,
+                "rate": success / total if total > 0 else 0.0,
+            }
+            for other_key, (disp, success, fail, total) in acc.items()
+        ]
+        return self._sort_items(kind, items, rank)
+
+    def _season_team_total(self, kind: str, team_key: str, seasons: Sequence[str]) -> Optional[Dict[str, Any]]:
+        by_season = self.season_team_totals.get(kind, {})
+        success = fail = total = 0
+        for season in seasons:
+            s_success, s_fail, s_total = by_season.get(season, {}).get(team_key, (0, 0, 0))
+            success += s_success
+            fail += s_fail
+            total += s_total
+        if total == 0:
+            return None
+        side = STAT_KINDS[kind]["target"]
+        return {
+            "team_key": team_key,
+            "team_disp": self.team_disp.get(side, {}).get(team_key, team_key),
+            "success": success,
+            "fail": fail,
+            "total": total,
+            "rate": success / total,
+        }
+
+    def _build_hero_index(self, work: pd.DataFrame) -> None:
+        team_keys: Dict[str, List[str]] = {}
+        team_members: Dict[str, Dict[str, tuple]] = {}
+        team_masks: Dict[str, Dict[str, int]] = {}
+        hero_bits: Dict[str, Dict[str, int]] = {}
+        for side in ("def", "atk"):
+            members = dict(zip(work[side][::-1], work[f"{side}_members"][::-1]))
+            keys = list(dict.fromkeys(work[side]))
+            team_keys[side] = keys
+            team_members[side] = members
+            team_masks[side] = {k: _team_mask(members[k]) for k in keys}
+            hero_bits[side] = _hero_bitsets([members[k] for k in keys])
+        self.team_keys = team_keys
+        self.team_members = team_members
+        self.team_masks = team_masks
+        self.hero_bits = hero_bits
+        self.team_order = {side: _key_order(keys) for side, keys in team_keys.items()}
+
+    def _build_matchup(self, work: pd.DataFrame) -> Tuple[MatchupMatrix, Dict[str, MatchupMatrix]]:
+        def_codes = pd.Categorical(work["def"], categories=self.team_keys["def"]).codes
+        atk_codes = pd.Categorical(work["atk"], categories=self.team_keys["atk"]).codes
+        wins = work["win"].to_numpy()
+        n_def, n_atk = len(self.team_keys["def"]), len(self.team_keys["atk"])
+        matchup = MatchupMatrix.from_codes(def_codes, atk_codes, wins, n_def, n_atk)
+
+        # 시즌별 행렬은 합쳐서 쓰기만 하므로 항상 쌍 목록(COO)으로 둔다
+        seasons = work["season"].to_numpy()
+        by_season: Dict[str, MatchupMatrix] = {}
+        for season in self.seasons:
+            mask = seasons == season
+            by_season[season] = MatchupMatrix.from_codes(
+                def_codes[mask], atk_codes[mask], wins[mask], n_def, n_atk, dense=False,
+            )
+        logger.info(
+            f"Built matchup matrix: {matchup.n_def}x{matchup.n_atk}, "
+            f"pairs={len(matchup.totals)}, dense={matchup.dense}, seasons={len(by_season)}"
+        )
+        return matchup, by_season
+
+    def _build_synergy(self, work: pd.DataFrame) -> Dict[str, HeroSynergy]:
+        # 공격측은 승, 방어측은 공격측 패를 성공으로 센다
+        synergy = {
+            "atk": HeroSynergy.from_members(work["atk_members"].tolist(), work["win"].to_numpy()),
+            "def": HeroSynergy.from_members(work["def_members"].tolist(), work["lose"].to_numpy()),
+        }
+        logger.info(
+            "Built hero synergy: "
+            + ", ".join(f"{side}=heroes {len(s.heroes)}/pairs {len(s.pair_totals)}" for side, s in synergy.items())
+        )
+        return synergy
+
+    # --- 부분 갱신 ---
+    # 이전 로드의 행 fingerprint 와 비교해 추가/삭제된 행(내용이 바뀐 행은 삭제 + 추가)만 골라
+    # 그 행들의 판수를 +1/-1 로 기존 집계에 더한다. 건드린 조회 대상(team key)의 목록/컷/팀 합계만 새로 만들고
+    # 나머지는 그대로 둔다. 바뀐 항목은 새 dict 로 만들어서 이미 보여준 페이지의 결과는 바뀌지 않는다.
+
+    def _apply_delta(self, df: pd.DataFrame, fingerprints: np.ndarray) -> bool:
+        if self.df is None or self._fingerprints is None:
+            return False
+
+        old = self._fingerprints
+        if len(fingerprints) >= len(old) and np.array_equal(fingerprints[:len(old)], old):
+            # 흔한 경우: 뒤에 행만 붙었다
+            added, removed = np.arange(len(old), len(fingerprints)), np.zeros(0, dtype=np.int64)
+        else:
+            added, removed = _surplus_rows(fingerprints, old), _surplus_rows(old, fingerprints)
+        n_changed = len(added) + len(removed)
+        if n_changed > RAW_DELTA_MAX_RATIO * max(len(fingerprints), 1):
+            logger.info(f"raw 변경 행이 많아서 전체 다시 집계: 추가 {len(added)}, 삭제 {len(removed)}")
+            return False
+        if not n_changed:
+            self.load_mode = "변경 없음"
+            return True
+
+        delta = self._delta_frame(df, added, removed)
+        prior_counts = self._delta_prior_counts(delta)
+        if prior_counts is None:
+            return False
+
+        self._prior_counts = prior_counts
+        self._apply_team_delta(delta)
+        touched = sum(self._apply_stat_delta(kind, delta) for kind in STAT_KINDS)
+        self._apply_season_delta(df, delta)
+        self._apply_matchup_delta(delta)
+        self._apply_synergy_delta(delta)
+        self.load_mode = f"부분 +{len(added):,}/-{len(removed):,}행"
+        logger.info(f"raw 부분 갱신: 추가 {len(added)}행, 삭제 {len(removed)}행, 조회 대상 {touched}개 갱신")
+        return True
+
+    def _delta_frame(self, df: pd.DataFrame, added: np.ndarray, removed: np.ndarray) -> pd.DataFrame:
+        # 추가된 행을 앞에 둬서 새로 생긴 조합의 표시 이름(disp, first)은 추가된 행에서 가져간다
+        parts = []
+        for frame, rows, sign in ((df, added, 1), (self.df, removed, -1)):
+            if len(rows):
+                part = self._work_frame(frame.iloc[rows])
+                part["n"] = sign
+                parts.append(part)
+        delta = pd.concat(parts, ignore_index=True)
+        delta["win_n"] = delta["win"].astype(np.int64) * delta["n"]
+        delta["lose_n"] = delta["lose"].astype(np.int64) * delta["n"]
+        return delta
+
+    def _delta_prior_counts(self, delta: pd.DataFrame) -> Optional[Dict[str, Tuple[int, int]]]:
+        counts: Dict[str, Tuple[int, int]] = {}
+        for kind, spec in STAT_KINDS.items():
+            sub = delta if spec["basis"] is None else delta[delta["basis"] == spec["basis"]]
+            success, total = self._prior_counts.get(kind, (0, 0))
+            counts[kind] = (success + int(sub[f"{spec['success']}_n"].sum()), total + int(sub["n"].sum()))
+            drift = abs(prior_rate(np.array([counts[kind][0]]), np.array([counts[kind][1]])) - self.rank_priors.get(kind, 0.5))
+            if drift > RAW_DELTA_PRIOR_DRIFT:
+                logger.info(f"raw {kind} 평균 승률이 {drift:.4f} 움직여서 전체 다시 집계")
+                return None
+        return counts
+
+    def _apply_team_delta(self, delta: pd.DataFrame) -> None:
+        # 새로 나온 팀은 번호를 뒤에 붙인다. 판수가 0 이 된 팀도 번호는 다음 전체 집계까지 남겨 둔다.
+        added = delta[delta["n"] > 0]
+        for side in ("def", "atk"):
+            keys, members, disp = self.team_keys[side], self.team_members[side], self.team_disp[side]
+            hero_bits = self.hero_bits[side]
+            new_keys = []
+            for key, team, name in zip(added[side], added[f"{side}_members"], added[f"{side}_disp"]):
+                disp.setdefault(key, name)
+                if key in members:
+                    continue
+                members[key] = team
+                self.team_masks[side][key] = _team_mask(team)
+                for hero in team:
+                    hero_bits[hero] = hero_bits.get(hero, 0) | (1 << (len(keys) + len(new_keys)))
+                new_keys.append(key)
+            if new_keys:
+                self.team_keys[side] = keys + new_keys
+                self.team_order[side] = _key_order(self.team_keys[side])
+
+    def _apply_stat_delta(self, kind: str, delta: pd.DataFrame) -> int:
+        spec = STAT_KINDS[kind]
+        sub = delta if spec["basis"] is None else delta[delta["basis"] == spec["basis"]]
+        if sub.empty:
+            return 0
+        target, other = spec["target"], spec["other"]
+        fail_col = "lose" if spec["success"] == "win" else "win"
+        other_name = _SIDE_NAMES[other]
+        key_field, disp_field = f"{other_name}_key", f"{other_name}_disp"
+
+        grouped = sub.groupby([target, other], sort=False).agg(
+            total=("n", "sum"),
+            success=(f"{spec['success']}_n", "sum"),
+            fail=(f"{fail_col}_n", "sum"),
+            disp=(f"{other}_disp", "first"),
+        )
+        changes: Dict[str, List[tuple]] = {}
+        for (target_key, other_key), total, success, fail, disp in grouped.itertuples(name=None):
+            changes.setdefault(target_key, []).append((other_key, int(success), int(fail), int(total), disp))
+
+        prior = self.rank_priors.get(kind, 0.5)
+        by_total = spec["order"] == "total"
+        stats, cuts, totals = self.stats[kind], self.stat_cuts[kind], self.team_totals[kind]
+        team_disp = self.team_disp[target]
 
-        want_key = _join_team_key(defense_team_input)
-        if len(_canon_team_key(defense_team_input)) != 3:
-            return results
+        # 바뀐 항목을 먼저 전부 만들고 점수는 한 번에 붙인다
+        updates: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for target_key, rows in changes.items():
+            current = {x[key_field]: x for x in stats.get(target_key, ())}
+            updated = updates[target_key] = {}
+            for other_key, success, fail, total, disp in rows:
+                cur = current.get(other_key)
+                if cur is None:
+                    item = {key_field: other_key, disp_field: disp, "success": success, "fail": fail, "total": total}
+                else:
+                    item = dict(cur)
+                    item["success"] += success
+                    item["fail"] += fail
+                    item["total"] += total
+                item["rate"] = item["success"] / item["total"] if item["total"] > 0 else 0.0
+                updated[other_key] = item
+        attach_scores([x for updated in updates.values() for x in updated.values() if x["total"] > 0], prior)
 
-        bucket: Dict[str, Dict[str, Any]] = {}
+        team_rows = []
+        for target_key, updated in updates.items():
+            if kind == "overall":
+                for other_key, item in updated.items():
+                    if item["total"] > 0:
+                        self.attack_pairs[(target_key, other_key)] = item
+                    else:
+                        self.attack_pairs.pop((target_key, other_key), None)
 
-        for _, row in self.df.iterrows():
-            if self._defense_key_from_row(row) != want_key:
+            items = _merge_items(stats.get(target_key, []), updated, key_field)
+            if not items:
+                for index in [stats, cuts, totals] + [self.ranked_stats[m][kind] for m in SCORE_MODES] \
+                        + [self.ranked_cuts[m][kind] for m in SCORE_MODES]:
+                    index.pop(target_key, None)
                 continue
 
-            atk_key = self._attack_key_from_row(row)
-            atk_disp = self._attack_disp_from_row(row)
-
-            if atk_key not in bucket:
-                bucket[atk_key] = {
-                    "attack_key": atk_key,
-                    "attack_disp": atk_disp,
-                    "success": 0,
-                    "fail": 0,
-                    "total": 0,
-                    "rate": 0.0,
-                }
+            items.sort(key=_SORT_KEYS[spec["order"]], reverse=True)
+            stats[target_key] = items
+            cuts[target_key] = _total_cut_index(items, by_total)
+            for mode in SCORE_MODES:
+                # sort_by_score 와 같은 (점수, 판수) 내림차순 안정 정렬. 목록이 짧아서 numpy 없이 한다.
+                ranked = _merge_items(self.ranked_stats[mode][kind].get(target_key, []), updated, key_field)
+                ranked.sort(key=lambda x, m=mode: (x[m], x["total"]), reverse=True)
+                self.ranked_stats[mode][kind][target_key] = ranked
+                self.ranked_cuts[mode][kind][target_key] = _total_cut_index(ranked, False)
+            team_rows.append(_team_total(target_key, team_disp.get(target_key, target_key), items))
 
-            bucket[atk_key]["total"] += 1
-            if _result_is_attack_win(row.get("승패여부")):
-                bucket[atk_key]["success"] += 1
-            elif _result_is_attack_lose(row.get("승패여부")):
-                bucket[atk_key]["fail"] += 1
+        attach_scores(team_rows, prior)
+        for team_total in team_rows:
+            totals[team_total["team_key"]] = team_total
+        return len(changes)
 
-        for item in bucket.values():
-            if item["total"] < common.MIN_STAT_TRIES:
+    def _apply_season_delta(self, df: pd.DataFrame, delta: pd.DataFrame) -> None:
+        for kind, spec in STAT_KINDS.items():
+            sub = delta if spec["basis"] is None else delta[delta["basis"] == spec["basis"]]
+            if sub.empty:
                 continue
-            item["rate"] = item["success"] / item["total"] if item["total"] > 0 else 0.0
-            results.append(item)
+            target, other = spec["target"], spec["other"]
+            fail_col = "lose" if spec["success"] == "win" else "win"
+            grouped = sub.groupby(["season", target, other], sort=False).agg(
+                total=("n", "sum"),
+                success=(f"{spec['success']}_n", "sum"),
+                fail=(f"{fail_col}_n", "sum"),
+                disp=(f"{other}_disp", "first"),
+            )
+            changes: Dict[Tuple[str, str], List[tuple]] = {}
+            for (season, target_key, other_key), total, success, fail, disp in grouped.itertuples(name=None):
+                if season:
+                    changes.setdefault((season, target_key), []).append((other_key, disp, int(success), int(fail), int(total)))
+
+            by_season = self.season_stats.setdefault(kind, {})
+            season_totals = self.season_team_totals.setdefault(kind, {})
+            for (season, target_key), rows in changes.items():
+                current = list(by_season.get(season, {}).get(target_key, ()))
+                pos = {row[0]: i for i, row in enumerate(current)}
+                for other_key, disp, success, fail, total in rows:
+                    i = pos.get(other_key)
+                    if i is None:
+                        pos[other_key] = len(current)
+                        current.append((other_key, disp, success, fail, total))
+                    else:
+                        _, old_disp, s, f, t = current[i]
+                        current[i] = (other_key, old_disp, s + success, f + fail, t + total)
+                current = sorted((row for row in current if row[4] > 0), key=lambda row: row[0])
+
+                s, f, t = season_totals.get(season, {}).get(target_key, (0, 0, 0))
+                s += sum(row[2] for row in rows)
+                f += sum(row[3] for row in rows)
+                t += sum(row[4] for row in rows)
+                if current:
+                    by_season.setdefault(season, {})[target_key] = current
+                    season_totals.setdefault(season, {})[target_key] = (s, f, t)
+                else:
+                    by_season.get(season, {}).pop(target_key, None)
+                    season_totals.get(season, {}).pop(target_key, None)
+
+        seasons = {str(s).strip() for s in df["시즌"].unique()}
+        self.seasons = sorted((s for s in seasons if s), key=_season_sort_key)
+        for kind in STAT_KINDS:
+            for index in (self.season_stats.get(kind, {}), self.season_team_totals.get(kind, {})):
+                for season in [s for s in index if s not in seasons]:
+                    del index[season]
+
+    def _apply_matchup_delta(self, delta: pd.DataFrame) -> None:
+        def_codes = pd.Categorical(delta["def"], categories=self.team_keys["def"]).codes
+        atk_codes = pd.Categorical(delta["atk"], categories=self.team_keys["atk"]).codes
+        wins = delta["win"].to_numpy().astype(np.int64)
+        signs = delta["n"].to_numpy()
+        n_def, n_atk = len(self.team_keys["def"]), len(self.team_keys["atk"])
+        self.matchup = self.matchup.with_delta(def_codes, atk_codes, wins, signs, n_def, n_atk)
+
+        # 바뀐 행이 없는 시즌도 팀 수가 늘었으면 크기를 맞춰 둔다 (시즌 행렬끼리 더해서 쓰므로)
+        seasons = delta["season"].to_numpy()
+        season_matchup: Dict[str, MatchupMatrix] = {}
+        for season in self.seasons:
+            base = self.season_matchup.get(season, MatchupMatrix.empty())
+            mask = seasons == season
+            if mask.any() or (base.n_def, base.n_atk) != (n_def, n_atk):
+                base = base.with_delta(
+                    def_codes[mask], atk_codes[mask], wins[mask], signs[mask], n_def, n_atk, dense=False,
+                )
+            season_matchup[season] = base
+        self.season_matchup = season_matchup
+
+    def _apply_synergy_delta(self, delta: pd.DataFrame) -> None:
+        signs = delta["n"].to_numpy()
+        self.synergy = {
+            "atk": self.synergy["atk"].combine(
+                HeroSynergy.from_members(delta["atk_members"].tolist(), delta["win_n"].to_numpy(), signs)
+            ),
+            "def": self.synergy["def"].combine(
+                HeroSynergy.from_members(delta["def_members"].tolist(), delta["lose_n"].to_numpy(), signs)
+            ),
+        }
+
+    def get_hero_ranking(self, side: str, limit: int = 10, min_tries: Optional[int] = None) -> List[Dict[str, Any]]:
+        synergy = self.synergy.get(side)
+        if synergy is None:
+            return []
+        return synergy.top_heroes(_min_tries(min_tries), limit)
+
+    def get_hero_partners(
+        self,
+        side: str,
+        hero: str,
+        limit: int = 10,
+        min_tries: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        # (hero 자신의 승률, 같이 쓴 영웅별 승률)
+        synergy = self.synergy.get(side)
+        if synergy is None:
+            return {"hero": hero, "success": 0, "total": 0, "rate": 0.0}, []
+        return synergy.hero_summary(hero), synergy.partners(hero, _min_tries(min_tries), limit)
+
+    def get_matchup_summary(
+        self,
+        defense_heroes: Sequence[str] = (),
+        limit: int = 10,
+        seasons: Optional[Sequence[str]] = None,
+        min_tries: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        # 행렬 합계 한 번으로 "가장 잘 뚫는 공격조합" 과 "가장 단단한 방어조합" 을 함께 뽑는다.
+        # defense_heroes 가 있으면 그 영웅들이 들어간 방어조합만 대상으로 한다.
+        m = self.matchup
+        if seasons is None:
+            matrices = [m]
+        else:
+            matrices = [self.season_matchup[s] for s in seasons if s in self.season_matchup]
+        def_keys, atk_keys = self.team_keys.get("def", []), self.team_keys.get("atk", [])
+        min_tries = _min_tries(min_tries)
+
+        def_mask: Optional[np.ndarray] = None
+        want = _canon_team_key(defense_heroes)
+        if want:
+            def_mask = np.zeros(m.n_def, dtype=bool)
+            def_mask[list(_iter_bits(_match_bitset(self.hero_bits.get("def", {}), want)))] = True
+
+        atk_wins, atk_totals = np.zeros(m.n_atk, dtype=np.int64), np.zeros(m.n_atk, dtype=np.int64)
+        def_wins, def_totals = np.zeros(m.n_def, dtype=np.int64), np.zeros(m.n_def, dtype=np.int64)
+        for matrix in matrices:
+            wins, totals = matrix.attack_totals(def_mask)
+            atk_wins, atk_totals = atk_wins + wins, atk_totals + totals
+            wins, totals = matrix.defense_totals()
+            def_wins, def_totals = def_wins + wins, def_totals + totals
+        if def_mask is not None:
+            def_totals = np.where(def_mask, def_totals, 0)
+
+        attacks = [
+            {
+                "attack_key": atk_keys[i],
+                "attack_disp": self.team_disp["atk"].get(atk_keys[i], atk_keys[i]),
+                "success": int(atk_wins[i]),
+                "total": int(atk_totals[i]),
+                "rate": float(atk_wins[i] / atk_totals[i]),
+            }
+            for i in rank_by_rate(atk_wins, atk_totals, min_tries, ascending=False, limit=limit, tie=self.team_order.get("atk"))
+        ]
+        defenses = [
+            {
+                "defense_key": def_keys[i],
+                "defense_disp": self.team_disp["def"].get(def_keys[i], def_keys[i]),
+                "success": int(def_wins[i]),
+                "total": int(def_totals[i]),
+                "rate": float(def_wins[i] / def_totals[i]),
+            }
+            for i in rank_by_rate(def_wins, def_totals, min_tries, ascending=True, limit=limit, tie=self.team_order.get("def"))
+        ]
+        return {"attacks": attacks, "defenses": defenses}
+
+    def _partial_stats(
+        self,
+        kind: str,
+        heroes: Sequence[str],
+        seasons: Optional[Sequence[str]] = None,
+        rank: str = RANK_DEFAULT,
+    ) -> List[Dict[str, Any]]:
+        # 1~2명만 아는 경우: 그 영웅들이 모두 들어간 팀을 bitset 교집합으로 찾아 팀 단위 집계를 돌려준다
+        side = STAT_KINDS[kind]["target"]
+        keys = self.team_keys.get(side, [])
+        totals = self.team_totals.get(kind, {})
+        bits = _match_bitset(self.hero_bits.get(side, {}), heroes)
+
+        if seasons is None:
+            items = [totals[keys[i]] for i in _iter_bits(bits) if keys[i] in totals]
+        else:
+            found = (self._season_team_total(kind, keys[i], seasons) for i in _iter_bits(bits))
+            items = [x for x in found if x is not None]
+        # 팀 번호 순서는 부분 갱신을 거치면 처음 나온 순서와 달라질 수 있어서 동률은 team key 순으로 맞춘다
+        items.sort(key=lambda x: x["team_key"])
+        return self._sort_items(kind, items, rank)
+
+    def get_stats(
+        self,
+        kind: str,
+        team_input: Sequence[str],
+        roster_mask: Optional[int] = None,
+        seasons: Optional[Sequence[str]] = None,
+        min_tries: Optional[int] = None,
+        rank: str = RANK_DEFAULT,
+    ) -> List[Dict[str, Any]]:
+        # 3명이면 상대 조합별 통계, 1~2명이면 그 영웅들을 포함한 팀별 통계
+        # seasons 를 주면 그 시즌들의 부분 집계만 더해서 답한다 (None = 전체)
+        # rank 가 wilson/bayes 면 판수가 적은 조합이 위로 튀지 않게 점수 순으로 정렬한다
+        want = _canon_team_key(team_input)
+        spec = STAT_KINDS.get(kind, {})
+        min_tries = _min_tries(min_tries)
+        if len(want) == 3:
+            if seasons is None:
+                items = self._full_stats(kind, _join_team_key(want), min_tries, rank)
+            else:
+                items = self._season_items(kind, _join_team_key(want), seasons, rank)
+                items = [x for x in items if x["total"] >= min_tries]
+            side = spec.get("other")
+            key_field = f"{_SIDE_NAMES.get(side, '')}_key"
+        elif len(want) in (1, 2):
+            items = [x for x in self._partial_stats(kind, want, seasons, rank) if x["total"] >= min_tries]
+            side = spec.get("target")
+            key_field = "team_key"
+        else:
+            return []
 
-        results.sort(key=lambda x: (x["rate"], x["total"], x["success"]), reverse=True)
-        return results
+        # 보유 영웅 필터는 목록에 나오는 팀이 내가 꺼낼 공격조합일 때만 건다
+        if roster_mask is None or side != "atk":
+            return items
+
+        masks = self.team_masks.get("atk", {})
+        return [x for x in items if _fits_roster(masks.get(x[key_field], 0), roster_mask)]
+
+    def get_report(
+        self,
+        team_input: Sequence[str],
+        seasons: Optional[Sequence[str]] = None,
+        limit: int = 5,
+        min_tries: Optional[int] = None,
+        rank: str = RANK_DEFAULT,
+    ) -> Dict[str, Dict[str, Any]]:
+        # 한 팀을 여섯 관점으로 한 번에: team key 를 한 번만 만들고 kind 별 인덱스를 한 번씩 찾는다
+        want = _canon_team_key(team_input)
+        if len(want) != 3:
+            return {}
+        team_key = _join_team_key(want)
+        min_tries = _min_tries(min_tries)
+
+        report: Dict[str, Dict[str, Any]] = {}
+        for kind in STAT_KINDS:
+            if seasons is None:
+                items = self._full_stats(kind, team_key, min_tries, rank)
+                summary = self.team_totals.get(kind, {}).get(team_key)
+            else:
+                items = self._season_items(kind, team_key, seasons, rank)
+                items = [x for x in items if x["total"] >= min_tries]
+                summary = self._season_team_total(kind, team_key, seasons)
+            report[kind] = {"summary": summary, "items": items[:limit], "count": len(items)}
+        return report
+
+    def get_defense_stats(self, defense_team_input: List[str]) -> List[Dict[str, Any]]:
+        return self.get_stats("defense", defense_team_input)
+
+    def get_my_attack_winrates(self, attack_team_input: List[str]) -> List[Dict[str, Any]]:
+        return self.get_stats("my_attack", attack_team_input)
+
+    def get_enemy_attack_winrates(self, attack_team_input: List[str]) -> List[Dict[str, Any]]:
+        return self.get_stats("enemy_attack", attack_team_input)
+
+    def get_global_attack_winrates(self, attack_team_input: List[str]) -> List[Dict[str, Any]]:
+        return self.get_stats("global_attack", attack_team_input)
+
+    def get_attack_stats(self, defense_team_input: List[str]) -> List[Dict[str, Any]]:
+        return self.get_stats("attack", defense_team_input)
+
+    def get_overall_stats(self, defense_team_input: List[str]) -> List[Dict[str, Any]]:
+        return self.get_stats("overall", defense_team_input)
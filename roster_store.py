@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import traceback
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import common
+from common import _roster_mask, _s
+
+logger = logging.getLogger("counter-bot")
+
+
+# 유저별 보유 영웅 목록. 파일에는 {user_id: {"heroes": [...], "on": bool}} 만 남기고
+# 조회 때 쓰는 비트 mask 는 메모리에서만 만든다.
+ROSTER_PATH = Path(os.getenv("ROSTER_PATH", "rosters.json"))
+
+
+class RosterStore:
+    def __init__(self, path: Path = ROSTER_PATH):
+        self.path = path
+        self.rosters: Dict[str, Dict[str, object]] = {}
+        # user_id -> (mask 를 만들 때의 영웅 번호 개수, mask). 새 영웅이 번호를 받으면 다시 만든다.
+        self._masks: Dict[str, Tuple[int, int]] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.rosters = {
+                str(uid): {"heroes": [_s(h) for h in v.get("heroes", []) if _s(h)], "on": bool(v.get("on", True))}
+                for uid, v in data.items()
+            }
+            self._masks = {}
+            logger.info(f"Loaded rosters: users={len(self.rosters)}")
+        except Exception:
+            logger.error(f"보유 영웅 로드 실패: {self.path}\n" + traceback.format_exc())
+
+    def save(self) -> None:
+        self.path.write_text(
+            json.dumps(self.rosters, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+
+    def get(self, user_id: int) -> List[str]:
+        return list(self.rosters.get(str(user_id), {}).get("heroes", []))
+
+    def is_on(self, user_id: int) -> bool:
+        roster = self.rosters.get(str(user_id))
+        return bool(roster and roster["on"] and roster["heroes"])
+
+    def set(self, user_id: int, heroes: Sequence[str]) -> List[str]:
+        names = sorted({_s(h) for h in heroes if _s(h)})
+        self.rosters[str(user_id)] = {"heroes": names, "on": True}
+        self._masks.pop(str(user_id), None)
+        self.save()
+        return names
+
+    def set_on(self, user_id: int, on: bool) -> bool:
+        roster = self.rosters.get(str(user_id))
+        if roster is None:
+            return False
+        roster["on"] = on
+        self.save()
+        return True
+
+    def clear(self, user_id: int) -> bool:
+        if self.rosters.pop(str(user_id), None) is None:
+            return False
+        self._masks.pop(str(user_id), None)
+        self.save()
+        return True
+
+    def mask(self, user_id: int) -> Optional[int]:
+        # 등록하지 않았거나 꺼둔 유저는 None (필터 없음)
+        if not user_id or not self.is_on(user_id):
+            return None
+        uid = str(user_id)
+        stamp = len(common._HERO_BIT_IDS)
+        cached = self._masks.get(uid)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, _roster_mask(self.rosters[uid]["heroes"]))
+            self._masks[uid] = cached
+        return cached[1]
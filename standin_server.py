@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+
+# Google Sheets CSV export / 네이버 라운지 feed API / YouTube Atom feed 를 흉내 내는 로컬 HTTP 서버.
+# 지연, 오류, 304, 몰아치는 새 글(burst) 을 재현 가능하게 주입해서
+# 시트 리로드 시간과 게시판/유튜브 폴링 처리량을 오프라인으로 잴 수 있다.
+#
+#   python standin_server.py serve --port 8765 --scenario flaky
+#   SHEETS_BASE_URL=http://127.0.0.1:8765 NAVER_API_BASE_URL=... python bot.py
+#   python standin_server.py measure --scenario slow --reloads 5 --polls 50
+#
+# 요청 처리 통계는 GET /_standin/stats, 초기화는 GET /_standin/reset.
+
+_SHEET_RE = re.compile(r"^/spreadsheets/d/(?P<sheet>[^/]+)/export$")
+_LOUNGE_RE = re.compile(r"^/nng_main/v1/community/lounge/(?P<lounge>[^/]+)/feed$")
+_YOUTUBE_PATH = "/feeds/videos.xml"
+
+# 시나리오 프리셋. 명령행 옵션으로 하나씩 덮어쓸 수 있다.
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "steady": {},
+    "slow": {"latency_ms": 800, "jitter_ms": 200},
+    "flaky": {"latency_ms": 50, "error_rate": 0.2},
+    "cached": {"not_modified_rate": 0.5},
+    # 새 글이 한 번에 10개씩 (feed limit 5 보다 많이) 올라오고, 50번에 5번꼴로 연속 오류가 난다
+    "burst": {"post_every": 20, "post_batch": 10, "error_burst": 5, "error_burst_every": 50},
+}
+
+
+class StandinConfig:
+    def __init__(
+        self,
+        sheets: Optional[Dict[str, str]] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        not_modified_rate: float = 0.0,
+        error_burst: int = 0,
+        error_burst_every: int = 0,
+        post_every: int = 3,
+        post_batch: int = 1,
+        video_every: int = 10,
+        seed: int = 0,
+    ):
+        # gid -> CSV 경로. gid 가 없는 요청은 "0" 으로 찾는다.
+        self.sheets = dict(sheets or {})
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.not_modified_rate = not_modified_rate
+        # error_burst_every 요청마다 처음 error_burst 개는 무조건 오류
+        self.error_burst = error_burst
+        self.error_burst_every = error_burst_every
+        # 게시판 feed 를 post_every 번 부를 때마다 새 글 post_batch 개가 생긴다
+        self.post_every = post_every
+        self.post_batch = post_batch
+        # 유튜브 feed 를 video_every 번 부를 때마다 새 영상 1개
+        self.video_every = video_every
+        self.seed = seed
+
+    @classmethod
+    def from_scenario(cls, name: str, **overrides: Any) -> "StandinConfig":
+        values = dict(SCENARIOS[name])
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+
+class StandinState:
+    # 요청 사이에 공유되는 상태. 핸들러는 스레드마다 돌아서 lock 으로 감싼다.
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.rng = random.Random(self.config.seed)
+            self.requests = 0
+            self.by_route: Dict[str, Dict[str, int]] = {}
+            self.board_polls: Dict[str, int] = {}
+            self.video_polls: Dict[str, int] = {}
+            self.latency_total_ms = 0.0
+            self.started = time.time()
+
+    def record(self, route: str, status: int) -> None:
+        with self.lock:
+            counts = self.by_route.setdefault(route, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def fault(self) -> Tuple[float, Optional[int]]:
+        # (이번 요청에 줄 지연 초, 강제로 돌려줄 상태 코드 또는 None)
+        cfg = self.config
+        with self.lock:
+            n = self.requests
+            self.requests += 1
+            delay = max(0.0, cfg.latency_ms + self.rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000.0
+            roll = self.rng.random()
+            not_modified = self.rng.random() < cfg.not_modified_rate
+            self.latency_total_ms += delay * 1000.0
+
+        if cfg.error_burst and cfg.error_burst_every and n % cfg.error_burst_every < cfg.error_burst:
+            return delay, cfg.error_status
+        if roll < cfg.error_rate:
+            return delay, cfg.error_status
+        if not_modified:
+            return delay, 304
+        return delay, None
+
+    def next_board_posts(self, board_id: str) -> int:
+        # 지금까지 쌓인 글 수
+        with self.lock:
+            polls = self.board_polls.get(board_id, 0)
+            self.board_polls[board_id] = polls + 1
+        cfg = self.config
+        return 5 + (polls // max(1, cfg.post_every)) * cfg.post_batch
+
+    def next_videos(self, channel_id: str) -> int:
+        with self.lock:
+            polls = self.video_polls.get(channel_id, 0)
+            self.video_polls[channel_id] = polls + 1
+        return 1 + polls // max(1, self.config.video_every)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "uptime_s": time.time() - self.started,
+                "injected_latency_ms": self.latency_total_ms,
+                "by_route": json.loads(json.dumps(self.by_route)),
+                "board_polls": dict(self.board_polls),
+                "video_polls": dict(self.video_polls),
+            }
+
+
+def lounge_feed(board_id: str, n_posts: int, limit: int, offset: int) -> Dict[str, Any]:
+    # 최신 글이 앞에 오도록 feedId 내림차순
+    newest = n_posts - offset
+    ids = range(newest, max(newest - limit, 0), -1)
+    base = (int(board_id) if board_id.isdigit() else zlib.crc32(board_id.encode("utf-8")) % 1000) * 100000
+    return {
+        "code": 200,
+        "content": {
+            "feeds": [
+                {"feed": {"feedId": base + i, "boardId": board_id, "title": f"[stand-in] {board_id}번 게시판 글 {i}"}}
+                for i in ids
+            ],
+        },
+    }
+
+
+def youtube_feed(channel_id: str, n_videos: int, limit: int = 15) -> str:
+    entries = []
+    for i in range(n_videos, max(n_videos - limit, 0), -1):
+        video_id = f"{channel_id[-6:]}{i:05d}"
+        published = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(1_700_000_000 + i * 3600))
+        entries.append(
+            "<entry>"
+            f"<id>yt:video:{video_id}</id>"
+            f"<yt:videoId>{video_id}</yt:videoId>"
+            f"<yt:channelId>{escape(channel_id)}</yt:channelId>"
+            f"<title>[stand-in] 영상 {i}</title>"
+            f'<link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>'
+            f"<published>{published}</published>"
+            "</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:yt="http://www.youtube.com/xml/schemas/2015">'
+        f"<title>stand-in {escape(channel_id)}</title>"
+        + "".join(entries)
+        + "</feed>"
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "rayabot-standin/1.0"
+    state: StandinState
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # 요청마다 stderr 에 찍으면 측정이 흔들린다
+        pass
+
+    def _send(self, route: str, status: int, body: bytes = b"", content_type: str = "text/plain", etag: str = "") -> None:
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Date", formatdate(usegmt=True))
+        self.end_headers()
+        if status != 304 and body:
+            self.wfile.write(body)
+        self.state.record(route, status)
+
+    def _conditional(self, route: str, body: bytes, content_type: str) -> None:
+        # If-None-Match 가 맞으면 진짜 304, 아니면 ETag 를 붙여서 본문을 보낸다
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(route, 304, etag=etag)
+        else:
+            self._send(route, 200, body, content_type, etag)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/_standin/stats":
+            self._send("control", 200, json.dumps(self.state.stats(), ensure_ascii=False).encode("utf-8"), "application/json")
+            return
+        if url.path == "/_standin/reset":
+            self.state.reset()
+            self._send("control", 200, b"ok")
+            return
+
+        if _SHEET_RE.match(url.path):
+            route = "sheets"
+        elif _LOUNGE_RE.match(url.path):
+            route = "lounge"
+        elif url.path == _YOUTUBE_PATH:
+            route = "youtube"
+        else:
+            self._send("unknown", 404, b"not found")
+            return
+
+        delay, forced = self.state.fault()
+        if delay:
+            time.sleep(delay)
+        if forced is not None:
+            self._send(route, forced, b"" if forced == 304 else b"injected error")
+            return
+
+        if route == "sheets":
+            self._serve_sheet(query)
+        elif route == "lounge":
+            board_id = query.get("boardId", "1")
+            n_posts = self.state.next_board_posts(board_id)
+            feed = lounge_feed(board_id, n_posts, int(query.get("limit", 5)), int(query.get("offset", 0)))
+            self._conditional(route, json.dumps(feed, ensure_ascii=False).encode("utf-8"), "application/json")
+        else:
+            channel_id = query.get("channel_id", "")
+            if not channel_id:
+                self._send(route, 400, b"channel_id required")
+                return
+            body = youtube_feed(channel_id, self.state.next_videos(channel_id)).encode("utf-8")
+            self._conditional(route, body, "application/atom+xml; charset=utf-8")
+
+    def _serve_sheet(self, query: Dict[str, str]) -> None:
+        path = self.state.config.sheets.get(query.get("gid", "0"))
+        if not path or not os.path.exists(path):
+            self._send("sheets", 404, b"unknown gid")
+            return
+        self._conditional("sheets", Path(path).read_bytes(), "text/csv; charset=utf-8")
+
+
+class StandinServer:
+    # 같은 프로세스 안에서 쓸 때: with StandinServer(config) as server: server.base_url ...
+    def __init__(self, config: StandinConfig, host: str = "127.0.0.1", port: int = 0):
+        self.state = StandinState(config)
+        handler = type("StandinHandler", (_Handler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        # 봇/스토어가 읽는 base URL 환경변수
+        return {
+            "SHEETS_BASE_URL": self.base_url,
+            "NAVER_API_BASE_URL": self.base_url,
+            "NAVER_WEB_BASE_URL": self.base_url,
+            "YOUTUBE_FEED_BASE_URL": self.base_url,
+        }
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="standin-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+# --- 측정 ---
+
+def _percentiles(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))] * 1000.0
+
+    return {"count": len(values), "p50_ms": pct(50), "p95_ms": pct(95), "max_ms": ordered[-1] * 1000.0}
+
+
+def measure(server: StandinServer, raw_gid: str, reloads: int, polls: int, boards: int) -> Dict[str, Any]:
+    # 실제 로더/크롤러 코드를 stand-in 으로 돌려서 리로드 시간과 폴링 처리량을 잰다
+    os.environ.update(server.env())
+    import asyncio
+
+    from counter_store import DataStore
+    from crawler import BoardCrawler
+    from notifier import fetch_latest_youtube_video
+    from raw_store import RawMatchStore
+
+    sheet_url = "https://docs.google.com/spreadsheets/d/standin/edit?gid=0#gid=0"
+    data_store = DataStore(sheet_url)
+    raw_store = RawMatchStore(sheet_url, raw_gid)
+
+    reload_times, failures = [], 0
+    for _ in range(reloads):
+        start = time.perf_counter()
+        data_store.load()
+        raw_store.load()
+        reload_times.append(time.perf_counter() - start)
+        failures += (data_store.df is None) + (raw_store.df is None)
+
+    crawler = BoardCrawler()
+    crawler.save_file = os.path.join(tempfile.gettempdir(), "standin_board_cache.json")
+    for b in range(1, boards + 1):
+        crawler.register(str(b), f"board{b}", 0)
+    poll_times, new_posts = [], 0
+    started = time.perf_counter()
+    for _ in range(polls):
+        start = time.perf_counter()
+        new_posts += sum(len(u["posts"]) for u in crawler.check_new_posts())
+        poll_times.append(time.perf_counter() - start)
+    poll_elapsed = time.perf_counter() - started
+
+    async def youtube_polls() -> List[float]:
+        times = []
+        for _ in range(polls):
+            start = time.perf_counter()
+            await fetch_latest_youtube_video({"id": "standin", "channel_id": "UCstandin000001"})
+            times.append(time.perf_counter() - start)
+        return times
+
+    video_times = asyncio.run(youtube_polls())
+    return {
+        "reload": {**_percentiles(reload_times), "failures": failures},
+        "board_poll": {
+            **_percentiles(poll_times),
+            "boards": boards,
+            "new_posts": new_posts,
+            "requests_per_s": polls * boards / poll_elapsed if poll_elapsed > 0 else 0.0,
+        },
+        "youtube_poll": _percentiles(video_times),
+        "server": server.state.stats(),
+    }
+
+
+def _sheets_from_args(args: argparse.Namespace, work_dir: Path) -> Dict[str, str]:
+    counter_csv, raw_csv = args.counter_csv, args.raw_csv
+    if not (counter_csv and raw_csv):
+        from bench_data import generate_sheets
+
+        counter_path, raw_path, _ = generate_sheets(work_dir, args.rows, seed=args.seed)
+        counter_csv = counter_csv or str(counter_path)
+        raw_csv = raw_csv or str(raw_path)
+    return {"0": counter_csv, str(args.raw_gid): raw_csv}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sheets / 네이버 라운지 / YouTube 로컬 stand-in 서버")
+    parser.add_argument("mode", choices=("serve", "measure"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="steady")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--error-status", type=int)
+    parser.add_argument("--not-modified-rate", type=float)
+    parser.add_argument("--error-burst", type=int)
+    parser.add_argument("--error-burst-every", type=int)
+    parser.add_argument("--post-every", type=int)
+    parser.add_argument("--post-batch", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--counter-csv", help="gid=0 으로 내보낼 카운터 CSV (없으면 합성)")
+    parser.add_argument("--raw-csv", help="--raw-gid 로 내보낼 raw CSV (없으면 합성)")
+    parser.add_argument("--raw-gid", default=os.getenv("RAW_SHEET_GID", "123456789"))
+    parser.add_argument("--rows", type=int, default=20000, help="합성 raw 시트 행 수")
+    parser.add_argument("--reloads", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=30)
+    parser.add_argument("--boards", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rayabot-standin-") as tmp:
+        config = StandinConfig.from_scenario(
+            args.scenario,
+            sheets=_sheets_from_args(args, Path(tmp)),
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            not_modified_rate=args.not_modified_rate,
+            error_burst=args.error_burst,
+            error_burst_every=args.error_burst_every,
+            post_every=args.post_every,
+            post_batch=args.post_batch,
+            seed=args.seed,
+        )
+
+        if args.mode == "measure":
+            with StandinServer(config, args.host, 0) as server:
+                print(json.dumps(measure(server, str(args.raw_gid), args.reloads, args.polls, args.boards), ensure_ascii=False, indent=2))
+            return 0
+
+        server = StandinServer(config, args.host, args.port)
+        for key, value in server.env().items():
+            print(f"{key}={value}", file=sys.stderr)
+        print(f"RAW_SHEET_GID={args.raw_gid}", file=sys.stderr)
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
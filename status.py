@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from profiler import fmt_bytes
+
+
+# !상태 임베드. 스토어별 버전/행 수/로드 후 경과 시간/단계별 로드 시간/인덱스 크기/메모리,
+# 렌더 캐시, 게시판 크롤러와 알림의 마지막 폴링 + backoff, 이벤트 루프 지연을 한 번에 보여준다.
+
+_PHASES = ("download", "parse", "index")
+_MAX_POLL_LINES = 8
+
+
+def _ago(ts: float, now: Optional[float] = None) -> str:
+    if not ts:
+        return "없음"
+    sec = int((now or time.time()) - ts)
+    if sec < 0:
+        return f"{-sec}초 뒤"
+    if sec < 60:
+        return f"{sec}초 전"
+    if sec < 3600:
+        return f"{sec // 60}분 전"
+    if sec < 86400:
+        return f"{sec // 3600}시간 {sec % 3600 // 60}분 전"
+    return f"{sec // 86400}일 전"
+
+
+def _clock(ts: float) -> str:
+    return time.strftime("%H:%M:%S", time.localtime(ts)) if ts else "-"
+
+
+def _phases_text(phases: Dict[str, float]) -> str:
+    if not phases:
+        return "기록 없음"
+    total = sum(phases.values())
+    parts = [f"{p} {phases[p]:.2f}s" for p in _PHASES if p in phases]
+    parts += [f"{p} {v:.2f}s" for p, v in phases.items() if p not in _PHASES]
+    return f"{total:.2f}s (" + " / ".join(parts) + ")"
+
+
+def _store_value(status: Dict[str, Any], size: Optional[int]) -> str:
+    if not status["version"]:
+        return "❌ 로드 실패 / 데이터 없음\n" + f"마지막 로드 시도: {_phases_text(status['load_phases'])}"
+
+    index = " · ".join(f"{k} {v:,}" if isinstance(v, int) else f"{k} {v}" for k, v in status["index"].items())
+    lines = [
+        f"버전 `{status['version']}` · {status['rows']:,}행 · {_ago(status['loaded_at'])} 로드",
+        f"로드 {_phases_text(status['load_phases'])}",
+        f"인덱스: {index}",
+    ]
+    if size is not None:
+        lines.append(f"메모리 ≈ {fmt_bytes(size)}")
+    return "\n".join(lines)
+
+
+def _poll_lines(poll_state: Dict[str, Dict[str, float]], names: Dict[str, str], now: float) -> List[str]:
+    lines = []
+    for key, state in list(poll_state.items())[:_MAX_POLL_LINES]:
+        name = names.get(key, key)
+        if state["failures"]:
+            lines.append(
+                f"• {name}: ⚠️ 연속 실패 {int(state['failures'])}회 · "
+                f"마지막 성공 {_ago(state['last_ok_at'], now)} · 다음 시도 {_clock(state['next_poll_at'])}"
+            )
+        else:
+            lines.append(f"• {name}: 정상 · 마지막 폴링 {_ago(state['last_poll_at'], now)}")
+    if len(poll_state) > _MAX_POLL_LINES:
+        lines.append(f"… 외 {len(poll_state) - _MAX_POLL_LINES}개")
+    return lines
+
+
+def build_status_embed(
+    stores: Dict[str, Dict[str, Any]],
+    sizes: Dict[str, int],
+    render_cache: Any,
+    crawler: Any,
+    notifier: Any,
+    loop_text: str,
+) -> discord.Embed:
+    now = time.time()
+    embed = discord.Embed(title="📊 봇 상태", color=0x95A5A6)
+
+    for name, status in stores.items():
+        embed.add_field(name=name, value=_store_value(status, sizes.get(name))[:1024], inline=False)
+
+    lookups = render_cache.hits + render_cache.misses
+    hit_rate = render_cache.hits / lookups * 100 if lookups else 0.0
+    embed.add_field(
+        name="렌더 캐시",
+        value=f"{len(render_cache)}/{render_cache.maxsize}개 · 적중률 {hit_rate:.0f}% ({lookups:,}회)"
+        + (f" · 메모리 ≈ {fmt_bytes(sizes['렌더 캐시'])}" if "렌더 캐시" in sizes else ""),
+        inline=False,
+    )
+
+    board_names = {k: f"{v['board_name']}({k})" for k, v in crawler.monitored_boards.items()}
+    board_lines = [f"감시 {len(crawler.monitored_boards)}개 · 마지막 폴링 {_ago(crawler.last_poll_at, now)}"]
+    board_lines += _poll_lines(crawler.poll_state, board_names, now)
+    embed.add_field(name="게시판 크롤러", value="\n".join(board_lines)[:1024], inline=False)
+
+    if notifier is None:
+        notifier_lines = ["아직 시작 전"]
+    else:
+        sources = [s for s in notifier.config.get("sources", []) if s.get("enabled", True)]
+        source_names = {str(s.get("id")): str(s.get("name") or s.get("id")) for s in sources}
+        notifier_lines = [f"소스 {len(sources)}개 · 마지막 폴링 {_ago(notifier.last_poll_at, now)}"]
+        notifier_lines += _poll_lines(notifier.poll_state, source_names, now)
+        notifier_lines += [f"• {source_names.get(k, k)}: ❌ 설정 오류 (폴링 안 함)" for k in sorted(notifier.config_errors)]
+    embed.add_field(name="알림", value="\n".join(notifier_lines)[:1024], inline=False)
+
+    embed.add_field(name="이벤트 루프", value=loop_text[:1024], inline=False)
+    return embed
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from matchup import rank_by_rate
+
+
+# 영웅 단위 / 영웅 2명 조합 단위 승률.
+# 팀을 (행, 자리 3개) 영웅 번호 행렬로 바꾼 뒤 자리 쌍 3개를 펼쳐서 bincount 로 한 번에 센다.
+
+_POSITION_PAIRS = ((0, 1), (0, 2), (1, 2))
+
+
+class HeroSynergy:
+    def __init__(
+        self,
+        heroes: List[str],
+        hero_wins: np.ndarray,
+        hero_totals: np.ndarray,
+        pair_a: np.ndarray,
+        pair_b: np.ndarray,
+        pair_wins: np.ndarray,
+        pair_totals: np.ndarray,
+    ):
+        self.heroes = heroes
+        self.hero_ids = {h: i for i, h in enumerate(heroes)}
+        self.hero_wins = hero_wins
+        self.hero_totals = hero_totals
+        # 조합 쌍 목록 (a < b)
+        self.pair_a = pair_a
+        self.pair_b = pair_b
+        self.pair_wins = pair_wins
+        self.pair_totals = pair_totals
+
+    @classmethod
+    def empty(cls) -> "HeroSynergy":
+        none = np.zeros(0, dtype=np.int64)
+        return cls([], none, none, none, none, none, none)
+
+    @classmethod
+    def from_members(
+        cls,
+        members: Sequence[tuple],
+        success: np.ndarray,
+        counts: Optional[np.ndarray] = None,
+    ) -> "HeroSynergy":
+        # counts 를 주면 한 줄을 그만큼 센다 (부분 갱신에서 삭제된 행은 -1, success 도 부호를 붙여서 준다)
+        heroes = sorted({h for team in members for h in team})
+        n_heroes = len(heroes)
+        if not n_heroes:
+            return cls.empty()
+
+        # 3명이 안 되는 팀은 빈 자리를 None 으로 채워서 코드 -1 이 되게 한다
+        frame = pd.DataFrame([(tuple(team) + (None, None, None))[:3] for team in members], columns=range(3))
+        codes = np.stack(
+            [pd.Categorical(frame[c], categories=heroes).codes.astype(np.int64) for c in range(3)],
+            axis=1,
+        )
+        success = success.astype(np.int64)
+        counts = np.ones(len(success), dtype=np.int64) if counts is None else counts.astype(np.int64)
+
+        flat = codes.ravel()
+        flat_success = np.repeat(success, 3)
+        flat_counts = np.repeat(counts, 3)
+        valid = flat >= 0
+        hero_totals = np.bincount(flat[valid], weights=flat_counts[valid], minlength=n_heroes).astype(np.int64)
+        hero_wins = np.bincount(flat[valid], weights=flat_success[valid], minlength=n_heroes).astype(np.int64)
+
+        pair_codes = []
+        pair_success = []
+        pair_counts = []
+        for i, j in _POSITION_PAIRS:
+            a, b = codes[:, i], codes[:, j]
+            ok = (a >= 0) & (b >= 0)
+            lo, hi = np.minimum(a[ok], b[ok]), np.maximum(a[ok], b[ok])
+            pair_codes.append(lo * n_heroes + hi)
+            pair_success.append(success[ok])
+            pair_counts.append(counts[ok])
+        pair_codes = np.concatenate(pair_codes)
+        cells, inverse = np.unique(pair_codes, return_inverse=True)
+        pair_totals = np.bincount(inverse, weights=np.concatenate(pair_counts), minlength=len(cells)).astype(np.int64)
+        pair_wins = np.bincount(inverse, weights=np.concatenate(pair_success), minlength=len(cells)).astype(np.int64)
+
+        return cls(heroes, hero_wins, hero_totals, cells // n_heroes, cells % n_heroes, pair_wins, pair_totals)
+
+    def combine(self, other: "HeroSynergy") -> "HeroSynergy":
+        # 두 집계를 영웅 이름 기준으로 더한 새 객체 (raw 부분 갱신용). 판수가 0 이 된 영웅/쌍은 뺀다.
+        heroes = sorted(set(self.heroes) | set(other.heroes))
+        n_heroes = len(heroes)
+        if not n_heroes:
+            return HeroSynergy.empty()
+        ids = {h: i for i, h in enumerate(heroes)}
+
+        hero_wins = np.zeros(n_heroes, dtype=np.int64)
+        hero_totals = np.zeros(n_heroes, dtype=np.int64)
+        pair_codes = []
+        pair_wins = []
+        pair_totals = []
+        for part in (self, other):
+            # 영웅 목록이 둘 다 정렬돼 있어서 번호를 옮겨도 a < b 가 유지된다
+            remap = np.array([ids[h] for h in part.heroes], dtype=np.int64)
+            if not len(remap):
+                continue
+            np.add.at(hero_wins, remap, part.hero_wins)
+            np.add.at(hero_totals, remap, part.hero_totals)
+            pair_codes.append(remap[part.pair_a] * n_heroes + remap[part.pair_b])
+            pair_wins.append(part.pair_wins)
+            pair_totals.append(part.pair_totals)
+
+        cells, inverse = np.unique(np.concatenate(pair_codes), return_inverse=True)
+        wins = np.bincount(inverse, weights=np.concatenate(pair_wins), minlength=len(cells)).astype(np.int64)
+        totals = np.bincount(inverse, weights=np.concatenate(pair_totals), minlength=len(cells)).astype(np.int64)
+        keep = totals > 0
+        cells, wins, totals = cells[keep], wins[keep], totals[keep]
+        pair_a, pair_b = cells // n_heroes, cells % n_heroes
+
+        present = hero_totals > 0
+        if not present.all():
+            new_ids = np.cumsum(present) - 1
+            heroes = [h for h, ok in zip(heroes, present.tolist()) if ok]
+            hero_wins, hero_totals = hero_wins[present], hero_totals[present]
+            pair_a, pair_b = new_ids[pair_a], new_ids[pair_b]
+        return HeroSynergy(heroes, hero_wins, hero_totals, pair_a, pair_b, wins, totals)
+
+    def _hero_rate(self, i: int) -> float:
+        total = int(self.hero_totals[i])
+        return int(self.hero_wins[i]) / total if total > 0 else 0.0
+
+    def top_heroes(self, min_tries: int, limit: int = 10, ascending: bool = False) -> List[Dict[str, Any]]:
+        return [
+            {
+                "hero": self.heroes[i],
+                "success": int(self.hero_wins[i]),
+                "total": int(self.hero_totals[i]),
+                "rate": self._hero_rate(i),
+            }
+            for i in rank_by_rate(self.hero_wins, self.hero_totals, min_tries, ascending, limit)
+        ]
+
+    def partners(self, hero: str, min_tries: int, limit: int = 10) -> List[Dict[str, Any]]:
+        # hero 와 같은 팀에 들어간 영웅별 승률. lift = 같이 썼을 때 승률 - hero 전체 승률
+        h = self.hero_ids.get(hero)
+        if h is None:
+            return []
+        sel = np.flatnonzero((self.pair_a == h) | (self.pair_b == h))
+        others = np.where(self.pair_a[sel] == h, self.pair_b[sel], self.pair_a[sel])
+        wins, totals = self.pair_wins[sel], self.pair_totals[sel]
+        base = self._hero_rate(h)
+
+        result = []
+        for k in rank_by_rate(wins, totals, min_tries, ascending=False, limit=limit):
+            rate = int(wins[k]) / int(totals[k])
+            result.append({
+                "hero": self.heroes[others[k]],
+                "success": int(wins[k]),
+                "total": int(totals[k]),
+                "rate": rate,
+                "lift": rate - base,
+            })
+        return result
+
+    def hero_summary(self, hero: str) -> Dict[str, Any]:
+        h = self.hero_ids.get(hero)
+        if h is None:
+            return {"hero": hero, "success": 0, "total": 0, "rate": 0.0}
+        return {
+            "hero": hero,
+            "success": int(self.hero_wins[h]),
+            "total": int(self.hero_totals[h]),
+            "rate": self._hero_rate(h),
+        }
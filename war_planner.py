@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from common import _canon_team_key, _min_tries
+
+logger = logging.getLogger("counter-bot")
+
+
+# 길드전: 상대 방어조합 여러 개에 공격조합을 하나씩 배정하되 영웅은 한 번만 쓸 수 있다.
+# 방어조합별 후보(공격조합, 예상 승률)를 모은 뒤 branch-and-bound 로 기대 승수 합이 최대인 배정을 찾는다.
+
+MAX_DEFENSES = 6
+MAX_CANDIDATES = 30
+NODE_LIMIT = 200_000
+
+
+def collect_candidates(
+    data_store,
+    raw_store,
+    defense: Sequence[str],
+    roster: Optional[Set[str]] = None,
+    min_tries: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    key = _canon_team_key(defense)
+    min_tries = _min_tries(min_tries)
+    cands: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    # raw 실전 기록: 이 방어조합 상대 공격조합별 전적
+    atk_members = raw_store.team_members.get("atk", {})
+    for item in raw_store.get_stats("overall", key, min_tries=min_tries):
+        members = atk_members.get(item["attack_key"])
+        if not members or len(members) != 3:
+            continue
+        cands[members] = {
+            "members": members,
+            "success": item["success"],
+            "total": item["total"],
+            "rate": item["rate"],
+            "source": "raw",
+        }
+
+    # 카운터 시트: 같은 공격조합이 양쪽에 있으면 판수가 많은 쪽을 쓴다
+    for item in data_store.search_by_enemy(list(key)):
+        members = _canon_team_key(item["counter_disp"])
+        if len(members) != 3 or item["total"] < min_tries:
+            continue
+        prev = cands.get(members)
+        if prev is None or item["total"] > prev["total"]:
+            cands[members] = {
+                "members": members,
+                "success": item["win"],
+                "total": item["total"],
+                "rate": item["rate"],
+                "source": "counter",
+            }
+
+    result = [c for c in cands.values() if roster is None or set(c["members"]) <= roster]
+    result.sort(key=lambda c: (c["rate"], c["total"]), reverse=True)
+    return result[:MAX_CANDIDATES]
+
+
+def plan_attacks(candidates: List[List[Dict[str, Any]]]) -> Tuple[float, List[Optional[Dict[str, Any]]], bool]:
+    # (기대 승수 합, 방어조합별 배정 결과(없으면 None), 끝까지 탐색했는지)
+    n = len(candidates)
+    hero_ids: Dict[str, int] = {}
+    masks: List[List[Tuple[int, float, int]]] = []
+    for i, cands in enumerate(candidates):
+        row = []
+        for j, c in enumerate(cands):
+            mask = 0
+            for hero in c["members"]:
+                mask |= 1 << hero_ids.setdefault(hero, len(hero_ids))
+            row.append((mask, c["rate"], j))
+        masks.append(row)
+
+    # 후보의 최고 승률이 높은 방어조합부터 배정하면 좋은 해를 빨리 찾아 가지치기가 잘 된다
+    order = sorted(range(n), key=lambda i: -(masks[i][0][1] if masks[i] else 0.0))
+    best_rate = [masks[i][0][1] if masks[i] else 0.0 for i in order]
+    bound = [0.0] * (n + 1)
+    for k in range(n - 1, -1, -1):
+        bound[k] = bound[k + 1] + best_rate[k]
+
+    best_value = -1.0
+    best_pick: List[int] = [-1] * n
+    pick: List[int] = [-1] * n
+    nodes = 0
+    exhaustive = True
+
+    def search(k: int, used: int, value: float) -> None:
+        nonlocal best_value, best_pick, nodes, exhaustive
+        nodes += 1
+        if nodes > NODE_LIMIT:
+            exhaustive = False
+            return
+        if value + bound[k] <= best_value:
+            return
+        if k == n:
+            best_value = value
+            best_pick = pick[:]
+            return
+
+        i = order[k]
+        for mask, rate, j in masks[i]:
+            if mask & used:
+                continue
+            pick[i] = j
+            search(k + 1, used | mask, value + rate)
+        pick[i] = -1
+        search(k + 1, used, value)
+
+    search(0, 0, 0.0)
+    if nodes > NODE_LIMIT:
+        logger.warning(f"길드전 배정 탐색 제한 도달: nodes={nodes}")
+
+    assignment = [candidates[i][j] if j >= 0 else None for i, j in enumerate(best_pick)]
+    return max(best_value, 0.0), assignment, exhaustive